@@ -0,0 +1,203 @@
+import argparse
+import bisect
+import datetime
+import heapq
+import io
+import time
+
+import psycopg
+
+from config import ALLOCATION_MAX_REQUESTS, DB_CONFIG
+
+# ---------------------- Batch Allocation ----------------------
+# one round hands open listings to the open requests:
+#   - requests: receiver_requests with status 'Open', served first come first served, at most
+#     ALLOCATION_MAX_REQUESTS per round (the rest wait for the next one)
+#   - listings: unexpired, quantity > 0 and no live (Pending/Completed) claim yet, only read for the
+#     cities someone asked in (food_listings.location) and streamed into per (city, food_type) pools
+#   - a request takes listings of its city and food_type (any food_type when it has none). A listing is
+#     claimed whole, so a request takes the smallest one that covers what it still needs (the soonest
+#     expiring of equal ones) and leaves bigger ones to bigger requests; when none covers it, it takes
+#     the soonest expiring one and carries on, until it is covered or the pools run dry
+# the whole round runs in one transaction and writes its claims with a single COPY.
+ANY_FOOD = None
+
+
+def normalise_city(city):
+    return city.strip().lower() if city else None
+
+
+def load_requests(cursor, limit=ALLOCATION_MAX_REQUESTS):
+    cursor.execute("""
+        select q.request_id, q.receiver_id, coalesce(q.city, r.city), q.food_type,
+            q.quantity - q.quantity_allocated, q.requested_at
+        from receiver_requests q
+        join receivers r on r.receiver_id = q.receiver_id
+        where q.status = 'Open' and q.quantity > q.quantity_allocated
+        order by q.requested_at, q.request_id
+        limit %s
+        for update of q
+    """, (limit,))
+    return cursor.fetchall()
+
+
+def load_listings(cursor, as_of, cities):
+    #streamed, the round only keeps the (quantity, expiry, food_id) of each listing in its pool
+    return cursor.stream("""
+        select f.food_id, f.quantity, f.expiry_date, f.location, f.food_type
+        from food_listings f
+        where f.expiry_date >= %s and f.quantity > 0 and lower(trim(f.location)) = any(%s)
+        and not exists (select 1 from claims c where c.food_id = f.food_id and c.status is distinct from 'Cancelled')
+    """, (as_of, sorted(cities)))
+
+
+# ---------------------- Matching ----------------------
+class ListingPool:
+    #the open listings of one (city, food_type): sorted by size for the tightest fit, a heap by expiry
+    #for requests no single listing covers. Taken listings leave the sorted list and are skipped in the heap
+    def __init__(self):
+        self.by_size = []       #(quantity, expiry, food_id)
+        self.by_expiry = []     #(expiry, quantity, food_id)
+        self.taken = set()
+
+    def add(self, food_id, quantity, expiry):
+        self.by_size.append((quantity, expiry, food_id))
+        self.by_expiry.append((expiry, quantity, food_id))
+
+    def ready(self):
+        self.by_size.sort()
+        heapq.heapify(self.by_expiry)
+
+    def covering(self, need):
+        #the smallest listing with quantity >= need, None when every listing is smaller
+        at = bisect.bisect_left(self.by_size, (need,))
+        return self.by_size[at] if at < len(self.by_size) else None
+
+    def soonest(self):
+        while self.by_expiry and self.by_expiry[0][2] in self.taken:
+            heapq.heappop(self.by_expiry)
+        if not self.by_expiry:
+            return None
+        expiry, quantity, food_id = self.by_expiry[0]
+        return quantity, expiry, food_id
+
+    def take(self, listing):
+        del self.by_size[bisect.bisect_left(self.by_size, listing)]
+        self.taken.add(listing[2])
+
+
+def build_listing_pools(listings):
+    #city -> {food_type -> ListingPool} from (food_id, quantity, expiry_date, location, food_type) rows
+    pools = {}
+    for food_id, quantity, expiry, city, food_type in listings:
+        pool = pools.setdefault(normalise_city(city), {}).setdefault(food_type, ListingPool())
+        pool.add(food_id, quantity, expiry)
+    for city_pools in pools.values():
+        for pool in city_pools.values():
+            pool.ready()
+    return pools
+
+
+def pick(pools, need):
+    #(listing, pool) for a request still needing need from these pools, None when they are empty
+    covering = [(listing, pool) for pool in pools for listing in [pool.covering(need)] if listing]
+    if covering:
+        return min(covering, key=lambda c: c[0])
+    soonest = [(listing, pool) for pool in pools for listing in [pool.soonest()] if listing]
+    if soonest:
+        return min(soonest, key=lambda c: (c[0][1], c[0][0], c[0][2]))
+    return None
+
+
+def match(pools, requests):
+    #returns [(food_id, receiver_id, request_id, quantity)], requests in the order they were made
+    assignments = []
+    for request_id, receiver_id, city, food_type, remaining, _ in sorted(requests, key=lambda r: (r[5], r[0])):
+        city_pools = pools.get(normalise_city(city), {})
+        candidates = list(city_pools.values()) if food_type is ANY_FOOD else \
+            [city_pools[food_type]] if food_type in city_pools else []
+        while remaining > 0:
+            picked = pick(candidates, remaining)
+            if picked is None:
+                break
+            listing, pool = picked
+            pool.take(listing)
+            quantity, _, food_id = listing
+            assignments.append((food_id, receiver_id, request_id, quantity))
+            remaining -= quantity
+    return assignments
+
+
+# ---------------------- Writing ----------------------
+def write_claims(cursor, assignments, claimed_at):
+    #claim_ids holds the ids in claims (migration 0013), ids also stay taken once archived
+    cursor.execute("select greatest((select max(claim_id) from claim_ids), (select max(claim_id) from claims_archive), 0)")
+    next_id = cursor.fetchone()[0] + 1
+
+    buf = io.StringIO()
+    for offset, (food_id, receiver_id, _, _) in enumerate(assignments):
+        buf.write(f"{next_id + offset}\t{food_id}\t{receiver_id}\tPending\t{claimed_at:%Y-%m-%d %H:%M:%S}\n")
+    with cursor.copy("copy claims (claim_id, food_id, receiver_id, status, timestamp) from stdin") as copy:
+        copy.write(buf.getvalue())
+
+    allocated = {}
+    for _, _, request_id, quantity in assignments:
+        allocated[request_id] = allocated.get(request_id, 0) + quantity
+    cursor.execute("""
+        update receiver_requests q set
+            quantity_allocated = q.quantity_allocated + a.quantity,
+            status = case when q.quantity_allocated + a.quantity >= q.quantity then 'Fulfilled' else q.status end
+        from unnest(%s::integer[], %s::integer[]) as a(request_id, quantity)
+        where q.request_id = a.request_id
+    """, (list(allocated), list(allocated.values())))
+    return len(allocated)
+
+
+def run_round(conn, as_of=None, dry_run=False):
+    as_of = as_of or datetime.date.today()
+    started = time.perf_counter()
+    with conn.transaction():
+        with conn.cursor() as cur:
+            #no one else can add claims mid-round, so a listing can't be claimed twice
+            cur.execute("lock table claims in share row exclusive mode")
+            requests = load_requests(cur)
+            cities = {normalise_city(request[2]) for request in requests} - {None}
+            pools = build_listing_pools(load_listings(cur, as_of, cities)) if cities else {}
+            listings = sum(len(pool.by_size) for city in pools.values() for pool in city.values())
+            loaded = time.perf_counter()
+
+            assignments = match(pools, requests)
+            matched = time.perf_counter()
+
+            requests_served = write_claims(cur, assignments, datetime.datetime.now()) if assignments else 0
+            if dry_run:
+                raise psycopg.Rollback()    #leaves the transaction block, undoing the writes
+
+    return {
+        "open_listings": listings,      #in the cities of the open requests
+        "open_requests": len(requests),
+        "claims_created": len(assignments),
+        "requests_served": requests_served,
+        "quantity_allocated": sum(a[3] for a in assignments),
+        "load_seconds": round(loaded - started, 3),
+        "match_seconds": round(matched - loaded, 3),
+        "total_seconds": round(time.perf_counter() - started, 3),
+        "dry_run": dry_run,
+    }
+
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one batch allocation round of open listings to open requests.")
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, help="treat this date as today (YYYY-MM-DD)")
+    parser.add_argument("--dry-run", action="store_true", help="match and report, but write nothing")
+    args = parser.parse_args(argv)
+
+    with psycopg.connect(**DB_CONFIG) as conn:
+        stats = run_round(conn, args.as_of, args.dry_run)
+    for key, value in stats.items():
+        print(f"{key:<20}{value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+import psycopg
+
+import fetch
+from config import DB_CONFIG
+from migrate import catalog_queries
+
+# ---------------------- Benchmark ----------------------
+# runs every catalog query (live and summary-table versions) several times against the configured
+# database and records p50/p95 latency, rows returned and shared buffer hits/reads from one
+# EXPLAIN (ANALYZE, BUFFERS). Results go to a json file so two runs can be compared.
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * pct / 100
+    low, high = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def buffer_stats(cur, query, params):
+    cur.execute("explain (analyze, buffers, format json) " + query.strip().rstrip(";"), params)
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    top = plan[0]["Plan"]      #buffer counts on the top node include every child node
+    return {
+        "shared_hit_blocks": top.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": top.get("Shared Read Blocks", 0),
+        "planning_ms": plan[0].get("Planning Time"),
+        "execution_ms": plan[0].get("Execution Time"),
+    }
+
+
+def bench_query(conn, query, params=None, runs=5, warmup=1):
+    timings = []
+    rows = 0
+    with conn.cursor() as cur:
+        for i in range(warmup + runs):
+            started = time.perf_counter()
+            cur.execute(query, params)
+            rows = len(cur.fetchall())
+            elapsed = (time.perf_counter() - started) * 1000
+            if i >= warmup:
+                timings.append(elapsed)
+        buffers = buffer_stats(cur, query, params)
+    conn.rollback()
+    return {
+        "runs": runs,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "min_ms": round(min(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "rows": rows,
+        **buffers,
+    }
+
+
+def table_sizes(conn):
+    rows = conn.execute("""
+        select relname, reltuples::bigint from pg_class
+        where relname in ('providers', 'receivers', 'food_listings', 'claims')""").fetchall()
+    conn.rollback()
+    return dict(rows)
+
+
+def run_benchmark(conn, runs=5, warmup=1, only=None):
+    results = []
+    for name, source, query, params in catalog_queries():
+        if only and only not in name:
+            continue
+        try:
+            result = bench_query(conn, query, params, runs, warmup)
+        except psycopg.DatabaseError as e:
+            conn.rollback()
+            result = {"error": str(e).strip()}
+        results.append({"query": name, "source": source, **result})
+        print(f"[{source:<14}] {name[:60]:<60} "
+              + (f"p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  rows {result['rows']}"
+                 if "error" not in result else f"ERROR {result['error']}"))
+    return {
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "server_version": conn.info.server_version,
+        "table_sizes": table_sizes(conn),
+        "runs": runs,
+        "results": results,
+    }
+
+
+# ---------------------- Fetch Benchmark ----------------------
+# the same large results read four ways: tuples + DataFrame (how the pages used to do it),
+# fetch.fetch_df with numpy columns, with numpy columns but without the compact types of schema.py
+# (what df MB was before them), and with Arrow-backed columns.
+# peak memory is what tracemalloc sees, so it leaves out Arrow's own buffers.
+FETCH_QUERIES = {
+    "all claims": "select * from claims",
+    "listings with provider": """
+        select f.*, p.name as provider_name, p.city, p.contact
+        from food_listings f join providers p on p.provider_id = f.provider_id""",
+    "claims with listing": """
+        select c.claim_id, c.timestamp, c.status, f.food_name, f.food_type, f.quantity, f.expiry_date
+        from claims c join food_listings f on f.food_id = c.food_id""",
+}
+
+
+def fetchall_df(cursor, query):
+    cursor.execute(query)
+    colnames = [desc[0] for desc in cursor.description]
+    return pd.DataFrame(cursor.fetchall(), columns=colnames)
+
+
+FETCH_METHODS = {
+    "fetchall + DataFrame": fetchall_df,
+    "fetch_df numpy": lambda cursor, query: fetch.fetch_df(cursor, query, dtype_backend="numpy"),
+    "fetch_df plain types": lambda cursor, query: fetch.fetch_df(cursor, query, dtype_backend="numpy", compact=False),
+    "fetch_df pyarrow": lambda cursor, query: fetch.fetch_df(cursor, query, dtype_backend="pyarrow"),
+}
+
+
+def bench_fetch(conn, runs=5, warmup=1, only=None):
+    results = []
+    with conn.cursor() as cur:
+        for name, query in FETCH_QUERIES.items():
+            if only and only not in name:
+                continue
+            for method, fetch_fn in FETCH_METHODS.items():
+                if method.endswith("pyarrow") and not fetch.HAVE_ARROW:
+                    continue
+                timings = []
+                for i in range(warmup + runs):
+                    started = time.perf_counter()
+                    df = fetch_fn(cur, query)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    if i >= warmup:
+                        timings.append(elapsed)
+                del df
+                tracemalloc.start()
+                df = fetch_fn(cur, query)
+                peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                tracemalloc.stop()
+                result = {
+                    "query": name,
+                    "method": method,
+                    "rows": len(df),
+                    "p50_ms": round(percentile(timings, 50), 3),
+                    "p95_ms": round(percentile(timings, 95), 3),
+                    "peak_mb": round(peak_mb, 1),
+                    "df_mb": round(df.memory_usage(deep=True).sum() / (1024 * 1024), 1),
+                }
+                results.append(result)
+                print(f"{name:<24}{method:<22}rows {result['rows']:>9}  p50 {result['p50_ms']:>9.1f} ms  "
+                      f"p95 {result['p95_ms']:>9.1f} ms  peak {result['peak_mb']:>7.1f} MB  df {result['df_mb']:>7.1f} MB")
+                del df
+    conn.rollback()
+    return {
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "server_version": conn.info.server_version,
+        "table_sizes": table_sizes(conn),
+        "runs": runs,
+        "fetch_results": results,
+    }
+
+
+# ---------------------- App Benchmark ----------------------
+# cold start is the first run of app.py in a fresh interpreter (streamlit itself already imported, as
+# it is in a running server); reruns are timed per page after the page has been opened once.
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+COLD_START_SCRIPT = f"""
+import time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({APP_PATH!r}, default_timeout=120)
+started = time.perf_counter()
+at.run()
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def bench_app(runs=5, warmup=1, only=None):
+    from streamlit.testing.v1 import AppTest
+    import views
+
+    cold = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT], capture_output=True, text=True,
+                             check=True, cwd=os.path.dirname(APP_PATH))
+        cold.append(float(out.stdout.split()[-1]))
+    print(f"{'cold start':<32}p50 {percentile(cold, 50):>9.1f} ms  p95 {percentile(cold, 95):>9.1f} ms")
+
+    results = [{"page": "cold start", "p50_ms": round(percentile(cold, 50), 1), "p95_ms": round(percentile(cold, 95), 1)}]
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    for page in views.PAGES:
+        if only and only not in page:
+            continue
+        started = time.perf_counter()
+        at.sidebar.radio[0].set_value(page).run()
+        first_ms = (time.perf_counter() - started) * 1000
+        timings = []
+        for i in range(warmup + runs):
+            started = time.perf_counter()
+            at.run()
+            if i >= warmup:
+                timings.append((time.perf_counter() - started) * 1000)
+        result = {"page": page, "first_visit_ms": round(first_ms, 1),
+                  "p50_ms": round(percentile(timings, 50), 1), "p95_ms": round(percentile(timings, 95), 1)}
+        results.append(result)
+        print(f"{page:<32}p50 {result['p50_ms']:>9.1f} ms  p95 {result['p95_ms']:>9.1f} ms  first visit {first_ms:>8.1f} ms")
+    return {
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "runs": runs,
+        "app_results": results,
+    }
+
+
+# ---------------------- Comparing Runs ----------------------
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = {(r["query"], r["source"]): r for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+
+    print(f"{'query':<62}{'source':<16}{'p50 before':>12}{'p50 after':>12}{'speedup':>9}")
+    for r in after:
+        old = before.get((r["query"], r["source"]))
+        if not old or "error" in old or "error" in r:
+            continue
+        speedup = old["p50_ms"] / r["p50_ms"] if r["p50_ms"] else float("inf")
+        print(f"{r['query'][:60]:<62}{r['source']:<16}{old['p50_ms']:>12.2f}{r['p50_ms']:>12.2f}{speedup:>8.1f}x")
+
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every catalog query against the configured database.")
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per query")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before timing")
+    parser.add_argument("--only", help="only queries whose name contains this text")
+    parser.add_argument("--out", default="bench_results.json", help="where to save the results")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two saved runs and exit")
+    parser.add_argument("--fetch", action="store_true", help="compare fetchall + DataFrame with fetch.fetch_df on large results")
+    parser.add_argument("--app", action="store_true", help="time app.py cold start and per page reruns")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if args.app:
+        report = bench_app(args.runs, args.warmup, args.only)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\nresults saved to {args.out}")
+        return
+
+    with psycopg.connect(**DB_CONFIG) as conn:
+        if args.fetch:
+            report = bench_fetch(conn, args.runs, args.warmup, args.only)
+        else:
+            report = run_benchmark(conn, args.runs, args.warmup, args.only)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nresults saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import csv
+import io
+import time
+
+import pandas as pd
+import psycopg
+from psycopg import sql
+
+import metadata
+
+# ---------------------- Bulk CRUD ----------------------
+# a batch of rows (csv upload or a table pasted from a spreadsheet) is checked against the table's
+# columns and types first, then the rows that pass go to the database in one transaction:
+#   add     INSERT ... ON CONFLICT (pk) DO UPDATE, so sending a row again updates it (claims, whose key
+#           has no unique index to conflict on, gets an UPDATE and an INSERT for the keys it didn't find)
+#   update  UPDATE ... WHERE pk = %s, only the columns present in the batch
+#   delete  DELETE ... WHERE pk = ANY(%s)
+# add and update go out with executemany inside a pipeline, so the batch costs about one round trip
+# instead of one per row. If the database refuses the batch it is replayed row by row under
+# savepoints to find the rows at fault, the same way loader.py handles a failed COPY.
+ACTIONS = ["Add", "Update", "Delete"]
+
+INT_TYPES = {"smallint", "integer", "bigint"}
+FLOAT_TYPES = {"real", "double precision", "numeric"}
+DATE_TYPES = {"date", "timestamp without time zone", "timestamp with time zone"}
+# the formats of the original csv files, anything else has to be ISO 8601
+DATE_FORMATS = ["%m/%d/%Y", "%m/%d/%Y %H:%M"]
+SEPARATORS = ",\t;|"
+
+
+def table_schema(cursor, table):
+    #[{name, type, not_null, has_default, pk, ...}] in column order, generated columns can't be written
+    return [col for col in metadata.columns(cursor, table) if not col["generated"]]
+
+
+def read_batch(source):
+    #uploaded file or pasted text -> DataFrame of raw strings, empty cells are NaN.
+    #the separator is sniffed from the header, a paste from a spreadsheet is tab separated
+    text = source if isinstance(source, str) else source.read().decode("utf-8-sig")
+    text = text.strip()
+    try:
+        sep = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=SEPARATORS).delimiter
+    except csv.Error:
+        sep = ","       #a single column
+    df = pd.read_csv(io.StringIO(text), sep=sep, dtype=str, keep_default_na=False, na_values=[""])
+    df.columns = [col.strip().lower() for col in df.columns]
+    return df
+
+
+# ---------------------- Validation ----------------------
+def parse_dates(raw):
+    parsed = pd.Series(pd.NaT, index=raw.index, dtype="datetime64[us]")
+    for fmt in DATE_FORMATS + ["ISO8601"]:
+        missing = parsed.isna() & raw.notna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(raw[missing], format=fmt, errors="coerce")
+    return parsed
+
+
+def validate(df, schema, action):
+    #returns (rows that can be sent, rejected rows with a reason), both keep the batch's row numbers
+    by_name = {col["name"]: col for col in schema}
+    pk = [col["name"] for col in schema if col["pk"]]
+    unknown = [col for col in df.columns if col not in by_name]
+    if unknown:
+        raise ValueError(f"unknown columns {unknown}, the table has {list(by_name)}")
+    missing_pk = [col for col in pk if col not in df.columns]
+    if missing_pk:
+        raise ValueError(f"the primary key {missing_pk} is missing")
+    if action == "Add":
+        required = [c["name"] for c in schema if c["not_null"] and not c["has_default"] and c["name"] not in df.columns]
+        if required:
+            raise ValueError(f"columns {required} can't be null and have no default")
+    if action == "Delete":
+        df = df[pk]
+    elif action == "Update" and len(df.columns) == len(pk):
+        raise ValueError("nothing to update, the batch only has the primary key")
+
+    parsed = df.copy()
+    reasons = pd.Series("", index=df.index)
+    for name in df.columns:
+        col, raw = by_name[name], df[name]
+        if col["type"] in INT_TYPES:
+            parsed[name] = pd.to_numeric(raw, errors="coerce").astype("Int64")
+            reasons[raw.notna() & parsed[name].isna()] += f"invalid integer in {name}; "
+        elif col["type"] in FLOAT_TYPES:
+            parsed[name] = pd.to_numeric(raw, errors="coerce")
+            reasons[raw.notna() & parsed[name].isna()] += f"invalid number in {name}; "
+        elif col["type"] in DATE_TYPES:
+            parsed[name] = parse_dates(raw)
+            reasons[raw.notna() & parsed[name].isna()] += f"invalid date in {name}; "
+        if col["not_null"] and action != "Delete":
+            reasons[raw.isna()] += f"missing {name}; "
+
+    duplicated = parsed.duplicated(subset=pk, keep="last") & parsed[pk].notna().all(axis=1)
+    reasons[duplicated] += "primary key repeated further down the batch; "
+
+    rejected = reasons != ""
+    rejects = df[rejected].assign(reason=reasons[rejected].str.rstrip("; "))
+    return parsed[~rejected], rejects
+
+
+# ---------------------- Statements ----------------------
+def upsert_query(table, columns, pk):
+    updates = [col for col in columns if col not in pk]
+    conflict = (sql.SQL("do update set ") + sql.SQL(", ").join(
+        sql.SQL("{0} = excluded.{0}").format(sql.Identifier(col)) for col in updates)) if updates else sql.SQL("do nothing")
+    #the subquery in RETURNING sees the table as it was before the statement, so it tells a new key from
+    #an existing one (xmax = 0 would too, but partitioned tables like claims can't return system columns)
+    existed = sql.SQL("exists (select 1 from {} as t where {})").format(
+        sql.Identifier(table),
+        sql.SQL(" and ").join(sql.SQL("t.{0} = {1}.{0}").format(sql.Identifier(col), sql.Identifier(table)) for col in pk))
+    return sql.SQL("insert into {} ({}) values ({}) on conflict ({}) {} returning not {}").format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(map(sql.Identifier, columns)),
+        sql.SQL(", ").join(sql.Placeholder() * len(columns)),
+        sql.SQL(", ").join(map(sql.Identifier, pk)),
+        conflict,
+        existed,
+    )
+
+
+def keyed_upsert_query(table, columns, pk, types):
+    #upsert for a table in metadata.KEYS, one statement per row like upsert_query. The row is updated if
+    #its key exists, inserted if not; a concurrent insert of the same key fails on the key's own check
+    #(claim_ids) instead of adding it twice. The values are cast: an untyped NULL in VALUES would be text
+    updates = [col for col in columns if col not in pk]
+    match = sql.SQL(" and ").join(sql.SQL("t.{0} = b.{0}").format(sql.Identifier(col)) for col in pk)
+    if updates:
+        existing = sql.SQL("update {} as t set {} from batch as b where {} returning 1").format(
+            sql.Identifier(table),
+            sql.SQL(", ").join(sql.SQL("{0} = b.{0}").format(sql.Identifier(col)) for col in updates),
+            match)
+    else:
+        existing = sql.SQL("select 1 from {} as t, batch as b where {}").format(sql.Identifier(table), match)
+    return sql.SQL("""
+        with batch ({cols}) as (values ({values})),
+            existing as ({existing}),
+            inserted as (insert into {table} ({cols}) select * from batch where not exists (select 1 from existing) returning 1)
+        select not exists (select 1 from existing)
+    """).format(
+        table=sql.Identifier(table),
+        cols=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        values=sql.SQL(", ").join(sql.SQL("%s::{}").format(sql.SQL(types[col])) for col in columns),
+        existing=existing,
+    )
+
+
+def update_query(table, columns, pk):
+    return sql.SQL("update {} set {} where {} returning true").format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(sql.SQL("{} = %s").format(sql.Identifier(col)) for col in columns if col not in pk),
+        sql.SQL(" and ").join(sql.SQL("{} = %s").format(sql.Identifier(col)) for col in pk),
+    )
+
+
+def statement_params(rows, action, pk):
+    #DataFrame -> tuples of plain python values, NaN/NaT become NULL
+    values = rows.astype(object).where(rows.notna(), None)
+    if action == "Update":
+        values = values[[col for col in rows.columns if col not in pk] + pk]
+    return list(values.itertuples(index=False, name=None))
+
+
+def outcome(action, returned):
+    #what one statement's RETURNING row means
+    if action == "Add":
+        return "inserted" if returned[0] else "updated"
+    if action == "Delete":
+        return "deleted" if returned else "not found"
+    return "updated" if returned else "not found"
+
+
+# ---------------------- Applying ----------------------
+def run_pipelined(cur, action, query, params):
+    outcomes = []
+    with cur.connection.pipeline():
+        cur.executemany(query, params, returning=True)
+    while True:
+        outcomes.append(outcome(action, cur.fetchone()))
+        if not cur.nextset():
+            break
+    return outcomes
+
+
+def run_row_by_row(cur, action, query, params):
+    outcomes = []
+    for row in params:
+        try:
+            with cur.connection.transaction():     #savepoint, a bad row only undoes itself
+                cur.execute(query, row)
+                outcomes.append(outcome(action, cur.fetchone()))
+        except psycopg.DatabaseError as e:
+            outcomes.append("error: " + str(e).strip().splitlines()[0])
+    return outcomes
+
+
+def delete_rows(cur, table, rows, pk):
+    #one statement for the whole batch; keys it did not return were not there
+    if len(pk) == 1:
+        where = sql.SQL("{} = any(%s)").format(sql.Identifier(pk[0]))
+        params = [rows[pk[0]].astype(object).tolist()]
+    else:
+        where = sql.SQL("({}) in (select * from unnest({}))").format(
+            sql.SQL(", ").join(map(sql.Identifier, pk)), sql.SQL(", ").join(sql.Placeholder() * len(pk)))
+        params = [rows[col].astype(object).tolist() for col in pk]
+    cur.execute(sql.SQL("delete from {} where {} returning {}").format(
+        sql.Identifier(table), where, sql.SQL(", ").join(map(sql.Identifier, pk))), params)
+    deleted = set(cur.fetchall())
+    return ["deleted" if key in deleted else "not found" for key in rows[pk].astype(object).itertuples(index=False, name=None)]
+
+
+def apply_batch(conn, table, action, rows, schema, all_or_nothing=False):
+    #returns (per row results DataFrame, summary dict). Commits unless all_or_nothing and a row failed
+    pk = [col["name"] for col in schema if col["pk"]]
+    started = time.perf_counter()
+    mode = "pipelined batch"
+    with conn.cursor() as cur:
+        try:
+            with conn.transaction():
+                if action == "Delete":
+                    mode = "single statement"
+                    outcomes = delete_rows(cur, table, rows, pk)
+                else:
+                    if action == "Update":
+                        query = update_query(table, list(rows.columns), pk)
+                    elif table in metadata.KEYS:
+                        query = keyed_upsert_query(table, list(rows.columns), pk, {col["name"]: col["type"] for col in schema})
+                    else:
+                        query = upsert_query(table, list(rows.columns), pk)
+                    outcomes = run_pipelined(cur, action, query, statement_params(rows, action, pk)) if len(rows) else []
+        except psycopg.DatabaseError:
+            if all_or_nothing:
+                raise
+            mode = "row by row (the batch was refused)"
+            if action == "Delete":
+                query = sql.SQL("delete from {} where {} returning true").format(
+                    sql.Identifier(table),
+                    sql.SQL(" and ").join(sql.SQL("{} = %s").format(sql.Identifier(col)) for col in pk))
+                params = list(rows[pk].astype(object).itertuples(index=False, name=None))
+                outcomes = run_row_by_row(cur, action, query, params)
+            else:
+                outcomes = run_row_by_row(cur, action, query, statement_params(rows, action, pk))
+    conn.commit()
+    elapsed = time.perf_counter() - started
+
+    results = rows[pk].assign(result=outcomes)
+    counts = results["result"].str.split(":").str[0].value_counts().to_dict()
+    return results, {
+        "rows": len(rows),
+        **counts,
+        "mode": mode,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(len(rows) / elapsed) if elapsed else None,
+    }
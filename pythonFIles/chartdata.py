@@ -0,0 +1,119 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+import query_cache
+import snapshot
+import summaries
+from config import CHART_MAX_POINTS, CHART_TOP_N
+
+# ---------------------- Chart Data ----------------------
+# what the pages hand to Plotly, kept to a few hundred points or bars however big the tables get
+# (every point is serialised into the page and drawn by the browser):
+#   - time series are bucketed in SQL by day, week or month depending on the span asked for, from the
+#     per day counts in claims_daily when the summary tables are installed (claims itself otherwise)
+#   - a series still longer than CHART_MAX_POINTS is downsampled with LTTB, which keeps its shape
+#   - category charts keep the CHART_TOP_N biggest categories and put the rest in one "Other" bar
+#     (for averages the unweighted mean of the folded ones, and labelled so)
+# the tables shown above the charts still have every row.
+RESOLUTIONS = ["Auto", "day", "week", "month"]
+
+CLAIMS_PER_BUCKET_SQL = """
+    select date_trunc(%s, timestamp)::date as claim_date, count(claim_id) as count from claims
+    where timestamp >= %s
+    group by 1
+    order by 1
+"""
+CLAIMS_SPAN_SQL = """
+    select min(timestamp)::date as first_claim, max(timestamp)::date as last_claim from claims
+    where timestamp >= %s
+"""
+# the same from claims_daily, one row per day and status instead of one per claim
+CLAIMS_PER_BUCKET_SUMMARY_SQL = """
+    select date_trunc(%s, claim_date::timestamp)::date as claim_date, sum(claims)::bigint as count from claims_daily
+    where claim_date >= %s
+    group by 1
+    order by 1
+"""
+CLAIMS_SPAN_SUMMARY_SQL = """
+    select min(claim_date) as first_claim, max(claim_date) as last_claim from claims_daily
+    where claim_date >= %s
+"""
+
+
+def time_bucket(first, last):
+    #about 90 daily points, up to ~105 weekly ones, monthly beyond two years
+    days = (last - first).days
+    if days <= 92:
+        return "day"
+    if days <= 731:
+        return "week"
+    return "month"
+
+
+def run(cursor, query, params):
+    #cached like the catalog queries; the snapshot when the page runs without a connection
+    if cursor is None:
+        return snapshot.catalog_query(query, params)[0]
+    return query_cache.cached_query(cursor, query, params, tables=["claims"])
+
+
+def claims_series(cursor, since=None, resolution="Auto", max_points=CHART_MAX_POINTS, live=False):
+    #(claim_date/count DataFrame, bucket used). since is a date, None for every claim.
+    #live reads claims even when claims_daily is there (the page's "force live" checkbox)
+    since = since or datetime.date.min
+    summary = cursor is not None and not live and summaries.installed(cursor)
+    span_sql, bucket_sql = (CLAIMS_SPAN_SUMMARY_SQL, CLAIMS_PER_BUCKET_SUMMARY_SQL) if summary else (CLAIMS_SPAN_SQL, CLAIMS_PER_BUCKET_SQL)
+    bucket = resolution
+    if resolution == "Auto":
+        first, last = run(cursor, span_sql, (since,)).iloc[0]
+        if pd.isna(first):
+            return pd.DataFrame({"claim_date": [], "count": []}), "day"
+        bucket = time_bucket(first, last)
+    df = run(cursor, bucket_sql, (bucket, since))
+    return lttb(df, "claim_date", "count", max_points), bucket
+
+
+# ---------------------- Downsampling ----------------------
+def lttb(df, x, y, n_out=CHART_MAX_POINTS):
+    #Largest-Triangle-Three-Buckets (Steinarsson, 2013): keeps the first and last rows and, from each of
+    #n_out - 2 equal slices in between, the row making the largest triangle with the row kept before it
+    #and the mean of the next slice. Peaks and dips survive, unlike with plain averaging
+    n = len(df)
+    if n <= n_out or n_out < 3:
+        return df
+    xs = df[x].to_numpy()
+    xs = xs.astype("datetime64[ns]").astype("int64").astype(float) if np.issubdtype(xs.dtype, np.datetime64) else xs.astype(float)
+    ys = df[y].to_numpy(dtype=float)
+
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(int)      #slice i is rows edges[i]:edges[i+1]
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        cx, cy = xs[nxt_lo:nxt_hi].mean(), ys[nxt_lo:nxt_hi].mean()
+        area = np.abs((xs[a] - cx) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (cy - ys[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return df.iloc[keep]
+
+
+# ---------------------- Categories ----------------------
+def top_n(df, label, value, n=CHART_TOP_N, other="Other", color=None, agg="sum"):
+    #the n labels with the largest total value, every other label folded into one `other` row (one per
+    #color when the chart is split by color). agg="mean" for values that are averages: the rows carry no
+    #counts to weight them by, so `other` is the unweighted mean of the folded averages and says so
+    if agg == "mean":
+        other = f"{other} (unweighted mean)"
+    totals = df.groupby(label, sort=False)[value].sum()
+    if len(totals) <= n:
+        return df
+    labels = df[label].astype(object) if isinstance(df[label].dtype, pd.CategoricalDtype) else df[label]
+    folded = df.assign(**{label: labels.where(labels.isin(totals.nlargest(n).index), other)})
+    keys = [label] + ([color] if color else [])
+    folded = folded.groupby(keys, sort=False, as_index=False)[value].agg(agg)
+    is_other = folded[label] == other
+    return pd.concat([folded[~is_other], folded[is_other]], ignore_index=True)      #"Other" last
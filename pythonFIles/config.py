@@ -0,0 +1,82 @@
+import os
+
+# ---------------------- Database Settings ----------------------
+# defaults are the local setup the app and notebook were written against,
+# every value can be overridden with an environment variable
+DB_CONFIG = {
+    "dbname": os.environ.get("FOODWASTE_DB_NAME", "foodwaste"),
+    "user": os.environ.get("FOODWASTE_DB_USER", "postgres"),
+    "password": os.environ.get("FOODWASTE_DB_PASSWORD", "admin"),
+    "host": os.environ.get("FOODWASTE_DB_HOST", "localhost"),
+    "port": int(os.environ.get("FOODWASTE_DB_PORT", "5432")),
+}
+
+# ---------------------- Data Files ----------------------
+DATA_DIR = os.environ.get("FOODWASTE_DATA_DIR", "data")
+
+# Parquet snapshots for offline analytics (snapshot.py), the newest SNAPSHOT_KEEP are kept
+SNAPSHOT_DIR = os.environ.get("FOODWASTE_SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_KEEP = int(os.environ.get("FOODWASTE_SNAPSHOT_KEEP", "2"))
+
+# ---------------------- Maintenance ----------------------
+# maintenance.py: monthly claims partitions created this many months ahead, listings expired longer
+# than ARCHIVE_AFTER_DAYS (with only settled claims) moved to the archive tables, ARCHIVE_BATCH_SIZE per transaction
+CLAIMS_PARTITIONS_AHEAD = int(os.environ.get("FOODWASTE_CLAIMS_PARTITIONS_AHEAD", "3"))
+ARCHIVE_AFTER_DAYS = int(os.environ.get("FOODWASTE_ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("FOODWASTE_ARCHIVE_BATCH_SIZE", "5000"))
+
+# ---------------------- Allocation ----------------------
+# allocation.py: the oldest open requests served per round, the rest wait for the next one
+ALLOCATION_MAX_REQUESTS = int(os.environ.get("FOODWASTE_ALLOCATION_MAX_REQUESTS", "50000"))
+
+# ---------------------- Connection Pool ----------------------
+# every Streamlit session borrows one of these connections per page render
+POOL_MIN_SIZE = int(os.environ.get("FOODWASTE_POOL_MIN_SIZE", "2"))
+POOL_MAX_SIZE = int(os.environ.get("FOODWASTE_POOL_MAX_SIZE", "10"))
+POOL_TIMEOUT = float(os.environ.get("FOODWASTE_POOL_TIMEOUT", "10"))    #seconds to wait for a free connection
+# the overview page runs its queries side by side on a separate async pool
+ASYNC_POOL_MAX_SIZE = int(os.environ.get("FOODWASTE_ASYNC_POOL_MAX_SIZE", "8"))
+OVERVIEW_QUERY_TIMEOUT = float(os.environ.get("FOODWASTE_OVERVIEW_QUERY_TIMEOUT", "15"))     #seconds per query
+
+# ---------------------- Query Result Cache ----------------------
+CACHE_TTL_SECONDS = float(os.environ.get("FOODWASTE_CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_MB = float(os.environ.get("FOODWASTE_CACHE_MAX_MB", "256"))
+# table columns/keys are cached per process, a schema change shows up within this many seconds
+METADATA_TTL_SECONDS = float(os.environ.get("FOODWASTE_METADATA_TTL_SECONDS", "30"))
+
+# ---------------------- Query Instrumentation ----------------------
+QUERY_LOG_SIZE = int(os.environ.get("FOODWASTE_QUERY_LOG_SIZE", "5000"))     #calls kept in memory
+SLOW_QUERY_MS = float(os.environ.get("FOODWASTE_SLOW_QUERY_MS", "500"))
+QUERY_LOG_PATH = os.environ.get("FOODWASTE_QUERY_LOG", "")      #json lines file for slow/failed calls, off when empty
+QUERY_LOG_EXPORT_DIR = os.environ.get("FOODWASTE_QUERY_LOG_EXPORT_DIR", "query_logs")    #the Query Log page's exports
+
+# ---------------------- Charts ----------------------
+# chartdata.py: longest series and most bars/categories a chart is sent
+CHART_MAX_POINTS = int(os.environ.get("FOODWASTE_CHART_MAX_POINTS", "500"))
+CHART_TOP_N = int(os.environ.get("FOODWASTE_CHART_TOP_N", "25"))
+
+# ---------------------- Live Updates ----------------------
+# live.py: pages check for changes other sessions/processes made this often, without a database call
+LIVE_UPDATES = os.environ.get("FOODWASTE_LIVE_UPDATES", "1") not in ("0", "false", "no")
+LIVE_REFRESH_SECONDS = float(os.environ.get("FOODWASTE_LIVE_REFRESH_SECONDS", "2"))
+LIVE_EVENT_LOG_SIZE = int(os.environ.get("FOODWASTE_LIVE_EVENT_LOG_SIZE", "1000"))     #changes kept in memory
+
+# ---------------------- Result Fetching ----------------------
+# "numpy" or "pyarrow" (Arrow-backed DataFrame columns, needs pyarrow installed)
+FETCH_DTYPE_BACKEND = os.environ.get("FOODWASTE_FETCH_DTYPE_BACKEND", "numpy")
+
+# ---------------------- Export ----------------------
+# export.py: downloads are streamed by a small http server running next to the app, because Streamlit's
+# download button holds the whole file in memory. Each app process runs its own (its links only work on
+# it) on the first free port of EXPORT_PORT .. EXPORT_PORT + EXPORT_PORTS - 1. EXPORT_URL is how browsers
+# reach it (http://localhost:<port> when empty), set it when the app is not opened on localhost; a
+# {port} in it is replaced by the port the process listens on
+EXPORT_HOST = os.environ.get("FOODWASTE_EXPORT_HOST", "localhost")
+EXPORT_PORT = int(os.environ.get("FOODWASTE_EXPORT_PORT", "8510"))
+EXPORT_PORTS = int(os.environ.get("FOODWASTE_EXPORT_PORTS", "8"))
+EXPORT_URL = os.environ.get("FOODWASTE_EXPORT_URL", "")
+EXPORT_MAX_RUNNING = int(os.environ.get("FOODWASTE_EXPORT_MAX_RUNNING", "4"))     #each export runs on its own connection
+EXPORT_LINK_TTL_SECONDS = float(os.environ.get("FOODWASTE_EXPORT_LINK_TTL_SECONDS", "900"))
+EXPORT_CHUNK_KB = int(os.environ.get("FOODWASTE_EXPORT_CHUNK_KB", "256"))     #csv sent in pieces of about this size
+EXPORT_GZIP_LEVEL = int(os.environ.get("FOODWASTE_EXPORT_GZIP_LEVEL", "1"))
+EXPORT_ROW_GROUP_ROWS = int(os.environ.get("FOODWASTE_EXPORT_ROW_GROUP_ROWS", "100000"))     #parquet rows per row group
@@ -0,0 +1,197 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import loader
+import schema
+
+# ---------------------- Synthetic Data ----------------------
+# writes the four csv files in the same layout as the real ones (headers, date formats), so loader.py
+# loads them unchanged. Everything comes from numpy generators seeded per (seed, table, block),
+# the same seed and scale always give byte-identical files whatever the machine.
+BLOCK_ROWS = 1_000_000      #rows generated per block, fixed so the output never depends on memory settings
+
+#the categories are schema.py's, these weights follow the order of its lists
+PROVIDER_TYPE_WEIGHTS = [0.15, 0.25, 0.4, 0.2]      #restaurants most, catering services least
+RECEIVER_TYPE_WEIGHTS = [0.25, 0.25, 0.35, 0.15]    #NGOs most, shelters least
+FOOD_TYPE_WEIGHTS = [0.2, 0.45, 0.35]
+MEAL_TYPE_WEIGHTS = [0.2, 0.35, 0.15, 0.3]
+STATUS_WEIGHTS = [0.30, 0.55, 0.15]                 #more than half completed
+FOOD_NAMES = ["Bread", "Soup", "Fruits", "Vegetables", "Dairy", "Rice", "Pasta", "Salad",
+              "Chicken", "Fish", "Baked Goods", "Sandwiches", "Curry", "Lentils", "Eggs"]
+
+START_DATE = np.datetime64("2024-01-01")
+DAYS = 730      #claims and expiry dates are spread over two years
+
+
+def skewed_index(rng, n_items, size, skew=1.1):
+    #power-law pick of 0..n_items-1: a few big cities/providers get most of the rows, like real data.
+    #inverse of the continuous power-law cdf, so no n_items sized probability table is ever built
+    u = rng.random(size)
+    if skew == 1.0:
+        x = np.power(n_items + 1.0, u)
+    else:
+        x = np.power(1.0 + u * (np.power(n_items + 1.0, 1.0 - skew) - 1.0), 1.0 / (1.0 - skew))
+    return np.clip(x.astype(np.int64) - 1, 0, n_items - 1)
+
+
+def city_names(n):
+    return np.array([f"City {i:05d}" for i in range(n)], dtype=object)
+
+
+def city_centres(seed, n):
+    #fixed random spots inside the continental US, everyone in a city is placed around its centre
+    rng = rng_for(seed, "cities", 0)
+    return rng.uniform(25.0, 49.0, n), rng.uniform(-124.0, -67.0, n)
+
+
+def around(rng, centres, city_index):
+    #roughly +-10 km around the city centre
+    lat, lon = centres
+    n = len(city_index)
+    return (np.round(lat[city_index] + rng.normal(0, 0.05, n), 6),
+            np.round(lon[city_index] + rng.normal(0, 0.06, n), 6))
+
+
+def scale_sizes(claims, providers=None, receivers=None, listings=None, cities=None):
+    return {
+        "claims": claims,
+        "food_listings": listings or max(1_000, claims // 2),
+        "providers": providers or max(100, claims // 100),
+        "receivers": receivers or max(100, claims // 50),
+        "cities": cities or int(min(5_000, max(20, claims ** 0.5 / 3))),
+    }
+
+
+def rng_for(seed, table, block):
+    return np.random.default_rng([seed, sum(map(ord, table)), block])
+
+
+def blocks(total):
+    for block, start in enumerate(range(0, total, BLOCK_ROWS)):
+        yield block, start, min(BLOCK_ROWS, total - start)
+
+
+def phone_numbers(rng, n):
+    digits = rng.integers(200_000_0000, 999_999_9999, n)
+    return pd.Series(digits).astype(str).radd("+1-")
+
+
+# ---------------------- Tables ----------------------
+def provider_block(rng, start, n, sizes, context):
+    cities, centres = context
+    ids = np.arange(start + 1, start + n + 1)
+    city_index = skewed_index(rng, len(cities), n)
+    latitude, longitude = around(rng, centres, city_index)
+    return pd.DataFrame({
+        "Provider_ID": ids,
+        "Name": pd.Series(ids).astype(str).radd("Provider "),
+        "Type": rng.choice(schema.PROVIDER_TYPES, n, p=PROVIDER_TYPE_WEIGHTS),
+        "Address": pd.Series(rng.integers(1, 9999, n)).astype(str) + " Main Street",
+        "City": cities[city_index],
+        "Contact": phone_numbers(rng, n),
+        "Latitude": latitude,
+        "Longitude": longitude,
+    })
+
+
+def receiver_block(rng, start, n, sizes, context):
+    cities, centres = context
+    ids = np.arange(start + 1, start + n + 1)
+    city_index = skewed_index(rng, len(cities), n)
+    latitude, longitude = around(rng, centres, city_index)
+    return pd.DataFrame({
+        "Receiver_ID": ids,
+        "Name": pd.Series(ids).astype(str).radd("Receiver "),
+        "Type": rng.choice(schema.RECEIVER_TYPES, n, p=RECEIVER_TYPE_WEIGHTS),
+        "City": cities[city_index],
+        "Contact": phone_numbers(rng, n),
+        "Latitude": latitude,
+        "Longitude": longitude,
+    })
+
+
+def listing_block(rng, start, n, sizes, providers):
+    ids = np.arange(start + 1, start + n + 1)
+    #busy providers list a lot more than quiet ones
+    provider_index = skewed_index(rng, len(providers), n, skew=0.8)
+    expiry = START_DATE + rng.integers(0, DAYS, n).astype("timedelta64[D]")
+    return pd.DataFrame({
+        "Food_ID": ids,
+        "Food_Name": rng.choice(FOOD_NAMES, n),
+        "Quantity": rng.integers(1, 51, n),
+        "Expiry_Date": pd.to_datetime(expiry).strftime("%m/%d/%Y"),
+        "Provider_ID": providers["Provider_ID"].to_numpy()[provider_index],
+        "Provider_Type": providers["Type"].to_numpy()[provider_index],
+        "Location": providers["City"].to_numpy()[provider_index],
+        "Food_Type": rng.choice(schema.FOOD_TYPES, n, p=FOOD_TYPE_WEIGHTS),
+        "Meal_Type": rng.choice(schema.MEAL_TYPES, n, p=MEAL_TYPE_WEIGHTS),
+    })
+
+
+def claim_block(rng, start, n, sizes, _):
+    ids = np.arange(start + 1, start + n + 1)
+    minutes = rng.integers(0, DAYS * 24 * 60, n).astype("timedelta64[m]")
+    return pd.DataFrame({
+        "Claim_ID": ids,
+        "Food_ID": skewed_index(rng, sizes["food_listings"], n, skew=0.6) + 1,
+        "Receiver_ID": skewed_index(rng, sizes["receivers"], n, skew=0.7) + 1,
+        "Status": rng.choice(schema.STATUSES, n, p=STATUS_WEIGHTS),
+        "Timestamp": pd.to_datetime(START_DATE + minutes).strftime("%m/%d/%Y %H:%M"),
+    })
+
+
+def write_table(path, total, make_block, seed, table, sizes, context):
+    with open(path, "w", newline="") as f:
+        for block, start, n in blocks(total):
+            df = make_block(rng_for(seed, table, block), start, n, sizes, context)
+            df.to_csv(f, header=block == 0, index=False)
+
+
+def generate(out_dir, sizes, seed=42):
+    os.makedirs(out_dir, exist_ok=True)
+    files = dict(loader.TABLES)
+    cities = (city_names(sizes["cities"]), city_centres(seed, sizes["cities"]))
+    stats = {}
+
+    def timed(table, total, make_block, context):
+        started = time.perf_counter()
+        write_table(os.path.join(out_dir, files[table]), total, make_block, seed, table, sizes, context)
+        stats[table] = {"rows": total, "seconds": round(time.perf_counter() - started, 2)}
+
+    timed("providers", sizes["providers"], provider_block, cities)
+    timed("receivers", sizes["receivers"], receiver_block, cities)
+    #listings copy type and city from their provider, so read back only those columns
+    providers = pd.read_csv(os.path.join(out_dir, files["providers"]), usecols=["Provider_ID", "Type", "City"])
+    timed("food_listings", sizes["food_listings"], listing_block, providers)
+    timed("claims", sizes["claims"], claim_block, None)
+    return stats
+
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic food waste csv files.")
+    parser.add_argument("--claims", type=float, default=1e4, help="number of claims, e.g. 1e4 .. 1e8")
+    parser.add_argument("--listings", type=int, help="default: claims / 2")
+    parser.add_argument("--providers", type=int, help="default: claims / 100")
+    parser.add_argument("--receivers", type=int, help="default: claims / 50")
+    parser.add_argument("--cities", type=int, help="default grows with sqrt(claims)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="synthetic_data", help="output folder")
+    parser.add_argument("--load", action="store_true", help="bulk load the files with loader.py afterwards")
+    args = parser.parse_args(argv)
+
+    sizes = scale_sizes(int(args.claims), args.providers, args.receivers, args.listings, args.cities)
+    print("generating", ", ".join(f"{k}={v:,}" for k, v in sizes.items()))
+    for table, s in generate(args.out, sizes, args.seed).items():
+        print(f"  {table:<15}{s['rows']:>14,} rows {s['seconds']:>8}s")
+
+    if args.load:
+        loader.print_report(loader.load_all(args.out, reject_dir=os.path.join(args.out, "rejects")))
+
+
+if __name__ == "__main__":
+    main()
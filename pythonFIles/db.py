@@ -0,0 +1,106 @@
+import asyncio
+import contextvars
+import threading
+from contextlib import contextmanager
+
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+import instrument
+from config import ASYNC_POOL_MAX_SIZE, DB_CONFIG, POOL_MAX_SIZE, POOL_MIN_SIZE, POOL_TIMEOUT
+
+# ---------------------- Connection Pool ----------------------
+# one pool per server process, shared by every session
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                kwargs={**DB_CONFIG, "cursor_factory": instrument.TimedCursor},     #every query is timed
+                min_size=POOL_MIN_SIZE,
+                max_size=POOL_MAX_SIZE,
+                timeout=POOL_TIMEOUT,
+                check=ConnectionPool.check_connection,     #replace connections the server dropped
+                name="foodwaste",
+                open=True,
+            )
+    return _pool
+
+
+@contextmanager
+def connection():
+    #borrow a connection for one unit of work, it runs in its own transaction:
+    #committed when the block ends normally, rolled back on error, then handed back to the pool
+    with get_pool().connection() as conn:
+        yield conn
+
+
+# ---------------------- Async Connection Pool ----------------------
+# Streamlit runs every session in a plain thread, so AsyncConnections live on one event loop that
+# runs in a background thread for the whole process. Work is handed to it with submit().
+_loop = None
+_loop_lock = threading.Lock()
+_async_pool = None
+_async_pool_lock = asyncio.Lock()
+
+
+def get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.SelectorEventLoop()     #psycopg can't use the Windows proactor loop
+            threading.Thread(target=_loop.run_forever, name="foodwaste-async", daemon=True).start()
+    return _loop
+
+
+def submit(coro):
+    #run coro on the background loop, returns a concurrent.futures.Future.
+    #it runs in a copy of the caller's context, so the session's page (instrument.page) comes along
+    context = contextvars.copy_context()
+
+    async def run():
+        return await asyncio.get_running_loop().create_task(coro, context=context)
+
+    return asyncio.run_coroutine_threadsafe(run(), get_loop())
+
+
+async def get_async_pool():
+    global _async_pool
+    async with _async_pool_lock:
+        if _async_pool is None:
+            pool = AsyncConnectionPool(
+                kwargs={**DB_CONFIG, "cursor_factory": instrument.TimedAsyncCursor},
+                min_size=1,
+                max_size=ASYNC_POOL_MAX_SIZE,
+                timeout=POOL_TIMEOUT,
+                check=AsyncConnectionPool.check_connection,
+                name="foodwaste-async",
+                open=False,
+            )
+            await pool.open()
+            _async_pool = pool
+    return _async_pool
+
+
+# ---------------------- Pool Statistics ----------------------
+def pool_stats():
+    #zeros until the first page that needs the database opens the pool
+    stats = _pool.get_stats() if _pool is not None else {}
+    checkouts = stats.get("requests_num", 0)
+    wait_ms = stats.get("requests_wait_ms", 0)
+    return {
+        "pool_size": stats.get("pool_size", 0),
+        "pool_available": stats.get("pool_available", 0),
+        "pool_min": stats.get("pool_min", 0),
+        "pool_max": stats.get("pool_max", 0),
+        "requests_waiting": stats.get("requests_waiting", 0),
+        "checkouts": checkouts,
+        "queued_checkouts": stats.get("requests_queued", 0),
+        "checkout_errors": stats.get("requests_errors", 0),
+        "total_wait_ms": wait_ms,
+        "avg_wait_ms": round(wait_ms / checkouts, 2) if checkouts else 0.0,
+        "usage_ms": stats.get("usage_ms", 0),
+    }
@@ -0,0 +1,387 @@
+import argparse
+import io
+import itertools
+import re
+import secrets
+import sys
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psycopg
+
+import catalog
+import fetch
+import instrument
+import schema
+from config import (DB_CONFIG, EXPORT_CHUNK_KB, EXPORT_GZIP_LEVEL, EXPORT_HOST, EXPORT_LINK_TTL_SECONDS,
+                    EXPORT_MAX_RUNNING, EXPORT_PORT, EXPORT_PORTS, EXPORT_ROW_GROUP_ROWS, EXPORT_URL)
+
+# ---------------------- Streaming Export ----------------------
+# a table or catalog query written out without ever holding the whole result: COPY (query) TO STDOUT
+# hands the rows over as the server produces them, one row per read, and they leave as
+#   - csv: in pieces of about EXPORT_CHUNK_KB
+#   - csv.gz: the same pieces through one gzip stream, EXPORT_GZIP_LEVEL 1 by default: the stream is
+#     cpu bound and level 6 takes five times as long for a file about 15% smaller
+#   - parquet: one row group per EXPORT_ROW_GROUP_ROWS rows, parsed with fetch.py's csv reader into the
+#     column types fetch_df gives them (categoricals become dictionary columns) and sent once written
+# so memory is one piece or one row group whatever the size of the result, and the first bytes go out
+# as soon as the first piece is full. Rows are read only as fast as they are written: a slow download
+# slows the COPY down instead of piling rows up in memory.
+FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "csv.gz": ("application/gzip", ".csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+
+def formats():
+    return [fmt for fmt in FORMATS if fmt != "parquet" or fetch.HAVE_ARROW]
+
+
+def csv_query(query):
+    #NULL as an empty field, which is what other tools expect from a csv
+    return f"copy ({query}) to stdout (format csv, header true)"
+
+
+@contextmanager
+def connection(conninfo=None):
+    #a connection of its own, outside the pool: an export can take minutes and must not hold one the pages
+    #need. autocommit and read only, so a download abandoned halfway is ended by closing the connection
+    kwargs = {"autocommit": True, "cursor_factory": instrument.TimedCursor,
+              "options": "-c default_transaction_read_only=on"}
+    conn = psycopg.connect(conninfo, **kwargs) if conninfo else psycopg.connect(**DB_CONFIG, **kwargs)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def copy_rows(cursor, statement, params):
+    with cursor.copy(statement, params) as copy:
+        while data := copy.read():
+            yield data
+
+
+def copy_chunks(cursor, statement, params, size):
+    #COPY output joined into pieces of at least size bytes. Reads are one row each, so the loop is kept tight
+    buf = bytearray()
+    with cursor.copy(statement, params) as copy:
+        read = copy.read
+        while data := read():
+            buf += data
+            if len(buf) >= size:
+                yield bytes(buf)
+                buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+def stream_csv(cursor, query, params):
+    return copy_chunks(cursor, csv_query(query), params, EXPORT_CHUNK_KB * 1024)
+
+
+def stream_gzip(cursor, query, params):
+    gz = zlib.compressobj(EXPORT_GZIP_LEVEL, wbits=31)      #31: gzip header and trailer, readable by gunzip and pandas
+    for chunk in stream_csv(cursor, query, params):
+        if data := gz.compress(chunk):
+            yield data
+    yield gz.flush()
+
+
+# ---------------------- Parquet ----------------------
+class Sink:
+    #file object the ParquetWriter writes into, emptied after every row group
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def unique_names(names):
+    #parquet readers want distinct column names, result columns may share one (two "count"s)
+    seen, unique = {}, []
+    for name in names:
+        seen[name] = seen.get(name, 0) + 1
+        unique.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return unique
+
+
+def arrow_schema(columns):
+    import pyarrow as pa
+
+    fields = []
+    for name, (_, type_name, col_type) in zip(unique_names([col[0] for col in columns]), columns):
+        if schema.is_category(col_type):
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        elif type_name == "date":
+            fields.append(pa.field(name, pa.date32()))
+        elif type_name in ("int2", "int4"):
+            fields.append(pa.field(name, pa.int32()))      #the csv reader parses every int as int64
+        else:
+            fields.append(pa.field(name, fetch.arrow_type(type_name)))
+    return pa.schema(fields)
+
+
+def row_groups(cursor, query, params, target):
+    #the result of query as arrow tables of EXPORT_ROW_GROUP_ROWS rows with schema target, read with COPY
+    columns = fetch.describe(cursor, query, params)
+
+    def row_group(buf):
+        return fetch.arrow_table(buf, columns, compact=True, skip_rows=0).rename_columns(target.names).cast(target)
+
+    buf, rows = io.BytesIO(), 0
+    for row in copy_rows(cursor, fetch.copy_query(query, header=False), params):
+        buf.write(row)
+        rows += 1
+        if rows == EXPORT_ROW_GROUP_ROWS:
+            yield row_group(buf)
+            buf, rows = io.BytesIO(), 0
+    if rows:
+        yield row_group(buf)
+
+
+def stream_parquet(cursor, query, params):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    target = arrow_schema(fetch.describe(cursor, query, params))
+    sink = Sink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), target)
+    for table in row_groups(cursor, query, params, target):
+        writer.write_table(table)
+        yield sink.drain()
+    writer.close()      #the footer
+    yield sink.drain()
+
+
+# ---------------------- Entry Points ----------------------
+def stream(cursor, query, params=None, fmt="csv"):
+    #the export as an iterator of bytes; nothing is read from the server before the first one is asked for
+    query = fetch.strip_query(cursor, query)
+    params = params or None     #no parameters: a literal % in the sql stays a %
+    if fmt == "csv":
+        return stream_csv(cursor, query, params)
+    if fmt == "csv.gz":
+        return stream_gzip(cursor, query, params)
+    if fmt == "parquet" and fetch.HAVE_ARROW:
+        return stream_parquet(cursor, query, params)
+    raise ValueError(f"unknown export format {fmt}")
+
+
+def write(cursor, query, params, fmt, out):
+    #stream into the binary file out -> (bytes written, ms until the first bytes)
+    started = time.perf_counter()
+    written, first_ms = 0, None
+    for data in stream(cursor, query, params, fmt):
+        if first_ms is None:
+            first_ms = (time.perf_counter() - started) * 1000
+        out.write(data)
+        written += len(data)
+    return written, first_ms
+
+
+def resolve(source, since=None, city=None):
+    #(name, sql, params) for a table name, a catalog query name or a part of one that matches only one
+    if source in catalog.TABLES:
+        return source, f"select * from {source}", None
+    queries = {**catalog.ANALYTICS_QUERIES, **catalog.LEARNER_QUERIES}
+    matches = [source] if source in queries else [name for name in queries if source.lower() in name.lower()]
+    if len(matches) != 1:
+        found = "".join(f"\n  {name}" for name in matches) or " nothing"
+        raise ValueError(f"'{source}' must name a table or exactly one catalog query, it matches:{found}")
+    name = matches[0]
+    if name == catalog.CITY_SEARCH_QUERY:
+        if not city:
+            raise ValueError("the city search needs --city")
+        return name, catalog.CITY_SEARCH_SQL, (f"%{city}%",)
+    if since is not None and name in catalog.CLAIMS_SINCE_QUERIES:
+        return name, catalog.CLAIMS_SINCE_QUERIES[name], (since,)
+    return name, queries[name], None
+
+
+def file_name(name, fmt):
+    stem = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+    if len(stem) > 60:
+        stem = stem[:61].rsplit("_", 1)[0]     #whole words only
+    return (stem or "export") + FORMATS[fmt][1]
+
+
+# ---------------------- Download Server ----------------------
+# st.download_button needs the whole file in memory (a callable passed as data too) before the browser
+# gets a byte, so the pages link to this server instead. A page registers what it would export and
+# gets a link; opening it runs the export on its own connection and sends it with chunked transfer
+# encoding, so a download that fails halfway shows as failed instead of as a short file.
+# links only name registered exports (random token, EXPORT_LINK_TTL_SECONDS), never sql.
+# the links are kept by the process that registered them, so every app process runs its own server on
+# the first free port of EXPORT_PORT .. EXPORT_PORT + EXPORT_PORTS - 1 and its links name that port.
+_links = {}         #token -> {"query", "params", "fmt", "file_name", "expires"}
+_tokens = {}        #(query, params, fmt) -> token, a page rerun gets the link it already has
+_links_lock = threading.Lock()
+_running = threading.BoundedSemaphore(EXPORT_MAX_RUNNING)
+
+_server = None
+_server_error = None
+_server_lock = threading.Lock()
+
+
+class DownloadHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        link = lookup(self.path.rstrip("/").rsplit("/", 1)[-1])
+        if link is None:
+            self.send_error(404, "Unknown or expired export link, export again from the page")
+            return
+        if not _running.acquire(blocking=False):
+            self.send_error(503, f"{EXPORT_MAX_RUNNING} exports are already running, try again shortly")
+            return
+        started = False
+        try:
+            with connection() as conn:
+                data = stream(conn.cursor(), link["query"], link["params"], link["fmt"])
+                first = next(data, b"")     #a failing query still gets an error page
+                self.send_response(200)
+                self.send_header("Content-Type", FORMATS[link["fmt"]][0])
+                self.send_header("Content-Disposition", f'attachment; filename="{link["file_name"]}"')
+                self.send_header("Transfer-Encoding", "chunked")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                started = True
+                for chunk in itertools.chain([first], data):
+                    if chunk:
+                        self.wfile.write(b"%X\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass        #the browser went away, closing the connection ends the COPY
+        except Exception as e:     #after the headers the unfinished chunked body shows the failure
+            if not started:
+                self.send_error(500, "Export failed", str(e).strip())      #the reason in the page, not the status line
+        finally:
+            _running.release()
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass        #the exports are in the query log (instrument.py)
+
+
+def lookup(token):
+    now = time.time()
+    with _links_lock:
+        for expired in [t for t, link in _links.items() if link["expires"] < now]:
+            link = _links.pop(expired)
+            _tokens.pop((link["query"], link["params"], link["fmt"]), None)
+        return _links.get(token)
+
+
+def get_server():
+    #the process's download server, started on first use; None (and the reason) when it can't listen
+    global _server, _server_error
+    with _server_lock:
+        if _server is None and _server_error is None:
+            last = EXPORT_PORT + max(EXPORT_PORTS, 1) - 1
+            for port in range(EXPORT_PORT, last + 1):
+                try:
+                    _server = ThreadingHTTPServer((EXPORT_HOST, port), DownloadHandler)
+                    break
+                except OSError as e:
+                    error = e       #taken by another app process (or something else), try the next one
+            if _server is None:
+                ports = EXPORT_PORT if last == EXPORT_PORT else f"{EXPORT_PORT}-{last}"
+                _server_error = f"can't listen on {EXPORT_HOST}:{ports} ({error.strerror or error})"
+            else:
+                _server.daemon_threads = True
+                threading.Thread(target=_server.serve_forever, name="foodwaste-export", daemon=True).start()
+        return _server, _server_error
+
+
+def register(query, params, fmt, name):
+    #a download link for the export, None when the download server isn't running
+    server, _ = get_server()
+    if server is None:
+        return None
+    params = tuple(params) if params else None
+    key = (query, params, fmt)
+    with _links_lock:
+        token = _tokens.get(key) or secrets.token_urlsafe(16)
+        _tokens[key] = token
+        _links[token] = {"query": query, "params": params, "fmt": fmt, "file_name": file_name(name, fmt),
+                         "expires": time.time() + EXPORT_LINK_TTL_SECONDS}
+    return f"{link_base(server.server_address[1]).rstrip('/')}/export/{token}"
+
+
+def link_base(port):
+    #how browsers reach the server on port: EXPORT_URL, with {port} filled in when it has one
+    return EXPORT_URL.replace("{port}", str(port)) if EXPORT_URL else f"http://localhost:{port}"
+
+
+# ---------------------- Export Panel ----------------------
+def panel(cursor, query, params=None, name="export", key="export"):
+    #format picker and download link under a page's result, the export reads the database again
+    import streamlit as st
+
+    with st.expander("⬇ Export"):
+        fmt_col, link_col = st.columns([1, 3])
+        fmt = fmt_col.selectbox("Format", formats(), key=f"{key}_export_format")
+        url = register(fetch.strip_query(cursor, query), params, fmt, name)
+        if url is None:
+            link_col.caption(f"Export unavailable: {get_server()[1]}. From a terminal: python export.py")
+        else:
+            link_col.link_button(f"Download {file_name(name, fmt)}", url)
+            link_col.caption("Streamed straight from the database, the whole result whatever its size")
+
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a table or catalog query into a csv, csv.gz or parquet file.")
+    parser.add_argument("source", help="a table, or a catalog query name (any part of it that matches only one)")
+    parser.add_argument("--format", choices=formats(), default="csv")
+    parser.add_argument("--out", help="file to write, - for stdout (default: named after the source)")
+    parser.add_argument("--since", type=date.fromisoformat, help="claims queries: only the claims made since this date")
+    parser.add_argument("--city", help="city search query: the city, partial names match")
+    parser.add_argument("--conninfo", help="libpq connection string, overrides config.py")
+    args = parser.parse_args(argv)
+
+    try:
+        name, query, params = resolve(args.source, args.since, args.city)
+    except ValueError as e:
+        sys.exit(str(e))
+    out_path = args.out or file_name(name, args.format)
+
+    started = time.perf_counter()
+    with connection(args.conninfo) as conn:
+        if out_path == "-":
+            try:
+                written, first_ms = write(conn.cursor(), query, params, args.format, sys.stdout.buffer)
+            except BrokenPipeError:     #piped into head or similar, which stopped reading
+                sys.stdout = None
+                return
+        else:
+            with open(out_path, "wb") as out:
+                written, first_ms = write(conn.cursor(), query, params, args.format, out)
+    print(f"{name}: {written / (1024 * 1024):.1f} MB written to {out_path} in {time.perf_counter() - started:.2f} s, "
+          f"first bytes after {first_ms or 0:.0f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import fetch
+
+# ---------------------- Nearby Food ----------------------
+# listings are located at their provider. With PostGIS the radius search runs on the GiST index
+# (migration 0005); without it the provider coordinates are cached in an in-process grid and
+# only the unexpired listings of providers inside the radius are read from the database.
+EARTH_RADIUS_KM = 6371.0
+GRID_CELL_DEGREES = 0.25        #about 28 km north-south
+GRID_TTL_SECONDS = 300          #rebuild the grid from the providers table this often
+
+LISTING_COLUMNS = """
+    f.food_id, f.food_name, f.quantity, f.expiry_date, f.food_type, f.meal_type,
+    p.provider_id, p.name as provider_name, p.city, p.contact, p.latitude, p.longitude"""
+
+# listings someone has already collected are not offered again
+NOT_COLLECTED = """
+    not exists (select 1 from claims c where c.food_id = f.food_id and c.status = 'Completed')"""
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def postgis_enabled(cursor):
+    cursor.execute("""
+        select exists (select 1 from pg_attribute
+                       where attrelid = 'providers'::regclass and attname = 'geog' and not attisdropped)""")
+    return cursor.fetchone()[0]
+
+
+# ---------------------- PostGIS Search ----------------------
+def nearby_postgis(cursor, lat, lon, radius_km, limit):
+    return fetch.fetch_df(cursor, f"""
+        with me as (select st_setsrid(st_makepoint(%(lon)s, %(lat)s), 4326)::geography as point)
+        select {LISTING_COLUMNS},
+            round((st_distance(p.geog, me.point) / 1000)::numeric, 2) as distance_km
+        from me
+        join providers p on st_dwithin(p.geog, me.point, %(radius_m)s)
+        join food_listings f on f.provider_id = p.provider_id
+        where f.expiry_date >= current_date and {NOT_COLLECTED}
+        order by distance_km, f.expiry_date
+        limit %(limit)s
+    """, {"lat": lat, "lon": lon, "radius_m": radius_km * 1000, "limit": limit})
+
+
+# ---------------------- Grid Search ----------------------
+class ProviderGrid:
+    #provider coordinates bucketed into GRID_CELL_DEGREES cells: cell -> (ids, lat, lon) arrays
+    def __init__(self, ids, lat, lon, cell=GRID_CELL_DEGREES):
+        self.cell = cell
+        self.size = len(ids)
+        self.built_at = time.monotonic()
+        rows = np.floor(lat / cell).astype(np.int64)
+        cols = np.floor(lon / cell).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        ids, lat, lon, rows, cols = ids[order], lat[order], lon[order], rows[order], cols[order]
+        starts = np.flatnonzero(np.r_[True, (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])])
+        ends = np.r_[starts[1:], len(ids)]
+        self.cells = {
+            (int(rows[s]), int(cols[s])): (ids[s:e], lat[s:e], lon[s:e]) for s, e in zip(starts, ends)
+        }
+
+    def within(self, lat, lon, radius_km):
+        #every cell the radius can reach, then the exact distance on the few providers inside them
+        rows, cols = self.cell_ranges(lat, lon, radius_km)
+        found = [self.cells[(r, c)] for r in rows for c in cols if (r, c) in self.cells]
+        if not found:
+            return np.array([], dtype=np.int64), np.array([])
+        ids = np.concatenate([f[0] for f in found])
+        distance = haversine_km(lat, lon, np.concatenate([f[1] for f in found]), np.concatenate([f[2] for f in found]))
+        keep = distance <= radius_km
+        return ids[keep], distance[keep]
+
+    def cell_ranges(self, lat, lon, radius_km):
+        #rows and columns of the cells around the circle. Its widest longitude span is poleward of lat,
+        #asin(sin r / cos lat); a circle over a pole spans every longitude, one over the antimeridian
+        #takes columns from both ends
+        r = radius_km / EARTH_RADIUS_KM
+        south, north = lat - np.degrees(r), lat + np.degrees(r)
+        if south <= -90 or north >= 90 or np.sin(r) >= np.cos(np.radians(lat)):
+            spans = [(-180.0, 180.0)]
+        else:
+            dlon = np.degrees(np.arcsin(np.sin(r) / np.cos(np.radians(lat))))
+            west, east = lon - dlon, lon + dlon
+            if west < -180:
+                spans = [(-180.0, east), (west + 360, 180.0)]
+            elif east > 180:
+                spans = [(west, 180.0), (-180.0, east - 360)]
+            else:
+                spans = [(west, east)]
+        rows = range(self.index(max(south, -90.0)), self.index(min(north, 90.0)) + 1)
+        cols = [c for west, east in spans for c in range(self.index(west), self.index(east) + 1)]
+        return rows, cols
+
+    def index(self, degrees):
+        return int(np.floor(degrees / self.cell))
+
+
+_grid = None
+_grid_lock = threading.Lock()
+
+
+def provider_grid(cursor, refresh=False):
+    #one grid per server process, shared by every session and rebuilt after GRID_TTL_SECONDS
+    global _grid
+    with _grid_lock:
+        if refresh or _grid is None or time.monotonic() - _grid.built_at > GRID_TTL_SECONDS:
+            df = fetch.fetch_df(cursor, """
+                select provider_id, latitude, longitude from providers
+                where latitude is not null and longitude is not null""", dtype_backend="numpy")
+            _grid = ProviderGrid(df["provider_id"].to_numpy(np.int64),
+                                 df["latitude"].to_numpy(np.float64), df["longitude"].to_numpy(np.float64))
+        return _grid
+
+
+def nearby_grid(cursor, lat, lon, radius_km, limit):
+    provider_ids, distances = provider_grid(cursor).within(lat, lon, radius_km)
+    if len(provider_ids) == 0:
+        return pd.DataFrame()
+    #distances go along with the ids so sorting and the limit still happen in the database
+    return fetch.fetch_df(cursor, f"""
+        with near as (select * from unnest(%s::integer[], %s::float8[]) as n(provider_id, distance_km))
+        select {LISTING_COLUMNS},
+            round(n.distance_km::numeric, 2) as distance_km
+        from near n
+        join providers p on p.provider_id = n.provider_id
+        join food_listings f on f.provider_id = n.provider_id
+        where f.expiry_date >= current_date and {NOT_COLLECTED}
+        order by n.distance_km, f.expiry_date
+        limit %s
+    """, (provider_ids.tolist(), distances.tolist(), limit))
+
+
+# ---------------------- Entry Point ----------------------
+def nearby_listings(cursor, lat, lon, radius_km, limit=100):
+    #returns (listings sorted by distance then expiry, index used, milliseconds)
+    started = time.perf_counter()
+    if postgis_enabled(cursor):
+        df, method = nearby_postgis(cursor, lat, lon, radius_km, limit), "PostGIS GiST index"
+    else:
+        df, method = nearby_grid(cursor, lat, lon, radius_km, limit), "in-process grid index"
+    return df, method, round((time.perf_counter() - started) * 1000, 1)
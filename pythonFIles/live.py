@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+from collections import deque
+
+import psycopg
+import streamlit as st
+
+import db
+import query_cache
+from config import DB_CONFIG, LIVE_EVENT_LOG_SIZE, LIVE_REFRESH_SECONDS, LIVE_UPDATES
+
+# ---------------------- Live Updates ----------------------
+# triggers on the four tables NOTIFY the ids every committed statement changed (migrations 0011, 0014).
+# one listener thread per server process holds a LISTEN connection and, for every notification:
+#   - drops the cached results that read the table (query_cache), writes from other processes included
+#   - appends (sequence number, table, ids) to an in-memory log the sessions read
+# a live section of a page (section below) checks that log every LIVE_REFRESH_SECONDS without touching
+# the database, and only when one of its tables changed loads again: the changed rows for a table
+# page, the aggregate for a dashboard query (a few summary table rows).
+# a notification carrying no ids (too many for one payload, or the listener reconnected and may have
+# missed some) means "anything in this table may have changed".
+CHANNEL = "foodwaste_changes"
+TABLES = ["providers", "receivers", "food_listings", "claims"]     #tables with notify triggers
+RECONNECT_SECONDS = 5
+
+_feed = None
+_feed_lock = threading.Lock()
+
+
+class ChangeFeed:
+    def __init__(self, size=LIVE_EVENT_LOG_SIZE):
+        self._events = deque(maxlen=size)      #(seq, table, ids or None), oldest first
+        self._seq = 0
+        self._lock = threading.Lock()
+        self.connected = False
+        self.received = 0
+        self.error = None
+
+    @property
+    def seq(self):
+        with self._lock:
+            return self._seq
+
+    def publish(self, table, keys):
+        #the cache goes first, so a session that sees the event can't get the old result back
+        query_cache.invalidate([table])
+        with self._lock:
+            self._seq += 1
+            self._events.append((self._seq, table, None if keys is None else frozenset(keys)))
+            self.received += 1
+
+    def changes(self, since, tables):
+        #(latest seq, {table: ids changed after since, None for "any"}), only tables that changed
+        with self._lock:
+            latest = self._seq
+            events = [event for event in self._events if event[0] > since]
+            missed = bool(self._events) and self._events[0][0] > since + 1     #older events fell off the log
+        changed = {}
+        if missed:
+            changed = {table: None for table in tables}
+        for _, table, keys in events:
+            if table not in tables:
+                continue
+            if keys is None or (table in changed and changed[table] is None):
+                changed[table] = None
+            else:
+                changed.setdefault(table, set()).update(keys)
+        return latest, changed
+
+    def listen(self):
+        #runs for the life of the process on its own connection, outside the pool
+        first = True
+        while True:
+            try:
+                with psycopg.connect(**DB_CONFIG, autocommit=True) as conn:
+                    conn.execute(f"listen {CHANNEL}")
+                    self.connected, self.error = True, None
+                    if not first:
+                        for table in TABLES:        #changes committed while we were away were missed
+                            self.publish(table, None)
+                    first = False
+                    for notify in conn.notifies():
+                        event = json.loads(notify.payload)
+                        self.publish(event["table"], event["keys"])
+            except (psycopg.Error, ValueError, KeyError) as e:
+                self.error = str(e).strip()
+            self.connected = False
+            time.sleep(RECONNECT_SECONDS)
+
+
+def get_feed():
+    #the process's feed, listening from the first call on; None when live updates are switched off
+    global _feed
+    if not LIVE_UPDATES:
+        return None
+    with _feed_lock:
+        if _feed is None:
+            _feed = ChangeFeed()
+            threading.Thread(target=_feed.listen, name="foodwaste-listen", daemon=True).start()
+    return _feed
+
+
+# ---------------------- Live Sections ----------------------
+def section(key, tables, load, draw, cursor):
+    #a part of a page that keeps itself current. load(cursor, previous, changes) -> data, draw(data).
+    #the page run loads it with the page's cursor and returns the data; after that a fragment reruns
+    #just this part every LIVE_REFRESH_SECONDS and loads again, on a pooled connection of its own, only
+    #when one of tables changed (changes as in ChangeFeed.changes). Drawn once when there is nothing to
+    #watch: no cursor (snapshot mode), none of tables has notify triggers, or live updates are off
+    tables = tuple(table for table in tables if table in TABLES)
+    feed = get_feed() if cursor is not None and tables else None
+    if feed is None:
+        data = load(cursor, None, None)
+        draw(data)
+        return data
+    seq = feed.seq      #taken before loading: a change landing meanwhile is loaded on the next check
+    data = load(cursor, None, None)
+    st.session_state[f"live_{key}"] = {"seq": seq, "data": data, "updated_at": None}
+    _refresh(key, tables, load, draw)
+    return data
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def _refresh(key, tables, load, draw):
+    state = st.session_state[f"live_{key}"]
+    feed = get_feed()
+    seq, changes = feed.changes(state["seq"], tables)
+    if changes:
+        try:
+            with db.connection() as conn:
+                state["data"] = load(conn.cursor(), state["data"], changes)
+            state["seq"], state["updated_at"] = seq, time.strftime("%H:%M:%S")
+        except psycopg.Error as e:
+            st.caption(f"⚠️ live update failed, retrying: {str(e).strip()}")
+    else:
+        state["seq"] = seq
+    draw(state["data"])
+    status = "🟢 live" if feed.connected else "⚪ live updates reconnecting"
+    st.caption(status + (f" · updated {state['updated_at']}" if state["updated_at"] else ""))
@@ -0,0 +1,249 @@
+import argparse
+import csv
+import io
+import os
+import time
+
+import pandas as pd
+import psycopg
+from psycopg import sql
+
+import schema
+from config import DATA_DIR, DB_CONFIG
+
+# ---------------------- Table Layout ----------------------
+# load order matters: claims -> food_listings -> providers/receivers foreign keys
+TABLES = [
+    ("providers", "providers_data.csv"),
+    ("receivers", "receivers_data.csv"),
+    ("food_listings", "food_listings_data.csv"),
+    ("claims", "claims_data.csv"),
+]
+
+COLUMNS = {
+    "providers": ["provider_id", "name", "type", "address", "city", "contact"],
+    "receivers": ["receiver_id", "name", "type", "city", "contact"],
+    "food_listings": ["food_id", "food_name", "quantity", "expiry_date", "provider_id",
+                      "provider_type", "location", "food_type", "meal_type"],
+    "claims": ["claim_id", "food_id", "receiver_id", "status", "timestamp"],
+}
+
+INT_COLUMNS = {
+    "providers": ["provider_id"],
+    "receivers": ["receiver_id"],
+    "food_listings": ["food_id", "quantity", "provider_id"],
+    "claims": ["claim_id", "food_id", "receiver_id"],
+}
+
+# loaded only when the csv has them (the original files have no coordinates)
+OPTIONAL_COLUMNS = {
+    "providers": ["latitude", "longitude"],
+    "receivers": ["latitude", "longitude"],
+}
+
+FLOAT_COLUMNS = {
+    "providers": ["latitude", "longitude"],
+    "receivers": ["latitude", "longitude"],
+}
+
+# same formats the notebook used with pd.to_datetime
+DATE_COLUMNS = {
+    "food_listings": {"expiry_date": "%m/%d/%Y"},
+    "claims": {"timestamp": "%m/%d/%Y %H:%M"},
+}
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+# ---------------------- Chunk Parsing ----------------------
+def csv_columns(chunk, table):
+    #chunk columns must already be lower case
+    missing = [col for col in COLUMNS[table] if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"{table}: csv is missing columns {missing}")
+    return COLUMNS[table] + [col for col in OPTIONAL_COLUMNS.get(table, []) if col in chunk.columns]
+
+
+def parse_chunk(chunk, table):
+    #csv headers are capitalised (Provider_ID, Expiry_Date...) while the table columns are lower case
+    chunk = chunk.rename(columns=str.lower)
+    raw = chunk[csv_columns(chunk, table)]
+    parsed = raw.copy()
+    reasons = pd.Series("", index=raw.index)
+
+    for col in INT_COLUMNS[table]:
+        parsed[col] = pd.to_numeric(raw[col], errors="coerce").astype("Int64")
+        bad = raw[col].notna() & parsed[col].isna()
+        reasons[bad] += f"invalid integer in {col}; "
+
+    for col in FLOAT_COLUMNS.get(table, []):
+        if col not in raw.columns:
+            continue
+        parsed[col] = pd.to_numeric(raw[col], errors="coerce")
+        bad = raw[col].notna() & parsed[col].isna()
+        reasons[bad] += f"invalid number in {col}; "
+
+    for col, fmt in DATE_COLUMNS.get(table, {}).items():
+        parsed[col] = pd.to_datetime(raw[col], format=fmt, errors="coerce")
+        bad = raw[col].notna() & parsed[col].isna()
+        reasons[bad] += f"invalid date in {col}; "
+
+    pk = COLUMNS[table][0]
+    reasons[raw[pk].isna()] += f"missing {pk}; "
+
+    rejected = reasons != ""
+    rejects = raw[rejected].assign(reject_reason=reasons[rejected].str.rstrip("; "))
+    return schema.apply(parsed[~rejected], table), rejects      #categoricals and int32 ids, see schema.py
+
+
+# ---------------------- Writing ----------------------
+def row_hashes(raw):
+    #64 bit hash per row of raw csv strings, stored as a signed bigint (sync.py compares against these)
+    return pd.util.hash_pandas_object(raw, index=False).to_numpy().view("int64")
+
+
+def save_fingerprints(cur, table, raw, loaded):
+    #the hash of every loaded row goes to sync_fingerprints (migration 0010), so the first sync.py run
+    #after a load only writes what changed since instead of parsing and staging every row again
+    key = COLUMNS[table][0]
+    cur.execute("""
+        insert into sync_fingerprints as f (table_name, key, row_hash)
+        select %s, key, row_hash from unnest(%s::bigint[], %s::bigint[]) as s(key, row_hash)
+        on conflict (table_name, key) do update set row_hash = excluded.row_hash, synced_at = now()
+    """, (table, loaded[key].astype("int64").tolist(), row_hashes(raw.loc[loaded.index]).tolist()))
+
+
+def copy_rows(cur, table, df):
+    #one COPY per chunk, the dataframe is serialised as csv straight into the COPY stream
+    query = sql.SQL("copy {} ({}) from stdin (format csv)").format(
+        sql.Identifier(table), sql.SQL(",").join(map(sql.Identifier, df.columns)))
+    buf = io.StringIO()
+    df.to_csv(buf, header=False, index=False, date_format="%Y-%m-%d %H:%M:%S")
+    with cur.copy(query) as copy:
+        copy.write(buf.getvalue())
+
+
+def insert_rows_one_by_one(cur, table, df):
+    #fallback when a COPY fails: find the rows the database refuses, keep the rest
+    query = sql.SQL("insert into {} ({}) values ({})").format(
+        sql.Identifier(table),
+        sql.SQL(",").join(map(sql.Identifier, df.columns)),
+        sql.SQL(",").join(sql.Placeholder() * len(df.columns)))
+    failed = []
+    for index, row in zip(df.index, df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)):
+        try:
+            with cur.connection.transaction():     #savepoint, a bad row only undoes itself
+                cur.execute(query, row)
+        except psycopg.DatabaseError as e:
+            failed.append((index, str(e).strip().splitlines()[0]))
+    return failed
+
+
+class RejectWriter:
+    #reject files are only created once a table actually has a bad row
+    def __init__(self, reject_dir, table):
+        self.path = os.path.join(reject_dir, f"{table}_rejects.csv")
+        self.file = None
+        self.writer = None
+        self.count = 0
+
+    def write(self, df):
+        if df.empty:
+            return
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.file = open(self.path, "w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(df.columns)
+        self.writer.writerows(df.astype(object).where(df.notna(), "").itertuples(index=False, name=None))
+        self.count += len(df)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+# ---------------------- Loading ----------------------
+def load_table(conn, table, csv_path, reject_dir="rejects", chunk_size=DEFAULT_CHUNK_SIZE):
+    loaded = 0
+    csv_mb = parsed_mb = 0.0     #memory of the chunks as read (text) and as parsed, summed over chunks
+    rejects = RejectWriter(reject_dir, table)
+    started = time.perf_counter()
+    with conn.transaction(), conn.cursor() as cur:
+        fingerprints = cur.execute("select to_regclass('sync_fingerprints') is not null").fetchone()[0]
+
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size, dtype=str, keep_default_na=False, na_values=[""]):
+            good, bad = parse_chunk(chunk, table)
+            rejects.write(bad)
+            csv_mb += schema.memory_mb(chunk)
+            parsed_mb += schema.memory_mb(good)
+
+            #every chunk is its own transaction so one bad chunk never undoes earlier ones
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    raw = chunk.rename(columns=str.lower)
+                    raw = raw[csv_columns(raw, table)]
+                    try:
+                        with conn.transaction():
+                            copy_rows(cur, table, good)
+                    except psycopg.DatabaseError:
+                        failed = insert_rows_one_by_one(cur, table, good)
+                        failed_index = [index for index, _ in failed]
+                        rejects.write(raw.loc[failed_index].assign(reject_reason=[reason for _, reason in failed]))
+                        good = good.drop(index=failed_index)
+                    loaded += len(good)
+                    if fingerprints and len(good):
+                        save_fingerprints(cur, table, raw, good)
+    finally:
+        rejects.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        "table": table,
+        "loaded": loaded,
+        "rejected": rejects.count,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(loaded / seconds) if seconds else 0,
+        "csv_mb": round(csv_mb, 1),
+        "parsed_mb": round(parsed_mb, 1),
+        "reject_file": rejects.path if rejects.count else None,
+    }
+
+
+def load_all(data_dir=DATA_DIR, reject_dir="rejects", chunk_size=DEFAULT_CHUNK_SIZE, tables=None, conninfo=None):
+    stats = []
+    with (psycopg.connect(conninfo) if conninfo else psycopg.connect(**DB_CONFIG)) as conn:
+        for table, filename in TABLES:
+            if tables and table not in tables:
+                continue
+            stats.append(load_table(conn, table, os.path.join(data_dir, filename), reject_dir, chunk_size))
+    return stats
+
+
+def print_report(stats):
+    print(f"{'table':<15}{'loaded':>12}{'rejected':>10}{'seconds':>10}{'rows/sec':>12}{'csv MB':>9}{'parsed MB':>11}")
+    for s in stats:
+        print(f"{s['table']:<15}{s['loaded']:>12}{s['rejected']:>10}{s['seconds']:>10}{s['rows_per_sec']:>12}"
+              f"{s['csv_mb']:>9}{s['parsed_mb']:>11}")
+        if s["reject_file"]:
+            print(f"  rejected rows written to {s['reject_file']}")
+
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk load the food waste csv files into Postgres with COPY.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="folder holding the four *_data.csv files")
+    parser.add_argument("--reject-dir", default="rejects", help="where rows that fail to load are written")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per COPY batch")
+    parser.add_argument("--table", action="append", choices=[t for t, _ in TABLES],
+                        help="only load this table (can be repeated)")
+    parser.add_argument("--conninfo", help="libpq connection string, overrides config.py")
+    args = parser.parse_args(argv)
+
+    stats = load_all(args.data_dir, args.reject_dir, args.chunk_size, args.table, args.conninfo)
+    print_report(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+
+import psycopg
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from bench import percentile
+from config import DB_CONFIG
+
+# ---------------------- Load Test ----------------------
+# N virtual users against one running app.py, talking to it the way a browser tab does: a websocket
+# to /_stcore/stream, one "rerun with these widget values" message per click, the page's elements
+# streamed back until the script run finishes. An interaction is timed from the click to that finish.
+# (AppTest can't do this: it runs one script at a time per process, so its sessions never overlap.)
+# every session loops over scenarios picked by weight, with a think time between clicks:
+#   - browse: View Tables, a random table, a few "Next" pages
+#   - catalog: a random query on one of the two catalog pages (a random period on the Learner page)
+#   - crud: Add, Update then Delete of a providers row, ids from KEY_BASE up so real rows are never touched
+# during think time the page's live sections (live.py) rerun on their own timer, as in a browser ("live refresh").
+# the concurrency levels run one after the other, each for --duration seconds with fresh sessions.
+# an interaction fails when the page shows an error or exception, or doesn't finish within --timeout.
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+TABLES = ["providers", "receivers", "food_listings", "claims"]
+CATALOG_PAGES = ["SQL Queries & Visualization", "Learner SQL Queries"]
+KEY_BASE = 2_000_000_000        #providers ids of the crud scenario, session n uses KEY_BASE + n * 100_000 up
+DEFAULT_MIX = "browse=5,catalog=3,crud=2"
+EARLY_FOR_RERUN = ForwardMsg.DESCRIPTOR.fields_by_name["script_finished"].enum_type.values_by_name[
+    "FINISHED_EARLY_FOR_RERUN"].number
+ALERT_ERROR = 1
+
+
+class LevelOver(Exception):
+    pass
+
+
+# ---------------------- Session ----------------------
+class Session:
+    #one browser tab: the widgets of the last run by label, and the values it sends back on every rerun
+    def __init__(self, url, number, results, deadline, timeout):
+        self.url = url
+        self.number = number
+        self.results = results      #shared list of (op, ms, error) for the current level
+        self.deadline = deadline
+        self.timeout = timeout
+        self.widgets = {}           #label -> (element type, proto)
+        self.states = {}            #widget id -> WidgetState sent with every rerun
+        self.fragments = {}         #st.fragment(run_every=...) of the page: fragment id -> [interval, next due]
+        self.next_key = KEY_BASE + number * 100_000
+        self.ws = None
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None,
+                                          open_timeout=self.timeout)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    def options(self, label):
+        return list(self.widgets[label][1].options)
+
+    def widget_state(self, label, value):
+        kind, proto = self.widgets[label]
+        ws = WidgetState(id=proto.id)
+        if kind == "button":
+            ws.trigger_value = True
+        elif kind == "multiselect":
+            ws.string_array_value.data[:] = value
+        elif kind == "number_input":
+            ws.double_value = value
+        elif kind == "checkbox":
+            ws.bool_value = value
+        else:                       #radio, selectbox, text_input
+            ws.string_value = str(value)
+        return kind, ws
+
+    async def rerun(self, changes=None, fragment_id=None):
+        #error text or None. Buttons only fire for this run, every other value is kept like the browser does.
+        #with fragment_id only that fragment of the page runs, as when the browser's timer fires
+        states = dict(self.states)
+        triggers = []
+        for label, value in (changes or {}).items():
+            if label not in self.widgets:
+                return f"no widget labelled {label!r} on the page"
+            kind, ws = self.widget_state(label, value)
+            if kind == "button":
+                triggers.append(ws)
+            else:
+                states[ws.id] = ws
+
+        msg = BackMsg()
+        msg.rerun_script.widget_states.widgets.extend(list(states.values()) + triggers)
+        if fragment_id:
+            msg.rerun_script.fragment_id = fragment_id
+        await self.ws.send(msg.SerializeToString())
+
+        error = None
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await asyncio.wait_for(self.ws.recv(), self.timeout))
+            kind = fwd.WhichOneof("type")
+            if kind == "new_session" and not fragment_id:      #a script run starts, st.rerun() included
+                self.widgets, self.fragments = {}, {}
+            elif kind == "auto_rerun":
+                self.fragments[fwd.auto_rerun.fragment_id] = [fwd.auto_rerun.interval,
+                                                              time.monotonic() + fwd.auto_rerun.interval]
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                element_type = element.WhichOneof("type")
+                proto = getattr(element, element_type)
+                if element_type == "exception":
+                    error = error or f"{proto.type}: {proto.message}"
+                elif element_type == "alert" and proto.format == ALERT_ERROR:
+                    error = error or proto.body
+                elif getattr(proto, "id", "").startswith("$$ID") and hasattr(proto, "label"):
+                    self.widgets[proto.label] = (element_type, proto)
+            elif kind == "script_finished" and fwd.script_finished != EARLY_FOR_RERUN:
+                break
+        if fragment_id:
+            return error
+        seen = {proto.id for _, proto in self.widgets.values()}
+        self.states = {wid: ws for wid, ws in states.items() if wid in seen}
+        return error
+
+    async def step(self, op, changes=None, fragment_id=None):
+        #one timed interaction; LevelOver once the level's time is up
+        if time.monotonic() >= self.deadline:
+            raise LevelOver()
+        started = time.perf_counter()
+        try:
+            error = await self.rerun(changes, fragment_id)
+        except (asyncio.TimeoutError, websockets.ConnectionClosed, OSError) as e:
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            await self.close()
+            await self.connect()        #a broken tab is reloaded
+            self.widgets, self.states, self.fragments = {}, {}, {}
+            await self.rerun()
+        if time.monotonic() < self.deadline:
+            self.results.append((op, (time.perf_counter() - started) * 1000, error))
+        return error
+
+    async def think(self, think_ms):
+        #while the user reads, the browser reruns the page's live fragments on their own timers
+        until = time.monotonic() + random.uniform(0.5, 1.5) * think_ms / 1000
+        while self.fragments:
+            fragment_id, (interval, due) = min(self.fragments.items(), key=lambda item: item[1][1])
+            if due >= until:
+                break
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            self.fragments[fragment_id][1] = due + interval
+            await self.step("live refresh", fragment_id=fragment_id)
+        await asyncio.sleep(max(0.0, until - time.monotonic()))
+
+
+# ---------------------- Scenarios ----------------------
+async def browse(session, think_ms):
+    await session.step("navigate", {"Go to": "View Tables"})
+    await session.think(think_ms)
+    await session.step("view table", {"Select Table": random.choice(TABLES)})
+    for _ in range(random.randint(0, 3)):
+        await session.think(think_ms)
+        await session.step("next page", {"Next ➡": True})
+
+
+async def catalog_query(session, think_ms):
+    await session.step("navigate", {"Go to": random.choice(CATALOG_PAGES)})
+    await session.think(think_ms)
+    changes = {"Choose a query to run": random.choice(session.options("Choose a query to run"))}
+    if "Period" in session.widgets:
+        changes["Period"] = random.choice(session.options("Period"))
+    await session.step("catalog query", changes)
+    city_label = next((label for label in session.widgets if label.startswith("Enter city name")), None)
+    if city_label:
+        await session.think(think_ms)
+        await session.step("catalog query", {city_label: random.choice(["port", "north", "lake"])})
+
+
+async def crud(session, think_ms):
+    key = session.next_key
+    session.next_key += 1
+    await session.step("navigate", {"Go to": "CRUD Operations"})
+    await session.think(think_ms)
+    await session.step("crud form", {"Choose the table": "providers", "Choose an action": "Add", "Rows": "One row"})
+    await session.think(think_ms)
+    row = {"provider_id": key, "name": f"Load test {key}", "type": "Restaurant", "address": f"{key} Test Street",
+           "city": "Loadtown", "contact": "000-000-0000", "latitude": 52.52, "longitude": 13.40}
+    add = {label: value for label, value in row.items() if label in session.widgets}
+    await session.step("crud add", {**add, "Execute": True})
+
+    await session.think(think_ms)
+    await session.step("crud form", {"Choose an action": "Update"})
+    await session.step("crud form", {"provider_id (Primary Key)": key, "Choose columns to update": ["city"]})
+    await session.think(think_ms)
+    await session.step("crud update", {"city": "Loadcity", "Execute": True})
+
+    await session.think(think_ms)
+    await session.step("crud form", {"Choose an action": "Delete"})
+    await session.step("crud delete", {"provider_id (Primary Key)": key, "Execute": True})
+
+
+SCENARIOS = {"browse": browse, "catalog": catalog_query, "crud": crud}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}, choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# ---------------------- Levels ----------------------
+async def virtual_user(url, number, results, deadline, mix, think_ms, timeout):
+    session = Session(url, number, results, deadline, timeout)
+    try:
+        started = time.perf_counter()
+        await session.connect()
+        error = await session.rerun()
+        results.append(("open app", (time.perf_counter() - started) * 1000, error))
+        while True:
+            scenario = random.choices(list(mix), weights=list(mix.values()))[0]
+            await SCENARIOS[scenario](session, think_ms)
+            await session.think(think_ms)
+    except LevelOver:
+        pass
+    except Exception as e:      #the session is lost, the level goes on with the others
+        results.append(("session", 0.0, f"{type(e).__name__}: {e}"))
+    finally:
+        await session.close()
+
+
+def summarize(sessions, results, seconds):
+    ms = [elapsed for _, elapsed, _ in results]
+    errors = [error for _, _, error in results if error]
+    level = {
+        "sessions": sessions,
+        "interactions": len(results),
+        "per_second": round(len(results) / seconds, 2),
+        "p50_ms": round(percentile(ms, 50), 1) if ms else None,
+        "p95_ms": round(percentile(ms, 95), 1) if ms else None,
+        "p99_ms": round(percentile(ms, 99), 1) if ms else None,
+        "max_ms": round(max(ms), 1) if ms else None,
+        "error_rate": round(len(errors) / len(results), 4) if results else 0.0,
+        "errors": sorted({error[:200] for error in errors})[:10],
+        "ops": {},
+    }
+    for op in sorted({op for op, _, _ in results}):
+        op_ms = [elapsed for name, elapsed, _ in results if name == op]
+        level["ops"][op] = {
+            "count": len(op_ms),
+            "p50_ms": round(percentile(op_ms, 50), 1),
+            "p95_ms": round(percentile(op_ms, 95), 1),
+            "errors": sum(1 for name, _, error in results if name == op and error),
+        }
+    return level
+
+
+async def run_level(url, sessions, seconds, mix, think_ms, timeout):
+    results = []
+    deadline = time.monotonic() + seconds
+    await asyncio.gather(*(virtual_user(url, n, results, deadline, mix, think_ms, timeout) for n in range(sessions)))
+    return summarize(sessions, results, seconds)
+
+
+def print_level(level):
+    print(f"{level['sessions']:>8}{level['interactions']:>14}{level['per_second']:>10}{level['p50_ms'] or 0:>10}"
+          f"{level['p95_ms'] or 0:>10}{level['p99_ms'] or 0:>10}{level['max_ms'] or 0:>10}{level['error_rate']:>9.1%}")
+    for op, s in level["ops"].items():
+        print(f"{'':>8}  {op:<20}{s['count']:>6}   p50 {s['p50_ms']:>9} ms  p95 {s['p95_ms']:>9} ms  errors {s['errors']}")
+    for error in level["errors"]:
+        print(f"{'':>8}  ! {error}")
+
+
+# ---------------------- Server ----------------------
+def start_server(port):
+    #a headless app.py of our own, stopped again at the end
+    server = subprocess.Popen([sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless", "true",
+                               "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+                              cwd=os.path.dirname(APP_PATH), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(120):
+        try:
+            with urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=1):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                sys.exit("streamlit exited before it was ready")
+            time.sleep(0.5)
+    server.terminate()
+    sys.exit("streamlit wasn't ready after 60 s")
+
+
+def cleanup():
+    #rows a crud scenario added but didn't get to delete before its level ended
+    with psycopg.connect(**DB_CONFIG) as conn:
+        return conn.execute("delete from providers where provider_id >= %s", (KEY_BASE,)).rowcount
+
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive a running app.py with many concurrent sessions and report latency.")
+    parser.add_argument("--port", type=int, default=8501, help="port the app listens on")
+    parser.add_argument("--start", action="store_true", help="start a headless app.py on --port for the test")
+    parser.add_argument("--sessions", default="1,2,4,8,16", help="concurrency levels, comma separated")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per level")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--think-ms", type=float, default=500, help="mean pause between a session's clicks")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds before an interaction counts as failed")
+    parser.add_argument("--seed", type=int, help="random seed, for repeatable click sequences")
+    parser.add_argument("--out", help="save the results to this json file")
+    parser.add_argument("--no-cleanup", action="store_true", help="leave load test providers rows in the database")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    levels = [int(n) for n in args.sessions.split(",")]
+    server = start_server(args.port) if args.start else None
+    url = f"ws://localhost:{args.port}/_stcore/stream"
+    report = {"started_at": datetime.datetime.now().isoformat(timespec="seconds"), "mix": args.mix,
+              "think_ms": args.think_ms, "duration": args.duration, "levels": []}
+    print(f"{'sessions':>8}{'interactions':>14}{'per s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>9}")
+    try:
+        for sessions in levels:
+            level = asyncio.run(run_level(url, sessions, args.duration, args.mix, args.think_ms, args.timeout))
+            report["levels"].append(level)
+            print_level(level)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if not args.no_cleanup and "crud" in args.mix:
+            print(f"removed {cleanup()} leftover load test rows")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import datetime
+import time
+
+import psycopg
+from psycopg import sql
+
+import metadata
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, CLAIMS_PARTITIONS_AHEAD, DB_CONFIG
+
+# ---------------------- Maintenance ----------------------
+# the nightly job (cron it, e.g. "15 3 * * * cd pythonFIles && python maintenance.py"):
+#   - partitions: monthly claims partitions up to CLAIMS_PARTITIONS_AHEAD months ahead, so new claims
+#     never pile up in claims_default (migration 0008)
+#   - archival: food listings that expired more than ARCHIVE_AFTER_DAYS ago and whose claims are all
+#     settled (Completed or Cancelled) move to food_listings_archive, their claims to claims_archive
+#     (migration 0009). Listings with a Pending claim stay until someone settles it.
+# each archive batch is its own transaction: the claims and listings are deleted and the archive rows
+# written together, so a listing is never half archived, and the summary tables drop the archived
+# rows through their delete triggers.
+SETTLED = ["Completed", "Cancelled"]
+
+
+# ---------------------- Partitions ----------------------
+def ensure_partitions(cursor, months_ahead=CLAIMS_PARTITIONS_AHEAD, today=None):
+    today = today or datetime.date.today()
+    last = today.replace(day=1)
+    for _ in range(months_ahead):
+        last = (last + datetime.timedelta(days=32)).replace(day=1)
+    cursor.execute("select claims_ensure_partitions(%s, %s)", (today.replace(day=1), last))
+    return cursor.fetchone()[0]
+
+
+# ---------------------- Archival ----------------------
+ARCHIVABLE = """
+    select f.food_id, f.expiry_date from food_listings f
+    where f.expiry_date < %(cutoff)s
+    and f.food_id not in (
+        select c.food_id from claims c
+        where coalesce(c.status, '') <> all(%(settled)s) and c.food_id is not null)
+"""
+PICK_SQL = ARCHIVABLE + """
+    order by f.expiry_date, f.food_id
+    limit %(batch)s
+    for update of f skip locked
+"""
+COUNT_SQL = f"""
+    with picked as ({ARCHIVABLE})
+    select (select count(*) from picked), (select count(*) from claims c join picked p on c.food_id = p.food_id)
+"""
+
+
+def move_query(table, columns):
+    #delete the rows and write them to <table>_archive in one statement; archived_at takes its default
+    cols = sql.SQL(", ").join(map(sql.Identifier, columns))
+    return sql.SQL("""
+        with moved as (delete from {table} where food_id = any(%s) returning *)
+        insert into {archive} ({cols}) select {cols} from moved
+    """).format(table=sql.Identifier(table), archive=sql.Identifier(table + "_archive"), cols=cols)
+
+
+def archive_expired(conn, after_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, today=None, dry_run=False):
+    #(listings, claims) archived; conn must be in autocommit mode so every batch commits on its own.
+    #claims go first, in their own statement: the claims summary trigger looks up the listing's quantity
+    #and would not find it if the listing were deleted by the same statement
+    cutoff = (today or datetime.date.today()) - datetime.timedelta(days=after_days)
+    params = {"cutoff": cutoff, "settled": SETTLED, "batch": batch_size}
+    with conn.cursor() as cur:
+        if dry_run:
+            return cur.execute(COUNT_SQL, params).fetchone()
+        move_claims = move_query("claims", metadata.column_names(cur, "claims"))
+        move_listings = move_query("food_listings", metadata.column_names(cur, "food_listings"))
+        listings = claims = 0
+        while True:
+            with conn.transaction():
+                food_ids = [row[0] for row in cur.execute(PICK_SQL, params).fetchall()]
+                if food_ids:
+                    claims += cur.execute(move_claims, (food_ids,)).rowcount
+                    listings += cur.execute(move_listings, (food_ids,)).rowcount
+            if len(food_ids) < batch_size:
+                return listings, claims
+
+
+def run(conn, months_ahead=CLAIMS_PARTITIONS_AHEAD, after_days=ARCHIVE_AFTER_DAYS,
+        batch_size=ARCHIVE_BATCH_SIZE, today=None, dry_run=False):
+    started = time.perf_counter()
+    with conn.transaction(), conn.cursor() as cur:
+        partitions = ensure_partitions(cur, months_ahead, today)
+        if dry_run:
+            raise psycopg.Rollback()
+    partitioned = time.perf_counter()
+    listings, claims = archive_expired(conn, after_days, batch_size, today, dry_run)
+    return {
+        "partitions_created": partitions,
+        "listings_archived": listings,
+        "claims_archived": claims,
+        "partition_seconds": round(partitioned - started, 3),
+        "archive_seconds": round(time.perf_counter() - partitioned, 3),
+        "dry_run": dry_run,
+    }
+
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create upcoming claims partitions and archive long expired listings.")
+    parser.add_argument("--months-ahead", type=int, default=CLAIMS_PARTITIONS_AHEAD, help="monthly partitions to keep ready")
+    parser.add_argument("--after-days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="archive listings expired more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="listings archived per transaction")
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, help="treat this date as today (YYYY-MM-DD)")
+    parser.add_argument("--dry-run", action="store_true", help="count what would be archived, change nothing")
+    args = parser.parse_args(argv)
+
+    with psycopg.connect(**DB_CONFIG, autocommit=True) as conn:
+        stats = run(conn, args.months_ahead, args.after_days, args.batch_size, args.as_of, args.dry_run)
+    for key, value in stats.items():
+        print(f"{key:<20}{value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import prepared
+from config import METADATA_TTL_SECONDS
+
+# ---------------------- Table Metadata ----------------------
+# columns, types and primary keys of every table, read from the system catalogs once per process and
+# shared by every session (CRUD forms, bulk validation, the table browser, summary table checks).
+# after METADATA_TTL_SECONDS one cheap fingerprint query (an md5 over the same catalog rows, table oids
+# included) decides whether the schema changed (a migration ran) and the columns have to be read again.
+# the other caches built from the catalogs (fetch.py's result columns, schema.py's column origins) are
+# keyed on the fingerprint through version(), so they are rebuilt after a migration too.
+# tables keyed on a column their primary key doesn't hold alone: claims is partitioned by timestamp, so
+# its primary key is (claim_id, timestamp), and claim_ids (migration 0013) keeps claim_id unique by itself
+KEYS = {"claims": ["claim_id"]}
+_tables = None          #table -> [{name, type, not_null, has_default, generated, pk}] in column order
+_fingerprint = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def load(cursor):
+    prepared.execute(cursor, "schema_columns")
+    return tables_of(cursor.fetchall())
+
+
+def tables_of(rows):
+    tables = {}
+    for table, _, name, type_name, not_null, has_default, generated, pk, _ in sorted(rows):
+        if table in KEYS:
+            pk = name in KEYS[table]
+        tables.setdefault(table, []).append({
+            "name": name, "type": type_name, "not_null": not_null,
+            "has_default": has_default, "generated": generated, "pk": pk,
+        })
+    return tables
+
+
+def fingerprint(cursor):
+    prepared.execute(cursor, "schema_fingerprint")
+    return cursor.fetchone()[0]
+
+
+def cached():
+    #(tables, fingerprint) while they are younger than METADATA_TTL_SECONDS, None when they need a check
+    with _lock:
+        if _tables is not None and time.monotonic() - _checked_at < METADATA_TTL_SECONDS:
+            return _tables, _fingerprint
+        return None
+
+
+def store(tables, current):
+    global _tables, _fingerprint, _checked_at
+    with _lock:
+        _tables, _fingerprint, _checked_at = tables, current, time.monotonic()
+    return tables, current
+
+
+def refresh(cursor):
+    #the catalog queries run outside the lock so one session's slow read doesn't hold up the others,
+    #two sessions that both find the cache stale may both read it, the last one stored wins
+    with _lock:
+        tables, stored = _tables, _fingerprint
+    current = fingerprint(cursor)
+    return store(load(cursor) if current != stored else tables, current)
+
+
+def get(cursor):
+    return (cached() or refresh(cursor))[0]
+
+
+def version(cursor):
+    #the schema fingerprint (checked every METADATA_TTL_SECONDS), for caches that go stale with the schema
+    return (cached() or refresh(cursor))[1]
+
+
+async def version_async(cursor):
+    #the same on a psycopg AsyncCursor
+    if (known := cached()) is not None:
+        return known[1]
+    with _lock:
+        tables, stored = _tables, _fingerprint
+    await cursor.execute(prepared.STATEMENTS["schema_fingerprint"])
+    current = (await cursor.fetchone())[0]
+    if current != stored:
+        await cursor.execute(prepared.STATEMENTS["schema_columns"])
+        tables = tables_of(await cursor.fetchall())
+    return store(tables, current)[1]
+
+
+# ---------------------- Lookups ----------------------
+def columns(cursor, table):
+    try:
+        return get(cursor)[table]
+    except KeyError:
+        raise ValueError(f"unknown table {table}") from None
+
+
+def column_names(cursor, table):
+    return [col["name"] for col in columns(cursor, table)]
+
+
+def primary_key(cursor, table):
+    return [col["name"] for col in columns(cursor, table) if col["pk"]]
+
+
+def has_tables(cursor, tables):
+    known = get(cursor)
+    return all(table in known for table in tables)
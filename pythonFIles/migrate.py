@@ -0,0 +1,168 @@
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+
+import psycopg
+
+import catalog
+import summaries
+from config import DB_CONFIG
+
+# ---------------------- Migrations ----------------------
+# sqlFiles/migrations/NNNN_name.sql files, applied in version order, each in its own transaction.
+# applied versions are recorded in schema_migrations so running this again only applies new files.
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sqlFiles", "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+MIGRATION_LOCK_ID = 727_001    #advisory lock so two app servers never migrate at the same time
+
+
+def available_migrations():
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return sorted(migrations)
+
+
+def applied_versions(conn):
+    conn.execute("""
+        create table if not exists schema_migrations (
+            version integer primary key,
+            name text not null,
+            applied_at timestamptz not null default now()
+        )""")
+    return {row[0] for row in conn.execute("select version from schema_migrations")}
+
+
+def pending_migrations(conn):
+    applied = applied_versions(conn)
+    return [m for m in available_migrations() if m[0] not in applied]
+
+
+def migrate(conn, target=None):
+    #conn must be in autocommit mode so every migration commits on its own
+    done = []
+    conn.execute("select pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+    try:
+        for version, name, path in pending_migrations(conn):
+            if target is not None and version > target:
+                break
+            with open(path, encoding="utf-8") as f:
+                script = f.read()
+            with conn.transaction():
+                conn.execute(script)
+                conn.execute("insert into schema_migrations (version, name) values (%s, %s)", (version, name))
+            done.append((version, name))
+    finally:
+        conn.execute("select pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+    return done
+
+
+# ---------------------- Plan Check ----------------------
+# EXPLAIN every catalog query and flag sequential scans over big tables
+CITY_SEARCH_SAMPLE = ("""
+    SELECT *
+    FROM providers
+    WHERE LOWER(city) LIKE LOWER(%s)
+""", ("%port%",))
+
+
+def catalog_queries():
+    for name, query in {**catalog.ANALYTICS_QUERIES, **catalog.LEARNER_QUERIES}.items():
+        if query is None:
+            yield name, "live", CITY_SEARCH_SAMPLE[0], CITY_SEARCH_SAMPLE[1]
+            continue
+        yield name, "live", query, None
+        summary = summaries.summary_query(name)
+        if summary:
+            yield name, "summary tables", summary, None
+    since = (datetime.date.today() - datetime.timedelta(days=365),)
+    for name, query in catalog.CLAIMS_SINCE_QUERIES.items():
+        yield name, "last year", query, since
+
+
+def seq_scans(plan):
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def check_plans(conn, min_rows=10_000):
+    sizes = dict(conn.execute("""
+        select c.relname, c.reltuples::bigint from pg_class c
+        join pg_namespace n on n.oid = c.relnamespace
+        where c.relkind in ('r', 'p') and n.nspname = current_schema()""").fetchall())
+
+    report = []
+    for name, source, query, params in catalog_queries():
+        try:
+            with conn.transaction():
+                plan = conn.execute("explain (format json) " + query.strip().rstrip(";"), params).fetchone()[0]
+        except psycopg.DatabaseError as e:
+            report.append({"query": name, "source": source, "error": str(e).strip()})
+            continue
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        flagged = sorted({rel for rel in seq_scans(plan[0]["Plan"]) if sizes.get(rel, 0) >= min_rows})
+        report.append({
+            "query": name,
+            "source": source,
+            "total_cost": plan[0]["Plan"]["Total Cost"],
+            "seq_scans": flagged,
+        })
+    return report
+
+
+def print_plan_report(report, min_rows):
+    flagged = 0
+    for r in report:
+        if "error" in r:
+            status = f"ERROR {r['error']}"
+        elif r["seq_scans"]:
+            status = "SEQ SCAN on " + ", ".join(r["seq_scans"])
+            flagged += 1
+        else:
+            status = "ok"
+        print(f"[{r['source']:<14}] {r['query'][:70]:<70} {status}")
+    print(f"\n{flagged} of {len(report)} plans seq-scan a table with >= {min_rows} rows")
+    return flagged
+
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bring the foodwaste database schema up to date.")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations only")
+    parser.add_argument("--target", type=int, help="stop after this migration version")
+    parser.add_argument("--check-plans", action="store_true", help="EXPLAIN every catalog query after migrating")
+    parser.add_argument("--min-rows", type=int, default=10_000, help="tables smaller than this are not flagged")
+    parser.add_argument("--fail-on-seq-scan", action="store_true", help="exit with status 1 when a plan is flagged")
+    args = parser.parse_args(argv)
+
+    with psycopg.connect(**DB_CONFIG, autocommit=True) as conn:
+        if args.status:
+            applied = applied_versions(conn)
+            for version, name, _ in available_migrations():
+                print(f"{version:04d} {name:<40} {'applied' if version in applied else 'pending'}")
+            return
+
+        done = migrate(conn, args.target)
+        for version, name in done:
+            print(f"applied {version:04d} {name}")
+        if not done:
+            print("database is up to date")
+
+        if args.check_plans:
+            flagged = print_plan_report(check_plans(conn, args.min_rows), args.min_rows)
+            if flagged and args.fail_on_seq_scan:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
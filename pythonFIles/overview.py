@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+import psycopg
+
+import db
+import fetch
+import query_cache
+
+# ---------------------- Overview ----------------------
+# every catalog query at once: each one borrows its own AsyncConnection from the async pool and runs
+# under a statement_timeout, and comes back through a concurrent future. The page renders a panel as
+# soon as its result lands, so it takes as long as the slowest query instead of the sum of all of them.
+# results go through the same process wide cache as the single query pages.
+TIMEOUT_GRACE = 1.0     #the server's statement_timeout should fire first, it leaves the connection reusable
+
+
+async def run_panel(name, query, params, tables, source, timeout):
+    #returns a result dict, errors and timeouts included, so one bad panel never breaks the page
+    started = time.perf_counter()
+    result = {"name": name, "source": source, "df": None, "error": None, "cached": False}
+    try:
+        cache = query_cache.get_cache()
+        key = query_cache.cache_key(query, params)
+        df = cache.get(key)
+        if df is not None:
+            result["cached"] = True
+        else:
+            generation = cache.generation(tables)
+            df = await asyncio.wait_for(fetch_panel(query, params, timeout), timeout + TIMEOUT_GRACE)
+            cache.put(key, df, tables, generation)
+        result["df"] = df
+    except (asyncio.TimeoutError, psycopg.errors.QueryCanceled):
+        result["error"] = f"timed out after {timeout:g} s"
+    except Exception as e:     #a database error, no free pooled connection (PoolTimeout), a conversion error...
+        result["error"] = str(e).strip() or type(e).__name__
+    result["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+async def fetch_panel(query, params, timeout):
+    pool = await db.get_async_pool()
+    async with pool.connection() as aconn:
+        async with aconn.cursor() as cur:
+            #cancelling the task alone would leave the query running and the connection unusable
+            await cur.execute("select set_config('statement_timeout', %s, true)", (f"{int(timeout * 1000)}ms",))
+            return await fetch.fetch_df_async(cur, query, params)
+
+
+def submit_all(panels, timeout):
+    #panels: [(name, query, params, tables, source)] -> {future: name}, all started at once
+    return {db.submit(run_panel(*panel, timeout)): panel[0] for panel in panels}
@@ -0,0 +1,67 @@
+import weakref
+
+import pandas as pd
+import psycopg
+from psycopg import pq
+
+import catalog
+
+# ---------------------- Prepared Statements ----------------------
+# the small statements that run on every rerun instead of coming out of the result cache. Each one is
+# prepared on the server the first time a pooled connection runs it (psycopg's prepare=True) and
+# executed with bound parameters from then on, so it is parsed and planned once per connection.
+# psycopg forgets its prepared statements on a rollback or a deallocate and prepares them again on
+# next use.
+# the catalog aggregates stay on COPY (fetch.py, which can't run a prepared statement) behind the
+# process wide result cache, their planning time is about 1% of the run.
+STATEMENTS = {
+    "city_search": catalog.CITY_SEARCH_SQL,
+    "receiver_location": "select latitude, longitude from receivers where receiver_id = %s",
+    "table_estimate": "select reltuples::bigint from pg_class where oid = %s::regclass",
+    "schema_fingerprint": """
+        select md5(coalesce(string_agg(m::text, ',' order by m.table_name, m.position), ''))
+        from ({}) as m
+    """,
+    "schema_columns": """
+        select c.relname as table_name, a.attnum as position, a.attname, format_type(a.atttypid, null),
+            a.attnotnull, a.atthasdef or a.attidentity <> '', a.attgenerated <> '',
+            coalesce(a.attnum = any(i.indkey), false), c.oid::bigint as table_oid
+        from pg_class c
+        join pg_attribute a on a.attrelid = c.oid and a.attnum > 0 and not a.attisdropped
+        left join pg_index i on i.indrelid = c.oid and i.indisprimary
+        where c.relnamespace = 'public'::regnamespace and c.relkind in ('r', 'p') and not c.relispartition
+    """,
+}
+STATEMENTS["schema_fingerprint"] = STATEMENTS["schema_fingerprint"].format(STATEMENTS["schema_columns"])
+_stale = weakref.WeakSet()      #connections whose prepared statements failed inside a caller's transaction
+
+
+def execute(cursor, name, params=None):
+    #a plain execute: a savepoint around it would cost two more round trips per call. A prepared
+    #statement whose result columns a migration changed fails with "cached plan must not change result
+    #type": if this statement began the transaction nothing else is lost, so it is rolled back and the
+    #statement prepared again after a deallocate all (the one statement psycopg recognises to drop its
+    #cache). Inside a caller's transaction (allocation, bulk) the error goes up, the caller rolls back
+    #and the connection's next prepared statement deallocates first.
+    query = STATEMENTS[name]
+    conn = cursor.connection
+    if conn in _stale:
+        cursor.execute("deallocate all")
+        _stale.discard(conn)
+    began = conn.info.transaction_status == pq.TransactionStatus.IDLE
+    try:
+        return cursor.execute(query, params, prepare=True)
+    except psycopg.errors.FeatureNotSupported:
+        if not began:
+            _stale.add(conn)
+            raise
+        if conn.info.transaction_status == pq.TransactionStatus.INERROR:
+            conn.rollback()
+        cursor.execute("deallocate all")
+        return cursor.execute(query, params, prepare=True)
+
+
+def fetch_df(cursor, name, params=None):
+    #for small results, big ones go through fetch.fetch_df
+    execute(cursor, name, params)
+    return pd.DataFrame(cursor.fetchall(), columns=[desc.name for desc in cursor.description])
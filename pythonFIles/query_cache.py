@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+
+import catalog
+from config import CACHE_MAX_MB, CACHE_TTL_SECONDS
+
+# ---------------------- Result Cache ----------------------
+# one cache per server process, so every session shares the same DataFrames (treat them as read-only).
+# entries are keyed on (query text, params), expire after a TTL, and the least recently used ones
+# are evicted once the total size goes over the memory cap.
+# each entry remembers the tables its query reads so a write to one table only drops those entries.
+
+
+class QueryCache:
+    def __init__(self, ttl_seconds=CACHE_TTL_SECONDS, max_bytes=CACHE_MAX_MB * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()      #key -> (df, tables, expires_at, size), oldest use first
+        self._generations = {}             #table -> bumped on every invalidation
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidated": 0}
+
+    def generation(self, tables):
+        with self._lock:
+            return tuple(self._generations.get(table, 0) for table in tables)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            df, tables, expires_at, size = entry
+            if time.monotonic() >= expires_at:
+                self._drop(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return df
+
+    def put(self, key, df, tables, generation=None):
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            #a write landed while the query was running, the result may already be stale
+            if generation is not None and generation != tuple(self._generations.get(t, 0) for t in tables):
+                return
+            if size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (df, tuple(tables), time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, tables):
+        tables = set(tables)
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key, entry in self._entries.items() if tables & set(entry[1])]
+            for key in stale:
+                self._drop(key)
+            self._stats["invalidated"] += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "size_mb": round(self._bytes / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+
+_cache = QueryCache()
+
+
+def get_cache():
+    return _cache
+
+
+def invalidate(tables):
+    return _cache.invalidate(tables)
+
+
+# ---------------------- Cached Queries ----------------------
+def run_query(cursor, query, params=None):
+    import fetch        #pulls in pandas and pyarrow, which pages that never miss the cache don't need
+    return fetch.fetch_df(cursor, query, params)
+
+
+def cache_key(query, params=None):
+    return (query, tuple(params) if params else ())
+
+
+def cached_query(cursor, query, params=None, tables=None):
+    #tables defaults to whatever the query reads, see catalog.tables_read
+    if tables is None:
+        tables = catalog.tables_read(query)
+    key = cache_key(query, params)
+
+    df = _cache.get(key)
+    if df is None:
+        generation = _cache.generation(tables)
+        df = run_query(cursor, query, params)
+        _cache.put(key, df, tables, generation)
+    return df
@@ -0,0 +1,126 @@
+import threading
+
+import pandas as pd
+
+# ---------------------- Column Types ----------------------
+# the compact in-memory type of every column of the four tables, used wherever their rows become a
+# DataFrame: query results (fetch.py, matched on the table column each result column comes from) and
+# csv loads (loader.py, the notebook).
+#   - low-cardinality text -> categorical: one small integer code per row instead of a python string.
+#     The value sets the CRUD form offers come first, values outside them are kept as extra categories
+#   - city/location -> categorical with whatever values the data has
+#   - ids and quantities -> int32 (they are integer columns in postgres), Int32 when there are nulls
+#   - expiry_date/timestamp -> datetime64
+# names, addresses and other free text stay strings.
+PROVIDER_TYPES = ["Catering Service", "Grocery Store", "Restaurant", "Supermarket"]
+RECEIVER_TYPES = ["Charity", "Individual", "NGO", "Shelter"]
+FOOD_TYPES = ["Vegan", "Vegetarian", "Non-Vegetarian"]
+MEAL_TYPES = ["Breakfast", "Lunch", "Snacks", "Dinner"]
+STATUSES = ["Pending", "Completed", "Cancelled"]
+
+COLUMN_TYPES = {
+    "providers": {"provider_id": "int32", "type": PROVIDER_TYPES, "city": "category"},
+    "receivers": {"receiver_id": "int32", "type": RECEIVER_TYPES, "city": "category"},
+    "food_listings": {"food_id": "int32", "quantity": "int32", "expiry_date": "datetime", "provider_id": "int32",
+                      "provider_type": PROVIDER_TYPES, "location": "category", "food_type": FOOD_TYPES,
+                      "meal_type": MEAL_TYPES},
+    "claims": {"claim_id": "int32", "food_id": "int32", "receiver_id": "int32", "status": STATUSES,
+               "timestamp": "datetime"},
+}
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+
+# table oid -> {attnum: column type}, so a result column can be traced back to its table column
+ORIGINS_SQL = """
+    select a.attrelid::bigint, a.attnum, c.relname, a.attname from pg_attribute a
+    join pg_class c on c.oid = a.attrelid
+    where c.relname = any(%s) and c.relnamespace = 'public'::regnamespace and a.attnum > 0 and not a.attisdropped
+"""
+_origins = None
+_origins_version = None     #metadata.version() they were read at, a migration can change or recreate a table
+_origins_lock = threading.Lock()
+
+
+def is_category(col_type):
+    return col_type is not None and col_type not in ("int32", "datetime")
+
+
+def types_for(table, columns):
+    #column type per column name (None where there is none), names matched case-insensitively
+    types = COLUMN_TYPES.get(table, {})
+    return [types.get(str(col).lower()) for col in columns]
+
+
+# ---------------------- Result Column Origins ----------------------
+def origins_loaded(version):
+    with _origins_lock:
+        return _origins is not None and _origins_version == version
+
+
+def remember_origins(rows, version):
+    global _origins, _origins_version
+    origins = {}
+    for oid, attnum, table, column in rows:
+        origins.setdefault(oid, {})[attnum] = COLUMN_TYPES[table].get(column)
+    with _origins_lock:
+        _origins, _origins_version = origins, version
+
+
+def load_origins(cursor, version):
+    cursor.execute(ORIGINS_SQL, (list(COLUMN_TYPES),))
+    remember_origins(cursor.fetchall(), version)
+
+
+def result_origins(cursor):
+    #(table oid, column number) each column of the result on cursor comes from, (0, 0) for computed ones
+    result = cursor.pgresult
+    return [(result.ftable(i), result.ftablecol(i)) for i in range(result.nfields)]
+
+
+def type_of_origin(oid, attnum):
+    with _origins_lock:
+        return (_origins or {}).get(oid, {}).get(attnum)
+
+
+# ---------------------- Conversion ----------------------
+def compact(df, types):
+    #converts df's columns in place to the types given by position (None: left alone) and returns it.
+    #by position because result columns can share a name
+    for i, col_type in enumerate(types):
+        if col_type is not None:
+            df.isetitem(i, convert(df.iloc[:, i], col_type))
+    return df
+
+
+def apply(df, table):
+    #a DataFrame of table's rows (csv columns may be capitalised) with the compact types
+    return compact(df, types_for(table, df.columns))
+
+
+def convert(col, col_type):
+    arrow = isinstance(col.dtype, pd.ArrowDtype)
+    if col_type == "int32":
+        if col.empty or not pd.api.types.is_numeric_dtype(col.dtype):
+            return col
+        low, high = col.min(), col.max()
+        if pd.isna(low) or low < INT32_MIN or high > INT32_MAX:
+            return col      #all null, or a value postgres would refuse anyway: left for the checks to report
+        if arrow:
+            return col.astype("int32[pyarrow]")
+        return col.astype("Int32" if col.hasnans else "int32")
+    if col_type == "datetime":
+        if arrow or pd.api.types.is_datetime64_any_dtype(col.dtype):
+            return col
+        return pd.to_datetime(col)
+    if arrow:
+        import pyarrow as pa
+        return col if pa.types.is_dictionary(col.dtype.pyarrow_dtype) else col.astype(
+            pd.ArrowDtype(pa.dictionary(pa.int32(), pa.string())))
+    if not isinstance(col.dtype, pd.CategoricalDtype):
+        col = col.astype("category")
+    known = col_type if isinstance(col_type, list) else []
+    extra = sorted(set(col.cat.categories) - set(known), key=str)
+    return col.cat.set_categories(known + extra)
+
+
+def memory_mb(df):
+    return round(df.memory_usage(deep=True).sum() / (1024 * 1024), 2)
@@ -0,0 +1,236 @@
+import argparse
+import importlib.util
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import psycopg
+
+import catalog
+from config import DB_CONFIG, SNAPSHOT_DIR, SNAPSHOT_KEEP
+
+# ---------------------- Snapshots ----------------------
+# the four tables written to Parquet so the analytics catalogs can run off the production database.
+# a snapshot is a folder SNAPSHOT_DIR/<taken at>/ with one dataset per table, claims partitioned by
+# month of timestamp and food_listings by month of expiry_date (hive style: claims/month=2025-03/...),
+# plus manifest.json. SNAPSHOT_DIR/CURRENT names the newest complete one and is only replaced once a
+# snapshot is fully written, so readers never see half of one.
+# "snapshot mode" runs the same catalog sql on DuckDB over those files, without touching Postgres.
+PARTITIONS = {"claims": "timestamp", "food_listings": "expiry_date"}     #table -> column it is split on by month
+HAVE_DUCKDB = importlib.util.find_spec("duckdb") is not None
+UNNAMED_CALL = re.compile(r"^(\w+)\(.*\)$")      #postgres names an unaliased count(x) column "count"
+
+_engine = None
+_engine_snapshot = None
+_engine_lock = threading.Lock()
+
+
+def current(root=SNAPSHOT_DIR):
+    #manifest of the newest snapshot, None when there is none yet
+    try:
+        with open(os.path.join(root, "CURRENT"), encoding="utf-8") as f:
+            name = f.read().strip()
+        with open(os.path.join(root, name, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    manifest["path"] = os.path.join(root, name)
+    return manifest
+
+
+def age_text(manifest):
+    seconds = time.time() - manifest["taken_at"]
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min old"
+    if seconds < 48 * 3600:
+        return f"{seconds / 3600:.1f} h old"
+    return f"{seconds / 86400:.1f} days old"
+
+
+# ---------------------- Export ----------------------
+def export_table(cursor, table, path):
+    #COPY -> Parquet one row group at a time (export.row_groups), so memory is a row group whatever the
+    #size of the table; date columns stay dates instead of becoming timestamps.
+    #a partitioned table is read in order of its split column, so each month's file is written in one
+    #go by one open writer and its row groups aren't cut up by the other months
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    import export
+    import fetch
+
+    split_on = PARTITIONS.get(table)
+    query = f"select * from {table}" if split_on is None else f'select * from {table} order by "{split_on}"'
+    target = export.arrow_schema(fetch.describe(cursor, query, None))
+    rows = 0
+    if split_on is None:
+        with pq.ParquetWriter(path + ".parquet", target) as writer:
+            for group in export.row_groups(cursor, query, None, target):
+                writer.write_table(group)
+                rows += group.num_rows
+        return rows
+
+    writer, writing = None, None
+    try:
+        for group in export.row_groups(cursor, query, None, target):
+            months = pc.fill_null(pc.strftime(group.column(split_on), format="%Y-%m"), "none")
+            for month in pc.unique(months).to_pylist():       #in order of appearance, nulls come last
+                if month != writing:
+                    if writer is not None:
+                        writer.close()
+                    os.makedirs(os.path.join(path, f"month={month}"))
+                    writer = pq.ParquetWriter(os.path.join(path, f"month={month}", "part-0.parquet"), target)
+                    writing = month
+                writer.write_table(group.filter(pc.equal(months, month)))
+            rows += group.num_rows
+        if writer is None:
+            #an empty table still gets a file, DuckDB's read_parquet fails on a glob that matches nothing
+            os.makedirs(os.path.join(path, "month=none"))
+            writer = pq.ParquetWriter(os.path.join(path, "month=none", "part-0.parquet"), target)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def export(conn, root=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
+    started = time.perf_counter()
+    taken_at = time.time()
+    name = datetime.fromtimestamp(taken_at, timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(root, name)
+    os.makedirs(path)
+
+    rows = {}
+    #one repeatable read transaction: all four tables come from the same moment
+    with conn.transaction(), conn.cursor() as cur:
+        cur.execute("set transaction isolation level repeatable read, read only")
+        for table in catalog.TABLES:
+            rows[table] = export_table(cur, table, os.path.join(path, table))
+
+    manifest = {"name": name, "taken_at": taken_at, "rows": rows, "partitions": PARTITIONS,
+                "seconds": round(time.perf_counter() - started, 2)}
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    with open(os.path.join(root, "CURRENT.tmp"), "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(os.path.join(root, "CURRENT.tmp"), os.path.join(root, "CURRENT"))
+    prune(root, keep)
+    return manifest
+
+
+def prune(root, keep):
+    #the previous snapshots stay around for a while, a session may still be reading one
+    names = sorted(name for name in os.listdir(root) if os.path.isfile(os.path.join(root, name, "manifest.json")))
+    for name in names[:-keep]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+# ---------------------- Engine ----------------------
+def engine(manifest):
+    #one in-memory DuckDB per process with a view per table over the snapshot's files,
+    #rebuilt when a newer snapshot shows up. Each query gets its own cursor (DuckDB's per-thread handle)
+    global _engine, _engine_snapshot
+    import duckdb       #optional, only snapshot mode needs it
+
+    with _engine_lock:
+        if _engine is None:
+            _engine = duckdb.connect()
+            _engine.execute("set global integer_division = true")      #int / int truncates, as in postgres (global: cursors too)
+        if _engine_snapshot != manifest["name"]:
+            for table in catalog.TABLES:
+                if table in PARTITIONS:
+                    source = f"read_parquet('{os.path.join(manifest['path'], table)}/*/*.parquet', hive_partitioning = true)"
+                    _engine.execute(f"create or replace view {table} as select * exclude (month) from {source}")
+                else:
+                    source = f"read_parquet('{os.path.join(manifest['path'], table)}.parquet')"
+                    _engine.execute(f"create or replace view {table} as select * from {source}")
+            _engine_snapshot = manifest["name"]
+        return _engine.cursor()
+
+
+def query_df(query, params=None, manifest=None):
+    #the catalog's postgres sql, %s placeholders included, run against the snapshot
+    manifest = manifest or current()
+    if manifest is None:
+        raise RuntimeError("there is no snapshot yet, run python snapshot.py")
+    duck = engine(manifest)
+    try:
+        duck.execute(query.replace("%s", "?"), params or [])
+        types = [desc[1] for desc in duck.description]
+        df = duck.df()
+    finally:
+        duck.close()
+    return postgres_names(df, types)
+
+
+def postgres_names(df, types):
+    #DuckDB keeps the case of unquoted names and returns sum(int) as a 128 bit int (float64 in pandas);
+    #the pages and charts expect what postgres returns
+    df.columns = [UNNAMED_CALL.sub(r"\1", name).lower() for name in df.columns]
+    for i, type_name in enumerate(types):
+        if str(type_name) == "HUGEINT":
+            col = df.iloc[:, i]
+            df[df.columns[i]] = col.astype("int64" if col.notna().all() else "Int64")
+    return df
+
+
+def catalog_query(query, params=None):
+    #(DataFrame, source label) for the pages
+    manifest = current()
+    started = time.perf_counter()
+    df = query_df(query, params, manifest)
+    ms = round((time.perf_counter() - started) * 1000, 1)
+    return df, f"snapshot {manifest['name']} ({age_text(manifest)}), DuckDB {ms} ms"
+
+
+# ---------------------- Check ----------------------
+def check(manifest):
+    #every catalog query on the snapshot, (name, milliseconds, error)
+    report = []
+    entries = [(name, query, None) for name, query in {**catalog.ANALYTICS_QUERIES, **catalog.LEARNER_QUERIES}.items()]
+    since = (date.today() - timedelta(days=365),)
+    entries += [(name + " (last year)", query, since) for name, query in catalog.CLAIMS_SINCE_QUERIES.items()]
+    for name, query, params in entries:
+        if query is None:
+            query, params = catalog.CITY_SEARCH_SQL, ("%port%",)
+        started = time.perf_counter()
+        try:
+            query_df(query, params, manifest)
+            report.append((name, round((time.perf_counter() - started) * 1000, 1), None))
+        except Exception as e:
+            report.append((name, None, str(e).strip().splitlines()[0]))
+    return report
+
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the four tables to a Parquet snapshot for offline analytics.")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help="folder holding the snapshots")
+    parser.add_argument("--keep", type=int, default=SNAPSHOT_KEEP, help="snapshots to keep, older ones are deleted")
+    parser.add_argument("--check", action="store_true",
+                        help="don't export, run every catalog query against the current snapshot instead")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        manifest = current(args.dir)
+        if manifest is None or not HAVE_DUCKDB:
+            sys.exit("needs a snapshot and the duckdb package")
+        failed = 0
+        for name, ms, error in check(manifest):
+            failed += error is not None
+            print(f"{name[:70]:<70} {f'{ms} ms' if error is None else 'ERROR ' + error}")
+        sys.exit(1 if failed else 0)
+
+    with psycopg.connect(**DB_CONFIG) as conn:
+        manifest = export(conn, args.dir, args.keep)
+    print(f"snapshot {manifest['name']} written in {manifest['seconds']} s: "
+          + ", ".join(f"{table} {rows:,}" for table, rows in manifest["rows"].items()))
+
+
+if __name__ == "__main__":
+    main()
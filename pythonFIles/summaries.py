@@ -0,0 +1,186 @@
+import argparse
+
+import psycopg
+
+import catalog
+import metadata
+from config import DB_CONFIG
+
+# ---------------------- Summary Tables ----------------------
+# the tables/triggers are created by sqlFiles/migrations/0002_summary_tables.sql (python migrate.py),
+# these are the catalog queries rewritten to read them. Column names match the live queries so the charts work unchanged.
+SUMMARY_TABLES = ["listing_stats", "provider_food_items", "claim_stats", "claims_daily", "receiver_claim_stats"]
+
+ANALYTICS_SUMMARY_QUERIES = {
+    "2)Which type of food provider (restaurant, grocery store, etc.) contributes the most food?":"""
+        select value as provider_type, quantity_sum as total_quantity from listing_stats
+        where dimension = 'provider_type' and quantity_count > 0
+        and quantity_sum = (
+            select max(quantity_sum) from listing_stats
+            where dimension = 'provider_type' and quantity_count > 0);
+        """,
+    "4) Which receivers have claimed the most food?":"""
+        select name, s.claims as total_claims
+        from receivers r
+        join receiver_claim_stats s on r.receiver_id = s.receiver_id
+        where s.claims = (select max(claims) from receiver_claim_stats)
+        order by s.receiver_id;
+        """,
+    "5) What is the total quantity of food available from all providers?":"""
+        select case when sum(quantity_count) > 0 then sum(quantity_sum)::bigint end as total_quantity_available
+        from listing_stats where dimension = 'provider_type';
+        """,
+    "6) Which city has the highest number of food listings?":"""
+        select value as location, listings as total_listings from listing_stats
+        where dimension = 'location'
+        and listings = (select max(listings) from listing_stats where dimension = 'location');
+        """,
+    "7) What are the most commonly available food types?":"""
+        select value as food_type, listings as most_common_foodType from listing_stats
+        where dimension = 'food_type'
+        order by most_common_foodType desc
+        """,
+    "8)How many food claims have been made for each food item?":"""
+        select food_name, sum(claims)::bigint as no_of_food_Claims from claim_stats c
+        join food_listings f on c.food_id = f.food_id
+        group by food_name
+        order by no_of_food_Claims;
+        """,
+    "9) Which provider has had the highest number of successful food claims?":"""
+        with per_provider as (
+            select f.provider_id, sum(claims)::bigint as claims from claim_stats c
+            join food_listings f on c.food_id = f.food_id
+            where status = 'Completed'
+            group by f.provider_id
+        )
+        select name, sum(claims)::bigint as successful_claims from providers p
+        join per_provider pp on p.provider_id = pp.provider_id
+        group by name
+        having sum(claims) = (select max(claims) from per_provider);
+        """,
+    "10) What percentage of food claims are completed vs. pending vs. canceled?":"""
+        select status, round(100 * sum(claims)::bigint / (select sum(claims) from claims_daily)::bigint, 2) as percentage
+        from claims_daily
+        group by status;
+        """,
+    "11) What is the average quantity of food claimed per receiver?":"""
+        select name, round(sum(quantity_sum)::numeric / nullif(sum(quantity_count), 0), 2) as average_quantity
+        from receivers r
+        join receiver_claim_stats s on r.receiver_id = s.receiver_id
+        where s.quantity_count > 0
+        group by name;
+        """,
+    "12) Which meal type (breakfast, lunch, dinner, snacks) is claimed the most?":"""
+        with per_meal as (
+            select meal_type, sum(claims)::bigint as total_claims from claim_stats c
+            join food_listings f on c.food_id = f.food_id
+            group by meal_type
+        )
+        select meal_type, total_claims from per_meal
+        where total_claims = (select max(total_claims) from per_meal);
+        """,
+    "13) What is the total quantity of food donated by each provider?":"""
+        select name as provider_name,
+            case when sum(quantity_count) > 0 then sum(quantity_sum)::bigint end as total_quantity
+        from providers p
+        join listing_stats s on s.dimension = 'provider_id' and s.value = p.provider_id::text
+        group by name
+        order by total_quantity desc
+        """,
+}
+
+LEARNER_SUMMARY_QUERIES = {
+    "3) Which meal types are most commonly listed by food providers?":"""
+        select value as meal_type, provider_count as meal_type_count from listing_stats
+        where dimension = 'meal_type'
+        and provider_count = (select max(provider_count) from listing_stats where dimension = 'meal_type')
+        """,
+    "4) Rank the Top food items claimed":"""
+        select
+            food_name,
+            sum(claims)::bigint as no_of_claimed_food,
+            dense_rank() over (
+                ORDER BY sum(claims) DESC
+            ) as food_rank
+        from food_listings f
+        join claim_stats c on f.food_id = c.food_id
+        group by food_name
+        """,
+    "5) List the total quantiy of food per item which were never claimed?":"""
+        select food_name, sum(quantity * coalesce(c.claims, 1))::bigint as total_item from food_listings f
+        left join claim_stats c on f.food_id = c.food_id
+        where status is null
+        group by food_name
+        """,
+    "6) Top 5 cities with the most completed claims":"""
+        select location, sum(claims)::bigint as completed_claims from food_listings f
+        join claim_stats c on f.food_id = c.food_id
+        where status = 'Completed'
+        group by location
+        order by completed_claims desc limit 5;
+        """,
+    "7) Provider-wise breakdown of claim statuses":"""
+        select name, status, sum(claims)::bigint as total from providers p
+        join food_listings f on p.provider_id = f.provider_id
+        join claim_stats c on c.food_id = f.food_id
+        group by name, status
+        order by name
+        """,
+    "8) Count of unique food items by provider":"""
+        select name as provider_name,
+            count(distinct(food_name)) as unique_food
+        from providers p
+        join provider_food_items i on p.provider_id = i.provider_id
+        group by name
+        order by name
+        """,
+    "9) Average quantity per food type":"""
+        select value as food_type, round(quantity_sum::numeric / nullif(quantity_count, 0), 2) as avg_quantity
+        from listing_stats
+        where dimension = 'food_type'
+        order by avg_quantity
+        """,
+    "10) Claims made per day ":"""
+        select claim_date, sum(claims)::bigint as count from claims_daily
+        group by claim_date
+        order by claim_date
+        """,
+}
+
+SUMMARY_QUERIES = {**ANALYTICS_SUMMARY_QUERIES, **LEARNER_SUMMARY_QUERIES}
+
+
+def summary_query(query_name):
+    return SUMMARY_QUERIES.get(query_name)
+
+
+def choose_query(cursor, query_name, live_query, force_live=False):
+    #(sql, tables it depends on, source label); tables are the base tables so CRUD writes still invalidate
+    tables = catalog.tables_read(live_query)
+    summary = summary_query(query_name)
+    if summary and not force_live and installed(cursor):
+        return summary, tables, "summary tables"
+    return live_query, tables, "live"
+
+
+def installed(cursor):
+    return metadata.has_tables(cursor, ["listing_stats", "claims_daily"])
+
+
+# ---------------------- Refresh ----------------------
+def refresh(conn):
+    #full rebuild, run it after bulk loads where per-row trigger upkeep was not wanted
+    conn.execute("select refresh_summaries()")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the dashboard summary tables from the base tables.")
+    parser.parse_args(argv)
+
+    with psycopg.connect(**DB_CONFIG) as conn:
+        refresh(conn)
+    print("summary tables rebuilt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import json
+
+import pandas as pd
+from psycopg import sql
+
+import fetch
+import metadata
+import prepared
+
+# ---------------------- Table Browser ----------------------
+# keyset pagination: a page is "the next N rows after the last key we showed",
+# so the database only ever reads one page and memory stays the same for any table size
+
+PK_COLUMNS = {
+    "providers": "provider_id",
+    "receivers": "receiver_id",
+    "food_listings": "food_id",
+    "claims": "claim_id",
+}   #table:id_column
+
+FILTER_OPERATORS = ["contains", "=", ">=", "<="]
+
+
+def table_columns(cursor, table):
+    return metadata.column_names(cursor, table)
+
+
+def build_filters(filters):
+    #filters -> list of (column, operator, value), pushed down as a where clause with bound values
+    clauses, params = [], []
+    for column, operator, value in filters:
+        if value in (None, ""):
+            continue
+        col = sql.Identifier(column)
+        if operator == "contains":
+            clauses.append(sql.SQL("{}::text ilike %s").format(col))
+            params.append(f"%{value}%")
+        elif operator in ("=", ">=", "<="):
+            clauses.append(sql.SQL("{} " + operator + " %s").format(col))
+            params.append(value)
+        else:
+            raise ValueError(f"unknown filter operator {operator}")
+    return clauses, params
+
+
+def build_keyset(sort_column, pk_column, descending, after):
+    #rows strictly after the (sort value, pk) of the last row shown, nulls are sorted last
+    if after is None:
+        return None, []
+    sort_value, pk_value = after
+    op = sql.SQL("<" if descending else ">")
+    pk = sql.Identifier(pk_column)
+    if sort_column == pk_column:
+        return sql.SQL("{} {} %s").format(pk, op), [pk_value]
+
+    col = sql.Identifier(sort_column)
+    if sort_value is None:
+        return sql.SQL("({} is null and {} {} %s)").format(col, pk, op), [pk_value]
+    return (
+        sql.SQL("({col} {op} %s or ({col} = %s and {pk} {op} %s) or {col} is null)").format(col=col, op=op, pk=pk),
+        [sort_value, sort_value, pk_value],
+    )
+
+
+def select_rows(table, sort_column, descending, clauses):
+    #select * from table where <clauses> in the browser's order, nulls last and ties broken by the pk
+    pk_column = PK_COLUMNS[table]
+    direction = sql.SQL("desc" if descending else "asc")
+    order = [sql.SQL("{} {} nulls last").format(sql.Identifier(sort_column), direction)]
+    if sort_column != pk_column:
+        order.append(sql.SQL("{} {}").format(sql.Identifier(pk_column), direction))
+
+    return sql.SQL("select * from {table} {where} order by {order}").format(
+        table=sql.Identifier(table),
+        where=sql.SQL("where ") + sql.SQL(" and ").join(clauses) if clauses else sql.SQL(""),
+        order=sql.SQL(", ").join(order),
+    )
+
+
+def fetch_page(cursor, table, sort_column=None, descending=False, filters=(), after=None, page_size=50):
+    pk_column = PK_COLUMNS[table]
+    sort_column = sort_column or pk_column
+
+    clauses, params = build_filters(filters)
+    keyset, keyset_params = build_keyset(sort_column, pk_column, descending, after)
+    if keyset is not None:
+        clauses.append(keyset)
+        params.extend(keyset_params)
+
+    query = select_rows(table, sort_column, descending, clauses) + sql.SQL(" limit %s")
+    #one extra row tells us whether there is a next page without counting anything
+    df = fetch.fetch_df(cursor, query, params + [page_size + 1])
+
+    has_next = len(df) > page_size
+    df = df.iloc[:page_size]
+
+    last_key = None
+    if len(df):
+        last = df.iloc[-1]
+        last_key = (python_value(last[sort_column]), python_value(last[pk_column]))
+    return df, last_key, has_next
+
+
+def export_query(table, sort_column=None, descending=False, filters=()):
+    #every row the browser would page through, for export.py: (query, params)
+    clauses, params = build_filters(filters)
+    return select_rows(table, sort_column or PK_COLUMNS[table], descending, clauses), params
+
+
+def refresh_rows(cursor, table, df, ids):
+    #a page shown earlier with the rows whose id is in ids read again (live.py): changed rows are replaced
+    #in place, deleted ones dropped. Rows added elsewhere and rows that now sort or filter differently
+    #stay where they are until the page is loaded again
+    pk_column = PK_COLUMNS[table]
+    changed = df[pk_column].isin(ids)
+    if not changed.any():
+        return df
+    query = sql.SQL("select * from {} where {} = any(%s)").format(sql.Identifier(table), sql.Identifier(pk_column))
+    shown_ids = [python_value(value) for value in df.loc[changed, pk_column].unique()]
+    fresh = fetch.fetch_df(cursor, query, (shown_ids,)).drop_duplicates(subset=[pk_column], keep="last")
+    fresh = fresh.set_index(pk_column)
+
+    page = df[~changed | df[pk_column].isin(fresh.index)]
+    updated = page[pk_column].isin(fresh.index)
+    rows = fresh.loc[page.loc[updated, pk_column]].reset_index()[df.columns].set_axis(page.index[updated])
+    #concat rather than assigning into the page: a new value can't be written into a categorical column
+    return pd.concat([page[~updated], rows]).loc[page.index]
+
+
+def python_value(value):
+    #numpy/pandas scalars back to plain python for the next page's query parameters
+    if pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value.item() if hasattr(value, "item") else value
+
+
+# ---------------------- Row Estimates ----------------------
+def estimate_rows(cursor, table, filters=()):
+    #planner estimates instead of count(*), a full count reads the whole table
+    clauses, params = build_filters(filters)
+    if not clauses:
+        prepared.execute(cursor, "table_estimate", (table,))
+        row = cursor.fetchone()
+        if row and row[0] >= 0:     #-1 means the table was never analyzed, ask the planner instead
+            return row[0]
+
+    query = sql.SQL("explain (format json) select 1 from {} {}").format(
+        sql.Identifier(table),
+        sql.SQL("where ") + sql.SQL(" and ").join(clauses) if clauses else sql.SQL(""),
+    )
+    cursor.execute(query, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
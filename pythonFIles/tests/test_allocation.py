@@ -0,0 +1,79 @@
+import datetime
+
+import allocation
+
+DAY = datetime.date(2025, 6, 1)
+REQUESTED = datetime.datetime(2025, 5, 1, 9, 0)
+
+
+def listing(food_id, quantity, days=5, city="Austin", food_type="Vegan"):
+    #a food_listings row as load_listings reads it
+    return (food_id, quantity, DAY + datetime.timedelta(days=days), city, food_type)
+
+
+def request(request_id, quantity, city="Austin", food_type="Vegan", minutes=0, receiver_id=None):
+    #a receiver_requests row as load_requests reads it
+    return (request_id, receiver_id or 100 + request_id, city, food_type, quantity,
+            REQUESTED + datetime.timedelta(minutes=minutes))
+
+
+def match(listings, requests):
+    return allocation.match(allocation.build_listing_pools(listings), requests)
+
+
+def test_a_request_takes_the_smallest_listing_that_covers_it():
+    assignments = match([listing(1, 50), listing(2, 12), listing(3, 10), listing(4, 8)],
+                        [request(1, 10), request(2, 50)])
+    assert assignments == [(3, 101, 1, 10), (1, 102, 2, 50)]
+
+
+def test_equal_listings_go_soonest_expiring_first():
+    assignments = match([listing(1, 10, days=9), listing(2, 10, days=2), listing(3, 10, days=5)],
+                        [request(1, 10), request(2, 10)])
+    assert [a[0] for a in assignments] == [2, 3]
+
+
+def test_without_a_covering_listing_the_soonest_expiring_are_taken():
+    assignments = match([listing(1, 4, days=3), listing(2, 6, days=1), listing(3, 5, days=2)], [request(1, 8)])
+    #6 first (soonest), then 2 still needed: the smallest listing covering that is the 4
+    assert assignments == [(2, 101, 1, 6), (1, 101, 1, 4)]
+
+
+def test_partial_fulfilment_when_the_pool_runs_dry():
+    assignments = match([listing(1, 3, days=1), listing(2, 2, days=2)], [request(1, 10), request(2, 1, minutes=1)])
+    assert assignments == [(1, 101, 1, 3), (2, 101, 1, 2)]      #5 of 10, the later request gets nothing
+
+
+def test_requests_are_served_first_come_first_served():
+    assignments = match([listing(1, 10)], [request(1, 10, minutes=30), request(2, 10, minutes=5)])
+    assert assignments == [(1, 102, 2, 10)]
+
+
+def test_city_and_food_type_must_match():
+    listings = [listing(1, 10, city="Austin", food_type="Vegan"),
+                listing(2, 10, city=" austin ", food_type="Vegetarian"),
+                listing(3, 10, city="Dallas", food_type="Vegan")]
+    assignments = match(listings, [request(1, 10, city="AUSTIN", food_type="Vegetarian"),
+                                   request(2, 10, city="Houston", food_type="Vegan")])
+    assert assignments == [(2, 101, 1, 10)]
+
+
+def test_a_request_without_food_type_takes_any():
+    listings = [listing(1, 30, food_type="Vegan"), listing(2, 10, food_type="Non-Vegetarian"),
+                listing(3, 10, food_type=None)]
+    assignments = match(listings, [request(1, 10, food_type=allocation.ANY_FOOD),
+                                   request(2, 10, food_type=allocation.ANY_FOOD, minutes=1),
+                                   request(3, 10, food_type="Vegan", minutes=2)])
+    assert [(a[0], a[2]) for a in assignments] == [(2, 1), (3, 2), (1, 3)]
+
+
+def test_a_listing_is_claimed_once():
+    listings = [listing(food_id, 5) for food_id in range(1, 6)]
+    requests = [request(request_id, 7, minutes=request_id) for request_id in range(1, 5)]
+    assignments = match(listings, requests)
+    assert sorted(a[0] for a in assignments) == [1, 2, 3, 4, 5]
+
+
+def test_no_listings_or_requests():
+    assert match([], [request(1, 10)]) == []
+    assert match([listing(1, 10)], []) == []
@@ -0,0 +1,124 @@
+import io
+
+import pandas as pd
+import pytest
+
+import bulk
+
+# what bulk.table_schema returns for claims, without the database
+CLAIMS = [
+    {"name": "claim_id", "type": "integer", "not_null": True, "has_default": False, "pk": True},
+    {"name": "food_id", "type": "integer", "not_null": False, "has_default": False, "pk": False},
+    {"name": "receiver_id", "type": "integer", "not_null": False, "has_default": False, "pk": False},
+    {"name": "status", "type": "text", "not_null": False, "has_default": False, "pk": False},
+    {"name": "timestamp", "type": "timestamp without time zone", "not_null": True, "has_default": False, "pk": False},
+]
+
+
+def batch(text):
+    return bulk.read_batch(text)
+
+
+# ---------------------- Reading ----------------------
+@pytest.mark.parametrize("sep", [",", "\t", ";", "|"])
+def test_read_batch_sniffs_the_separator(sep):
+    df = batch(f"Claim_ID{sep}Status\n1{sep}Pending\n2{sep}\n")
+    assert list(df.columns) == ["claim_id", "status"]
+    assert df["claim_id"].tolist() == ["1", "2"]     #raw strings, validate does the typing
+    assert pd.isna(df.loc[1, "status"])
+
+
+def test_read_batch_from_an_upload_with_a_bom():
+    df = bulk.read_batch(io.BytesIO("\ufeffclaim_id\n7\n".encode("utf-8")))
+    assert list(df.columns) == ["claim_id"] and df["claim_id"].tolist() == ["7"]
+
+
+def test_parse_dates_takes_the_csv_formats_and_iso():
+    parsed = bulk.parse_dates(pd.Series(["3/14/2024", "3/14/2024 20:15", "2024-03-14T20:15:00", "soon", None]))
+    assert parsed.tolist()[:3] == [pd.Timestamp("2024-03-14"), pd.Timestamp("2024-03-14 20:15"),
+                                   pd.Timestamp("2024-03-14 20:15")]
+    assert parsed.iloc[3:].isna().all()
+
+
+# ---------------------- Validation ----------------------
+def test_validate_types_and_rejects_with_reasons():
+    df = batch("claim_id,food_id,status,timestamp\n"
+               "1,10,Pending,3/14/2024 20:15\n"
+               "2,ten,Pending,3/14/2024 20:15\n"
+               "3,10,Pending,\n"
+               "x,10,Pending,yesterday\n")
+    rows, rejects = bulk.validate(df, CLAIMS, "Add")
+    assert rows["claim_id"].tolist() == [1]
+    assert rows["timestamp"].tolist() == [pd.Timestamp("2024-03-14 20:15")]
+    assert rejects["reason"].tolist() == [
+        "invalid integer in food_id",
+        "missing timestamp",
+        "invalid integer in claim_id; invalid date in timestamp",
+    ]
+    assert rejects.index.tolist() == [1, 2, 3]       #the batch's own row numbers
+
+
+def test_validate_keeps_the_last_of_a_repeated_key():
+    df = batch("claim_id,status,timestamp\n1,Pending,3/14/2024\n1,Completed,3/14/2024\n")
+    rows, rejects = bulk.validate(df, CLAIMS, "Add")
+    assert rows["status"].tolist() == ["Completed"]
+    assert rejects["reason"].tolist() == ["primary key repeated further down the batch"]
+
+
+@pytest.mark.parametrize("text, action, message", [
+    ("claim_id,colour\n1,red\n", "Add", "unknown columns"),
+    ("status\nPending\n", "Update", "primary key"),
+    ("claim_id,status\n1,Pending\n", "Add", "can't be null"),
+    ("claim_id\n1\n", "Update", "nothing to update"),
+])
+def test_validate_refuses_unusable_batches(text, action, message):
+    with pytest.raises(ValueError, match=message):
+        bulk.validate(batch(text), CLAIMS, action)
+
+
+def test_delete_only_needs_the_key():
+    rows, rejects = bulk.validate(batch("claim_id,status\n1,\n2,Pending\n"), CLAIMS, "Delete")
+    assert list(rows.columns) == ["claim_id"] and rows["claim_id"].tolist() == [1, 2]
+    assert rejects.empty
+
+
+def test_update_does_not_need_every_not_null_column():
+    rows, rejects = bulk.validate(batch("claim_id,status\n1,Completed\n"), CLAIMS, "Update")
+    assert len(rows) == 1 and rejects.empty
+
+
+# ---------------------- Statements ----------------------
+def test_update_params_put_the_key_last():
+    rows, _ = bulk.validate(batch("claim_id,status\n1,Completed\n2,\n"), CLAIMS, "Update")
+    assert bulk.statement_params(rows, "Update", ["claim_id"]) == [("Completed", 1), (None, 2)]
+
+
+def test_upsert_updates_every_column_but_the_key():
+    query = bulk.upsert_query("claims", ["claim_id", "status"], ["claim_id"]).as_string(None)
+    assert 'on conflict ("claim_id") do update set "status" = excluded."status"' in query
+
+
+def test_upsert_of_the_key_alone_does_nothing_on_conflict():
+    assert "do nothing" in bulk.upsert_query("claims", ["claim_id"], ["claim_id"]).as_string(None)
+
+
+def test_keyed_upsert_updates_then_inserts_what_it_did_not_find():
+    types = {col["name"]: col["type"] for col in CLAIMS}
+    query = bulk.keyed_upsert_query("claims", ["claim_id", "timestamp"], ["claim_id"], types).as_string(None)
+    assert 'values (%s::integer, %s::timestamp without time zone)' in query
+    assert 'update "claims" as t set "timestamp" = b."timestamp" from batch as b where t."claim_id" = b."claim_id"' in query
+    assert "on conflict" not in query
+
+
+def test_keyed_upsert_of_the_key_alone_only_inserts():
+    query = bulk.keyed_upsert_query("claims", ["claim_id"], ["claim_id"], {"claim_id": "integer"}).as_string(None)
+    assert "update" not in query and 'insert into "claims"' in query
+
+
+@pytest.mark.parametrize("action, returned, result", [
+    ("Add", (True,), "inserted"), ("Add", (False,), "updated"),
+    ("Update", (True,), "updated"), ("Update", None, "not found"),
+    ("Delete", (True,), "deleted"), ("Delete", None, "not found"),
+])
+def test_outcome(action, returned, result):
+    assert bulk.outcome(action, returned) == result
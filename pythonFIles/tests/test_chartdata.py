@@ -0,0 +1,107 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import chartdata
+import summaries
+
+
+# ---------------------- Time Series ----------------------
+@pytest.mark.parametrize("days, bucket", [(0, "day"), (92, "day"), (93, "week"), (731, "week"), (732, "month")])
+def test_time_bucket(days, bucket):
+    first = datetime.date(2024, 1, 1)
+    assert chartdata.time_bucket(first, first + datetime.timedelta(days=days)) == bucket
+
+
+class Recorder:
+    #stands in for chartdata.run: remembers the sql and answers the span and bucket queries
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, cursor, query, params):
+        self.queries.append(query)
+        if "min(" in query:
+            return pd.DataFrame({"first_claim": [datetime.date(2025, 1, 1)], "last_claim": [datetime.date(2025, 2, 1)]})
+        return pd.DataFrame({"claim_date": [datetime.date(2025, 1, 1)], "count": [3]})
+
+
+@pytest.mark.parametrize("installed, live, summary", [(True, False, True), (True, True, False), (False, False, False)])
+def test_claims_series_reads_claims_daily_when_it_can(monkeypatch, installed, live, summary):
+    run = Recorder()
+    monkeypatch.setattr(chartdata, "run", run)
+    monkeypatch.setattr(summaries, "installed", lambda cursor: installed)
+    _, bucket = chartdata.claims_series(object(), live=live)
+    assert bucket == "day"
+    expected = [chartdata.CLAIMS_SPAN_SUMMARY_SQL, chartdata.CLAIMS_PER_BUCKET_SUMMARY_SQL] if summary \
+        else [chartdata.CLAIMS_SPAN_SQL, chartdata.CLAIMS_PER_BUCKET_SQL]
+    assert run.queries == expected
+
+
+def test_claims_series_on_the_snapshot_reads_claims(monkeypatch):
+    run = Recorder()
+    monkeypatch.setattr(chartdata, "run", run)
+    monkeypatch.setattr(summaries, "installed", lambda cursor: pytest.fail("no connection to check"))
+    chartdata.claims_series(None, resolution="week")
+    assert run.queries == [chartdata.CLAIMS_PER_BUCKET_SQL]
+
+
+# ---------------------- Downsampling ----------------------
+def test_lttb_leaves_short_series_alone():
+    df = pd.DataFrame({"x": range(10), "y": range(10)})
+    assert chartdata.lttb(df, "x", "y", 10) is df
+
+
+def test_lttb_keeps_the_ends_and_the_peaks():
+    ys = np.zeros(1000)
+    ys[[137, 512, 880]] = [50, -40, 70]
+    df = pd.DataFrame({"x": np.arange(1000), "y": ys})
+    out = chartdata.lttb(df, "x", "y", 20)
+    assert len(out) == 20
+    assert out["x"].iloc[0] == 0 and out["x"].iloc[-1] == 999
+    assert out["x"].is_monotonic_increasing
+    assert {137, 512, 880} <= set(out["x"])
+
+
+def test_lttb_on_dates():
+    days = pd.date_range("2024-01-01", periods=500, freq="D")
+    df = pd.DataFrame({"claim_date": days, "count": np.sin(np.arange(500) / 10)})
+    out = chartdata.lttb(df, "claim_date", "count", 50)
+    assert len(out) == 50
+    assert out["claim_date"].iloc[-1] == days[-1]
+
+
+# ---------------------- Categories ----------------------
+def test_top_n_folds_the_rest_into_other_last():
+    df = pd.DataFrame({"food": ["a", "b", "c", "d", "e"], "claims": [5, 50, 1, 30, 2]})
+    out = chartdata.top_n(df, "food", "claims", n=2)
+    assert out["food"].tolist() == ["b", "d", "Other"]
+    assert out["claims"].tolist() == [50, 30, 8]
+
+
+def test_top_n_leaves_few_labels_alone():
+    df = pd.DataFrame({"food": ["a", "b"], "claims": [1, 2]})
+    assert chartdata.top_n(df, "food", "claims", n=2) is df
+
+
+def test_top_n_per_color_and_categorical_labels():
+    df = pd.DataFrame({
+        "name": pd.Categorical(["a", "a", "b", "c", "c"]),
+        "status": ["Pending", "Completed", "Pending", "Pending", "Completed"],
+        "total": [10, 5, 1, 2, 3],
+    })
+    out = chartdata.top_n(df, "name", "total", n=1, color="status")
+    assert out.to_dict("records") == [
+        {"name": "a", "status": "Pending", "total": 10},
+        {"name": "a", "status": "Completed", "total": 5},
+        {"name": "Other", "status": "Pending", "total": 3},
+        {"name": "Other", "status": "Completed", "total": 3},
+    ]
+
+
+def test_top_n_mean_says_it_is_unweighted():
+    df = pd.DataFrame({"name": ["a", "b", "c"], "average_quantity": [9.0, 2.0, 4.0]})
+    out = chartdata.top_n(df, "name", "average_quantity", n=1, agg="mean")
+    assert out["name"].tolist() == ["a", "Other (unweighted mean)"]
+    assert out["average_quantity"].tolist() == [9.0, 3.0]
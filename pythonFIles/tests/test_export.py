@@ -0,0 +1,69 @@
+import contextlib
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+import export
+
+
+@pytest.fixture
+def server(monkeypatch):
+    #a fresh download server for the test, on the first free port after one held by "another process"
+    taken = socket.socket()
+    taken.bind(("localhost", 0))
+    taken.listen()
+    monkeypatch.setattr(export, "EXPORT_HOST", "localhost")
+    monkeypatch.setattr(export, "EXPORT_PORT", taken.getsockname()[1])
+    monkeypatch.setattr(export, "EXPORT_URL", "")
+    monkeypatch.setattr(export, "_server", None)
+    monkeypatch.setattr(export, "_server_error", None)
+    monkeypatch.setattr(export, "_links", {})
+    monkeypatch.setattr(export, "_tokens", {})
+    yield taken.getsockname()[1]
+    if export._server is not None:
+        export._server.shutdown()
+        export._server.server_close()
+    taken.close()
+
+
+def test_a_taken_port_moves_to_the_next_one(server, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_PORTS", 8)
+    link = export.register("select 1", None, "csv", "one")
+    port = export._server.server_address[1]
+    assert server < port < server + 8
+    assert link.startswith(f"http://localhost:{port}/export/")
+
+
+def test_no_free_port(server, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_PORTS", 1)
+    assert export.register("select 1", None, "csv", "one") is None
+    assert export.get_server()[1].startswith(f"can't listen on localhost:{server} ")
+
+
+@pytest.mark.parametrize("url, base", [("", "http://localhost:8512"),
+                                       ("https://exports.example:{port}/app/", "https://exports.example:8512/app/")])
+def test_export_url_gets_the_port(monkeypatch, url, base):
+    monkeypatch.setattr(export, "EXPORT_URL", url)
+    assert export.link_base(8512) == base
+
+
+class FakeConnection:
+    def cursor(self):
+        return None
+
+
+def test_any_failure_before_the_headers_is_an_error_page(server, monkeypatch):
+    #not a psycopg error: it still gets the 500 page instead of a dropped connection
+    monkeypatch.setattr(export, "connection", lambda: contextlib.nullcontext(FakeConnection()))
+
+    def stream(cursor, query, params, fmt):
+        raise RuntimeError("no such format")
+        yield
+    monkeypatch.setattr(export, "stream", stream)
+    link = export.register("select 1", None, "csv", "one")
+    with pytest.raises(urllib.error.HTTPError) as failed:
+        urllib.request.urlopen(link, timeout=5)
+    assert failed.value.code == 500
+    assert "no such format" in failed.value.read().decode()
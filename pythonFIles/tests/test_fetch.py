@@ -0,0 +1,125 @@
+import io
+import math
+
+import pandas as pd
+import pytest
+
+import fetch
+import schema
+
+# COPY (query) TO STDOUT (format csv, header true, null '\N') output, as postgres 16 writes it with
+# timezone UTC: NULL is a bare \N, the text \N and "" are quoted, quotes doubled, newlines kept in quotes
+COPY_OUTPUT = (
+    b'i,t,n,d,ts,tz,b,big\n'
+    b'1,plain,1.5,2025-03-05,2025-03-05 10:00:00,2025-03-05 08:00:00+00,t,9007199254740993\n'
+    b'\\N,"",\\N,\\N,\\N,\\N,\\N,\\N\n'
+    b'3,"a,b ""q""\nline2",0.1,1999-12-31,1999-12-31 23:59:59.123456,1999-12-31 23:59:59+00,f,-5\n'
+    b'4,"\\N",-12345678.25,2024-02-29,2024-02-29 00:00:00,2024-02-29 05:00:00+00,\\N,0\n'
+    b'5,\\N,NaN,\\N,\\N,\\N,t,\\N\n'
+)
+COLUMNS = [("i", "int4", None), ("t", "text", None), ("n", "numeric", None), ("d", "date", None),
+           ("ts", "timestamp", None), ("tz", "timestamptz", None), ("b", "bool", None), ("big", "int8", None)]
+
+PARSERS = [pytest.param(lambda buf, columns: fetch.parse_arrow(buf, columns, False, True), id="arrow"),
+           pytest.param(lambda buf, columns: fetch.parse_pandas(buf, columns, True), id="pandas")]
+if not fetch.HAVE_ARROW:
+    PARSERS.pop(0)
+
+
+def parse(parser, data=COPY_OUTPUT, columns=COLUMNS):
+    df = parser(io.BytesIO(data), columns)
+    df.columns = [name for name, _, _ in columns]
+    return df
+
+
+def is_null(value):
+    return value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value)) or value is pd.NaT
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_nulls_and_empty_strings(parser):
+    df = parse(parser)
+    assert all(is_null(value) for value in df.iloc[1, [0, 2, 3, 4, 5, 6, 7]])
+    assert df["t"][1] == ""         #"" is an empty string, only a bare \N is NULL
+    assert is_null(df["t"][4])
+
+
+def test_a_quoted_backslash_n_is_text():
+    if not fetch.HAVE_ARROW:
+        pytest.skip("the pandas parser reads it as null")
+    df = parse(PARSERS[0].values[0])
+    assert df["t"][3] == "\\N"
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_quoted_commas_quotes_and_newlines(parser):
+    assert parse(parser)["t"][2] == 'a,b "q"\nline2'
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_dates_and_timestamps(parser):
+    df = parse(parser)
+    assert pd.api.types.is_datetime64_any_dtype(df["d"]) and pd.api.types.is_datetime64_any_dtype(df["ts"])
+    assert df["d"][3] == pd.Timestamp("2024-02-29")
+    assert df["ts"][2] == pd.Timestamp("1999-12-31 23:59:59.123456")
+    assert str(df["tz"].dt.tz) == "UTC"
+    assert df["tz"][0] == pd.Timestamp("2025-03-05 08:00:00", tz="UTC")
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_numerics(parser):
+    df = parse(parser)
+    assert df["n"].dtype == "float64"
+    assert df["n"][2] == 0.1 and df["n"][3] == -12345678.25
+    assert math.isnan(df["n"][4])         #numeric NaN, not a parse error
+    assert df["i"].tolist()[0] == 1 and df["big"].tolist()[2] == -5
+    assert df["b"][0] and not df["b"][2]
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_ints_without_nulls_stay_exact(parser):
+    data = b'big\n9007199254740993\n-9223372036854775808\n'
+    df = parse(parser, data, [("big", "int8", None)])
+    assert df["big"].dtype == "int64"
+    assert df["big"].tolist() == [9007199254740993, -9223372036854775808]
+
+
+def test_to_frame_compacts_table_columns():
+    data = b'status,claim_id,total\nPending,1,2\nCompleted,2,\\N\n'
+    columns = [("status", "text", schema.STATUSES), ("claim_id", "int4", "int32"), ("total", "int8", None)]
+    df = fetch.to_frame(io.BytesIO(data), columns, "numpy")
+    assert list(df.columns) == ["status", "claim_id", "total"]
+    assert isinstance(df["status"].dtype, pd.CategoricalDtype)
+    assert list(df["status"].cat.categories[:3]) == schema.STATUSES
+    assert df["claim_id"].dtype == "int32"
+
+
+def test_copy_query():
+    assert fetch.copy_query("select 1") == "copy (select 1) to stdout (format csv, header true, null '\\N')"
+    assert fetch.describe_query("select 1") == "select * from (select 1) as q limit 0"
+
+
+# ---------------------- Describe Cache ----------------------
+class DescribeCursor:
+    #counts the limit 0 runs describe() makes, metadata.version and the origins are stubbed
+    def __init__(self):
+        self.described = 0
+
+    def execute(self, query, params=None):
+        self.described += 1
+
+
+def test_describe_is_cached_per_schema_version(monkeypatch):
+    version = ["v1"]
+    monkeypatch.setattr(fetch, "_describe_cache", {})
+    monkeypatch.setattr(fetch.metadata, "version", lambda cursor: version[0])
+    monkeypatch.setattr(fetch.schema, "origins_loaded", lambda v: True)
+    monkeypatch.setattr(fetch, "remember_columns", lambda cursor, v, query: fetch._describe_cache.setdefault(
+        (v, query), [("c", v, None)]))
+    cursor = DescribeCursor()
+    assert fetch.describe(cursor, "select c from t") == [("c", "v1", None)]
+    fetch.describe(cursor, "select c from t")
+    assert cursor.described == 1
+    version[0] = "v2"       #a migration ran
+    assert fetch.describe(cursor, "select c from t") == [("c", "v2", None)]
+    assert cursor.described == 2
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import geo
+
+
+# ---------------------- Distances ----------------------
+def test_haversine_known_distances():
+    assert geo.haversine_km(51.5074, -0.1278, 48.8566, 2.3522) == pytest.approx(343.5, abs=0.5)     #London - Paris
+    assert geo.haversine_km(0.0, 0.0, 0.0, 1.0) == pytest.approx(2 * np.pi * geo.EARTH_RADIUS_KM / 360)
+    assert geo.haversine_km(10.0, 20.0, 10.0, 20.0) == 0
+
+
+def test_haversine_on_arrays_and_across_the_antimeridian():
+    d = geo.haversine_km(0.0, 179.9, np.array([0.0, 0.0]), np.array([-179.9, 179.9]))
+    assert d == pytest.approx([2 * np.pi * geo.EARTH_RADIUS_KM * 0.2 / 360, 0.0])
+
+
+# ---------------------- Grid Search ----------------------
+def brute_force(lat, lon, ids, lats, lons, radius_km):
+    return set(ids[geo.haversine_km(lat, lon, lats, lons) <= radius_km].tolist())
+
+
+@pytest.fixture(scope="module")
+def providers():
+    rng = np.random.default_rng(7)
+    n = 20_000
+    #spread everywhere, with crowds near a pole and on both sides of the antimeridian
+    lats = np.r_[rng.uniform(-90, 90, n), rng.uniform(85, 90, n // 4), rng.uniform(-10, 10, n // 4)]
+    lons = np.r_[rng.uniform(-180, 180, n), rng.uniform(-180, 180, n // 4),
+                 rng.choice([-1, 1], n // 4) * rng.uniform(178, 180, n // 4)]
+    return np.arange(len(lats), dtype=np.int64), lats, lons
+
+
+@pytest.mark.parametrize("lat, lon, radius_km", [
+    (40.7, -74.0, 10),          #a city
+    (40.7, -74.0, 200),
+    (70.0, 20.0, 200),          #far north, the circle is widest poleward of its centre
+    (-75.0, 100.0, 500),
+    (89.5, 0.0, 100),           #over the pole
+    (0.0, 179.95, 50),          #over the antimeridian
+    (10.0, -179.9, 200),
+    (0.0, 0.0, 0.5),            #inside one cell
+])
+def test_within_finds_exactly_the_providers_in_the_radius(providers, lat, lon, radius_km):
+    ids, lats, lons = providers
+    grid = geo.ProviderGrid(ids, lats, lons)
+    found, distance = grid.within(lat, lon, radius_km)
+    assert set(found.tolist()) == brute_force(lat, lon, ids, lats, lons, radius_km)
+    assert len(set(found.tolist())) == len(found)
+    assert (distance <= radius_km).all()
+
+
+def test_grid_cells_hold_every_provider(providers):
+    ids, lats, lons = providers
+    grid = geo.ProviderGrid(ids, lats, lons, cell=1.0)
+    assert grid.size == len(ids)
+    assert sum(len(cell[0]) for cell in grid.cells.values()) == len(ids)
+    for (row, col), (cell_ids, cell_lats, cell_lons) in list(grid.cells.items())[:50]:
+        assert (np.floor(cell_lats) == row).all() and (np.floor(cell_lons) == col).all()
+
+
+def test_within_on_an_empty_area():
+    grid = geo.ProviderGrid(np.array([1], dtype=np.int64), np.array([10.0]), np.array([10.0]))
+    found, distance = grid.within(-40.0, -70.0, 25)
+    assert len(found) == 0 and len(distance) == 0
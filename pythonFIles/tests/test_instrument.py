@@ -0,0 +1,96 @@
+import collections
+import json
+import os
+import time
+
+import psycopg
+import pytest
+
+import instrument
+
+
+@pytest.fixture(autouse=True)
+def buffer(monkeypatch):
+    ring = collections.deque(maxlen=3)
+    monkeypatch.setattr(instrument, "_records", ring)
+    monkeypatch.setattr(instrument, "QUERY_LOG_PATH", "")
+    return ring
+
+
+def test_record_keeps_the_call():
+    with instrument.page("Overview"):
+        instrument.record(None, "select *\n  from   claims", time.perf_counter() - 0.25, 12, 345)
+    (entry,) = instrument.records()
+    assert entry["page"] == "Overview"
+    assert entry["query"] == "select * from claims"
+    assert entry["ms"] >= 250 and entry["rows"] == 12 and entry["bytes"] == 345 and entry["error"] is None
+
+
+def test_record_outside_a_page_and_failed_calls():
+    error = psycopg.errors.UndefinedTable('relation "nope" does not exist\n')
+    instrument.record(None, b"select 1 from nope", time.perf_counter(), -1, None, error)
+    (entry,) = instrument.records()
+    assert entry["page"] is None and entry["rows"] is None
+    assert entry["error"] == 'UndefinedTable: relation "nope" does not exist'
+
+
+def test_the_buffer_keeps_the_last_calls():
+    for i in range(5):
+        instrument.record(None, f"select {i}", time.perf_counter(), 1, 1)
+    assert [entry["query"] for entry in instrument.records()] == ["select 2", "select 3", "select 4"]
+    instrument.clear()
+    assert instrument.records() == []
+
+
+def test_slow_and_failed_calls_go_to_the_log(tmp_path, monkeypatch):
+    log = tmp_path / "slow.jsonl"
+    monkeypatch.setattr(instrument, "QUERY_LOG_PATH", str(log))
+    monkeypatch.setattr(instrument, "SLOW_QUERY_MS", 100)
+    instrument.record(None, "select fast", time.perf_counter(), 1, 1)
+    instrument.record(None, "select slow", time.perf_counter() - 0.2, 1, 1)
+    instrument.record(None, "select broken", time.perf_counter(), None, None, ValueError("bad"))
+    logged = [json.loads(line)["query"] for line in log.read_text().splitlines()]
+    assert logged == ["select slow", "select broken"]
+
+
+def test_export_writes_a_new_file_in_the_export_directory(tmp_path):
+    instrument.record(None, "select 1", time.perf_counter(), 1, 1)
+    instrument.record(None, "select 2", time.perf_counter(), 1, 1)
+    written, path = instrument.export(str(tmp_path / "exports"))
+    again, other = instrument.export(str(tmp_path / "exports"))
+    assert written == again == 2 and path != other
+    assert os.path.dirname(path) == str(tmp_path / "exports")
+    assert os.path.basename(path).startswith("query_log_") and path.endswith(".jsonl")
+    assert [json.loads(line)["query"] for line in open(path)] == ["select 1", "select 2"]
+
+
+class Result:
+    #a libpq result of rows x fields values of width bytes
+    def __init__(self, rows, fields, width):
+        self.ntuples, self.nfields, self.width = rows, fields, width
+
+    def get_value(self, row, col):
+        return b"x" * self.width if col else None      #first column NULL
+
+
+def test_result_bytes_samples_big_results():
+    assert instrument.result_bytes(None) == 0
+    assert instrument.result_bytes(Result(0, 3, 5)) == 0
+    assert instrument.result_bytes(Result(10, 3, 5)) == 100
+    assert instrument.result_bytes(Result(100_000, 3, 5)) == 1_000_000      #from the first SAMPLE_ROWS rows
+
+
+class Copy:
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.closed = False
+
+    def read(self):
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+def test_counting_copy():
+    counting = instrument.CountingCopy(Copy([b"1,a\n", b"2,bb\n"]))
+    assert b"".join(counting) == b"1,a\n2,bb\n"
+    assert counting.nbytes == 9
+    assert counting.closed is False         #everything else goes to the wrapped copy
@@ -0,0 +1,101 @@
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg
+
+import loader
+
+
+def claims_chunk(rows):
+    #the csv's capitalised headers, every value a string as load_table reads them
+    return pd.DataFrame(rows, columns=["Claim_ID", "Food_ID", "Receiver_ID", "Status", "Timestamp"], dtype=object)
+
+
+# ---------------------- Chunk Parsing ----------------------
+def test_parse_chunk_keeps_good_rows_typed():
+    good, bad = loader.parse_chunk(claims_chunk([["1", "10", "100", "Pending", "3/14/2024 20:15"]]), "claims")
+    assert bad.empty
+    assert list(good.columns) == loader.COLUMNS["claims"]
+    assert good["claim_id"].tolist() == [1]
+    assert good["timestamp"].iloc[0] == pd.Timestamp("2024-03-14 20:15")
+
+
+def test_parse_chunk_rejects_with_every_reason():
+    chunk = claims_chunk([
+        ["1", "10", "100", "Pending", "3/14/2024 20:15"],
+        ["x", "10", "100", "Pending", "3/14/2024 20:15"],
+        ["3", "ten", "100", "Pending", "not a date"],
+        [None, "10", "100", "Pending", "3/14/2024 20:15"],
+    ])
+    good, bad = loader.parse_chunk(chunk, "claims")
+    assert good["claim_id"].tolist() == [1]
+    assert bad.index.tolist() == [1, 2, 3]
+    assert bad.loc[1, "reject_reason"] == "invalid integer in claim_id"
+    assert bad.loc[2, "reject_reason"] == "invalid integer in food_id; invalid date in timestamp"
+    assert bad.loc[3, "reject_reason"] == "missing claim_id"
+    assert bad.loc[1, "claim_id"] == "x"     #rejects keep the raw text
+
+
+def test_parse_chunk_needs_every_column():
+    chunk = claims_chunk([["1", "10", "100", "Pending", "3/14/2024 20:15"]]).drop(columns="Status")
+    try:
+        loader.parse_chunk(chunk, "claims")
+    except ValueError as e:
+        assert "status" in str(e)
+    else:
+        raise AssertionError("a missing column must be reported")
+
+
+def test_optional_columns_only_when_present():
+    chunk = pd.DataFrame([["1", "P", "Restaurant", "a", "c", "x", "1.5", "2.5"]],
+                         columns=["Provider_ID", "Name", "Type", "Address", "City", "Contact", "Latitude", "Longitude"])
+    good, _ = loader.parse_chunk(chunk, "providers")
+    assert good["latitude"].tolist() == [1.5]
+    good, _ = loader.parse_chunk(chunk.drop(columns=["Latitude", "Longitude"]), "providers")
+    assert "latitude" not in good.columns
+
+
+# ---------------------- Savepoint Fallback ----------------------
+class FakeConnection:
+    def __init__(self):
+        self.savepoints = 0
+
+    @contextmanager
+    def transaction(self):
+        self.savepoints += 1
+        yield
+
+
+class FakeCursor:
+    #refuses the rows whose first value is in refused, the way a constraint would
+    def __init__(self, refused):
+        self.connection = FakeConnection()
+        self.refused = refused
+        self.inserted = []
+
+    def execute(self, query, row):
+        if row[0] in self.refused:
+            raise psycopg.errors.UniqueViolation("duplicate key value violates unique constraint\nDETAIL: ...")
+        self.inserted.append(row)
+
+
+def test_insert_rows_one_by_one_keeps_the_rest():
+    df = pd.DataFrame({"claim_id": [1, 2, 3], "status": ["Pending", None, "Completed"]}, index=[10, 11, 12])
+    cur = FakeCursor(refused={2})
+    failed = loader.insert_rows_one_by_one(cur, "claims", df)
+    assert failed == [(11, "duplicate key value violates unique constraint")]
+    assert cur.inserted == [(1, "Pending"), (3, "Completed")]
+    assert cur.connection.savepoints == 3       #one savepoint per row
+
+
+# ---------------------- Reject Files ----------------------
+def test_reject_writer_creates_the_file_on_first_bad_row(tmp_path):
+    writer = loader.RejectWriter(str(tmp_path / "rejects"), "claims")
+    writer.write(pd.DataFrame())
+    assert not (tmp_path / "rejects").exists()
+    writer.write(pd.DataFrame({"claim_id": ["x"], "reject_reason": ["invalid integer in claim_id"]}))
+    writer.write(pd.DataFrame({"claim_id": [None], "reject_reason": ["missing claim_id"]}))
+    writer.close()
+    assert writer.count == 2
+    assert (tmp_path / "rejects" / "claims_rejects.csv").read_text().splitlines() == [
+        "claim_id,reject_reason", "x,invalid integer in claim_id", ",missing claim_id"]
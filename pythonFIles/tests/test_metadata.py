@@ -0,0 +1,51 @@
+import metadata
+
+ROW = ("claims", 1, "claim_id", "integer", True, False, False, True, 16400)
+
+
+class CatalogCursor:
+    #answers the two catalog statements metadata.py runs through prepared.execute
+    def __init__(self):
+        self.fingerprint = "a"
+        self.rows = [ROW]
+        self.ran = []
+        self.result = None
+
+    def execute(self, name):
+        self.ran.append(name)
+        self.result = [(self.fingerprint,)] if name == "schema_fingerprint" else self.rows
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+def fresh(monkeypatch, ttl):
+    monkeypatch.setattr(metadata, "_tables", None)
+    monkeypatch.setattr(metadata, "_fingerprint", None)
+    monkeypatch.setattr(metadata, "METADATA_TTL_SECONDS", ttl)
+    monkeypatch.setattr(metadata.prepared, "execute", lambda cursor, name, params=None: cursor.execute(name))
+    return CatalogCursor()
+
+
+def test_version_follows_the_fingerprint(monkeypatch):
+    cursor = fresh(monkeypatch, 0)
+    assert metadata.version(cursor) == "a"
+    assert metadata.get(cursor)["claims"][0]["pk"]
+    cursor.fingerprint = "b"        #a migration ran
+    cursor.rows = [ROW[:-1] + (16500,), ("claims", 2, "note", "text", False, False, False, False, 16500)]
+    assert metadata.version(cursor) == "b"
+    assert metadata.column_names(cursor, "claims") == ["claim_id", "note"]
+
+
+def test_unchanged_fingerprint_skips_the_columns_and_ttl_skips_both(monkeypatch):
+    cursor = fresh(monkeypatch, 0)
+    metadata.get(cursor)
+    metadata.get(cursor)
+    assert cursor.ran == ["schema_fingerprint", "schema_columns", "schema_fingerprint"]
+    cursor = fresh(monkeypatch, 60)
+    metadata.get(cursor)
+    metadata.version(cursor)
+    assert cursor.ran == ["schema_fingerprint", "schema_columns"]
@@ -0,0 +1,62 @@
+import asyncio
+
+import pandas as pd
+import psycopg
+import psycopg_pool
+import pytest
+
+import overview
+import query_cache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = query_cache.QueryCache(ttl_seconds=60)
+    monkeypatch.setattr(query_cache, "get_cache", lambda: fresh)
+    monkeypatch.setattr(overview, "TIMEOUT_GRACE", 0.05)
+    return fresh
+
+
+def run(fetch_panel, monkeypatch, query="select 1", timeout=0.1):
+    monkeypatch.setattr(overview, "fetch_panel", fetch_panel)
+    return asyncio.run(overview.run_panel("panel", query, None, ["claims"], "live", timeout))
+
+
+def test_result_is_cached(cache, monkeypatch):
+    calls = []
+
+    async def fetch_panel(query, params, timeout):
+        calls.append(query)
+        return pd.DataFrame({"n": [1]})
+    first = run(fetch_panel, monkeypatch)
+    second = run(fetch_panel, monkeypatch)
+    assert first["error"] is None and first["df"]["n"].tolist() == [1] and not first["cached"]
+    assert second["cached"] and calls == ["select 1"]
+
+
+def test_client_side_timeout(cache, monkeypatch):
+    async def fetch_panel(query, params, timeout):
+        await asyncio.sleep(5)
+    result = run(fetch_panel, monkeypatch)
+    assert result["error"] == "timed out after 0.1 s" and result["df"] is None
+
+
+def test_statement_timeout(cache, monkeypatch):
+    async def fetch_panel(query, params, timeout):
+        raise psycopg.errors.QueryCanceled("canceling statement due to statement timeout")
+    assert run(fetch_panel, monkeypatch)["error"] == "timed out after 0.1 s"
+
+
+@pytest.mark.parametrize("error, message", [
+    (psycopg.errors.UndefinedTable('relation "claims_daily" does not exist'), 'relation "claims_daily" does not exist'),
+    (psycopg_pool.PoolTimeout("couldn't get a connection after 10.00 sec"), "couldn't get a connection after 10.00 sec"),
+    (ValueError("cannot convert float NaN to integer"), "cannot convert float NaN to integer"),
+    (KeyError("status"), "'status'"),
+    (RuntimeError(), "RuntimeError"),
+])
+def test_any_error_stays_in_its_panel(cache, monkeypatch, error, message):
+    async def fetch_panel(query, params, timeout):
+        raise error
+    result = run(fetch_panel, monkeypatch)
+    assert result["error"] == message and result["df"] is None
+    assert cache.get(query_cache.cache_key("select 1")) is None      #failures aren't cached
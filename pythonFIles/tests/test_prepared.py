@@ -0,0 +1,66 @@
+import psycopg
+import pytest
+from psycopg import pq
+
+import prepared
+
+IDLE, INTRANS, INERROR = pq.TransactionStatus.IDLE, pq.TransactionStatus.INTRANS, pq.TransactionStatus.INERROR
+
+
+class Info:
+    def __init__(self, status):
+        self.transaction_status = status
+
+
+class Connection:
+    def __init__(self, status=IDLE):
+        self.info = Info(status)
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = IDLE
+
+
+class Cursor:
+    #fails the first `fail` prepared executes like a statement prepared before a migration
+    def __init__(self, connection, fail=0):
+        self.connection = connection
+        self.fail = fail
+        self.ran = []
+
+    def execute(self, query, params=None, prepare=None):
+        self.ran.append("deallocate all" if query == "deallocate all" else f"prepared {params}" if prepare else query)
+        if prepare and self.fail:
+            self.fail -= 1
+            self.connection.info.transaction_status = INERROR
+            raise psycopg.errors.FeatureNotSupported("cached plan must not change result type")
+        if self.connection.info.transaction_status == IDLE:
+            self.connection.info.transaction_status = INTRANS
+
+
+def test_a_plain_execute_without_savepoints():
+    cursor = Cursor(Connection())
+    prepared.execute(cursor, "receiver_location", (7,))
+    assert cursor.ran == ["prepared (7,)"]
+
+
+def test_a_stale_plan_that_began_the_transaction_is_retried():
+    conn = Connection(IDLE)
+    cursor = Cursor(conn, fail=1)
+    prepared.execute(cursor, "receiver_location", (7,))
+    assert cursor.ran == ["prepared (7,)", "deallocate all", "prepared (7,)"]
+    assert conn.rollbacks == 1
+
+
+def test_a_stale_plan_in_a_callers_transaction_goes_up_and_heals_next_time():
+    conn = Connection(INTRANS)
+    cursor = Cursor(conn, fail=1)
+    with pytest.raises(psycopg.errors.FeatureNotSupported):
+        prepared.execute(cursor, "receiver_location", (7,))
+    assert conn.rollbacks == 0          #the caller's transaction is the caller's to roll back
+    conn.rollback()
+    prepared.execute(cursor, "table_estimate", ("claims",))
+    assert cursor.ran == ["prepared (7,)", "deallocate all", "prepared ('claims',)"]
+    prepared.execute(cursor, "table_estimate", ("claims",))
+    assert cursor.ran[-2:] == ["prepared ('claims',)", "prepared ('claims',)"]
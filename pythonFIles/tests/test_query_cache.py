@@ -0,0 +1,88 @@
+import pandas as pd
+
+import catalog
+import query_cache
+from query_cache import QueryCache
+
+
+def frame(rows=3):
+    return pd.DataFrame({"x": range(rows)})
+
+
+# ---------------------- Table Tags ----------------------
+def test_tables_read_finds_from_and_join():
+    query = """select * from food_listings f
+               JOIN Claims c on c.food_id = f.food_id
+               join (select 1 from generate_series(1, 2)) g on true"""
+    assert catalog.tables_read(query) == ["claims", "food_listings"]
+
+
+def test_every_catalog_query_is_tagged():
+    for query in [*catalog.ANALYTICS_QUERIES.values(), *catalog.LEARNER_QUERIES.values()]:
+        if query is not None:
+            assert catalog.tables_read(query), query
+
+
+def test_invalidate_drops_only_entries_reading_the_table():
+    cache = QueryCache(ttl_seconds=60)
+    cache.put(("a", ()), frame(), ["claims"])
+    cache.put(("b", ()), frame(), ["providers"])
+    cache.put(("c", ()), frame(), ["claims", "food_listings"])
+    assert cache.invalidate(["claims"]) == 2
+    assert cache.get(("a", ())) is None and cache.get(("c", ())) is None
+    assert cache.get(("b", ())) is not None
+
+
+def test_result_read_before_a_write_is_not_stored():
+    #the generation is taken before the query runs; a write landing meanwhile makes the result stale
+    cache = QueryCache(ttl_seconds=60)
+    generation = cache.generation(["claims"])
+    cache.invalidate(["claims"])
+    cache.put(("a", ()), frame(), ["claims"], generation)
+    assert cache.get(("a", ())) is None
+    cache.put(("a", ()), frame(), ["claims"], cache.generation(["claims"]))
+    assert cache.get(("a", ())) is not None
+
+
+# ---------------------- Expiry and Size ----------------------
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = QueryCache(ttl_seconds=10)
+    cache.put(("a", ()), frame(), ["claims"])
+    now[0] = 109.9
+    assert cache.get(("a", ())) is not None
+    now[0] = 110.0
+    assert cache.get(("a", ())) is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_least_recently_used_is_evicted_first():
+    size = int(frame().memory_usage(deep=True).sum())
+    cache = QueryCache(ttl_seconds=60, max_bytes=size * 2)
+    cache.put(("a", ()), frame(), [])
+    cache.put(("b", ()), frame(), [])
+    cache.get(("a", ()))                     #a is now the most recently used
+    cache.put(("c", ()), frame(), [])
+    assert cache.get(("b", ())) is None
+    assert cache.get(("a", ())) is not None and cache.get(("c", ())) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_result_larger_than_the_cap_is_not_kept():
+    cache = QueryCache(ttl_seconds=60, max_bytes=10)
+    cache.put(("a", ()), frame(1000), [])
+    assert cache.stats()["entries"] == 0
+
+
+def test_cached_query_runs_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(query_cache, "_cache", QueryCache(ttl_seconds=60))
+    monkeypatch.setattr(query_cache, "run_query", lambda cursor, query, params=None: calls.append(query) or frame())
+    query_cache.cached_query(None, "select * from claims", ("x",))
+    query_cache.cached_query(None, "select * from claims", ("x",))
+    query_cache.cached_query(None, "select * from claims", ("y",))
+    assert len(calls) == 2
+    query_cache.invalidate(["claims"])
+    query_cache.cached_query(None, "select * from claims", ("x",))
+    assert len(calls) == 3
@@ -0,0 +1,86 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import schema
+
+
+# ---------------------- Column Types ----------------------
+def test_types_for_ignores_case_and_unknown_columns():
+    assert schema.types_for("claims", ["Claim_ID", "Status", "note"]) == ["int32", schema.STATUSES, None]
+    assert schema.types_for("nope", ["claim_id"]) == [None]
+
+
+@pytest.mark.parametrize("col_type, category", [
+    (None, False), ("int32", False), ("datetime", False), ("category", True), (schema.STATUSES, True)])
+def test_is_category(col_type, category):
+    assert schema.is_category(col_type) == category
+
+
+# ---------------------- Conversion ----------------------
+def test_int32_with_and_without_nulls():
+    assert schema.convert(pd.Series([1, 2, 3]), "int32").dtype == "int32"
+    with_null = schema.convert(pd.Series([1.0, None, 3.0]), "int32")
+    assert with_null.dtype == "Int32" and with_null.isna().tolist() == [False, True, False]
+
+
+@pytest.mark.parametrize("col", [
+    pd.Series([1, 2**31]),                    #out of range: left for the database checks to report
+    pd.Series([None, None], dtype="float64"),
+    pd.Series(["1", "2"]),                    #not numeric yet
+    pd.Series([], dtype="int64"),
+])
+def test_int32_leaves_what_it_cannot_narrow(col):
+    assert schema.convert(col, "int32") is col
+
+
+def test_datetime_parses_strings_and_keeps_datetimes():
+    parsed = schema.convert(pd.Series(["2025-03-05 10:00", "2025-03-06 08:30"]), "datetime")
+    assert pd.api.types.is_datetime64_any_dtype(parsed.dtype)
+    stamps = pd.Series(pd.to_datetime(["2025-03-05"]))
+    assert schema.convert(stamps, "datetime") is stamps
+
+
+def test_category_puts_the_known_values_first():
+    col = schema.convert(pd.Series(["Completed", "Expired", "Pending", "Completed"]), schema.STATUSES)
+    assert list(col.cat.categories) == ["Pending", "Completed", "Cancelled", "Expired"]
+    assert col.astype(str).tolist() == ["Completed", "Expired", "Pending", "Completed"]
+
+
+def test_open_category_keeps_the_data_values():
+    col = schema.convert(pd.Series(["Pune", "Delhi", "Pune"], dtype="category"), "category")
+    assert list(col.cat.categories) == ["Delhi", "Pune"]
+
+
+def test_arrow_columns_stay_arrow():
+    ints = schema.convert(pd.Series([1, None, 3], dtype="int64[pyarrow]"), "int32")
+    assert ints.dtype == "int32[pyarrow]" and ints.isna().tolist() == [False, True, False]
+    text = schema.convert(pd.Series(["Lunch", "Dinner"], dtype=pd.ArrowDtype(pa.string())), schema.MEAL_TYPES)
+    assert pa.types.is_dictionary(text.dtype.pyarrow_dtype)
+    stamps = pd.Series(pd.to_datetime(["2025-03-05"])).astype("timestamp[us][pyarrow]")
+    assert schema.convert(stamps, "datetime") is stamps
+
+
+def test_compact_goes_by_position():
+    #two result columns named count, only the second one is typed
+    df = pd.DataFrame([[1, "Pending"], [2, "Completed"]], columns=["count", "count"])
+    schema.compact(df, [None, schema.STATUSES])
+    assert df.dtypes.iloc[0] == "int64"
+    assert isinstance(df.dtypes.iloc[1], pd.CategoricalDtype)
+
+
+def test_apply_uses_the_csv_names():
+    df = pd.DataFrame({"Claim_ID": [1, 2], "Status": ["Pending", "Cancelled"], "Timestamp": ["2025-03-05", "2025-03-06"]})
+    out = schema.apply(df, "claims")
+    assert out["Claim_ID"].dtype == "int32"
+    assert isinstance(out["Status"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(out["Timestamp"].dtype)
+
+
+def test_origins_are_kept_per_schema_version(monkeypatch):
+    monkeypatch.setattr(schema, "_origins", None)
+    monkeypatch.setattr(schema, "_origins_version", None)
+    schema.remember_origins([(16400, 1, "claims", "claim_id"), (16400, 4, "claims", "status")], "v1")
+    assert schema.origins_loaded("v1") and not schema.origins_loaded("v2")     #v2: claims was recreated
+    assert schema.type_of_origin(16400, 4) == schema.STATUSES
+    assert schema.type_of_origin(16400, 9) is None and schema.type_of_origin(0, 0) is None
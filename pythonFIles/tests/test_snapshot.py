@@ -0,0 +1,119 @@
+import datetime
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import export
+import fetch
+import snapshot
+
+
+# ---------------------- Export ----------------------
+CLAIM_COLUMNS = [("claim_id", "int4", None), ("status", "text", "status"), ("timestamp", "timestamp", "datetime")]
+
+
+def claims(ids, stamps):
+    return pa.table({"claim_id": pa.array(ids, pa.int32()),
+                     "status": pa.array(["Completed"] * len(ids)).dictionary_encode(),
+                     "timestamp": pa.array(stamps, pa.timestamp("us"))})
+
+
+@pytest.fixture
+def source(monkeypatch):
+    #stands in for the database: describe answers columns, row_groups yields the given groups
+    #and both remember the query they were asked for
+    given = {"columns": CLAIM_COLUMNS, "groups": [], "queries": []}
+
+    def describe(cursor, query, params=None):
+        given["queries"].append(query)
+        return given["columns"]
+
+    def row_groups(cursor, query, params, target):
+        given["queries"].append(query)
+        for group in given["groups"]:
+            yield group.cast(target)
+
+    monkeypatch.setattr(fetch, "describe", describe)
+    monkeypatch.setattr(export, "row_groups", row_groups)
+    return given
+
+
+def test_partitioned_table_is_split_by_month(source, tmp_path):
+    jan, feb, mar = datetime.datetime(2025, 1, 9), datetime.datetime(2025, 2, 3), datetime.datetime(2025, 3, 1)
+    #february runs across two row groups and must still end up in one file, nulls sort last
+    source["groups"] = [claims([1, 2, 3], [jan, jan, feb]), claims([4, 5, 6], [feb, mar, None])]
+    path = str(tmp_path / "claims")
+    assert snapshot.export_table(object(), "claims", path) == 6
+    assert source["queries"] == ['select * from claims order by "timestamp"'] * 2
+    assert sorted(os.listdir(path)) == ["month=2025-01", "month=2025-02", "month=2025-03", "month=none"]
+    ids = {month: pq.read_table(os.path.join(path, month, "part-0.parquet")).column("claim_id").to_pylist()
+           for month in os.listdir(path)}
+    assert ids == {"month=2025-01": [1, 2], "month=2025-02": [3, 4], "month=2025-03": [5], "month=none": [6]}
+
+
+def test_partitioned_table_keeps_the_schema(source, tmp_path):
+    source["groups"] = [claims([1], [datetime.datetime(2025, 1, 9, 12, 30)])]
+    path = str(tmp_path / "claims")
+    snapshot.export_table(object(), "claims", path)
+    table = pq.read_table(os.path.join(path, "month=2025-01", "part-0.parquet"))
+    assert table.schema == export.arrow_schema(CLAIM_COLUMNS)
+    assert table.column("timestamp").to_pylist() == [datetime.datetime(2025, 1, 9, 12, 30)]
+
+
+def test_empty_partitioned_table(source, tmp_path):
+    path = str(tmp_path / "claims")
+    assert snapshot.export_table(object(), "claims", path) == 0
+    assert os.listdir(path) == ["month=none"]       #something for the engine's glob to match
+    table = pq.read_table(os.path.join(path, "month=none", "part-0.parquet"))
+    assert table.num_rows == 0 and table.schema == export.arrow_schema(CLAIM_COLUMNS)
+
+
+def test_unpartitioned_table_is_one_file(source, tmp_path):
+    source["columns"] = [("provider_id", "int4", None), ("joined", "date", None)]
+    first, second = datetime.date(2024, 5, 1), datetime.date(2024, 6, 1)
+    source["groups"] = [pa.table({"provider_id": pa.array([1, 2], pa.int32()), "joined": pa.array([first, None])}),
+                        pa.table({"provider_id": pa.array([3], pa.int32()), "joined": pa.array([second])})]
+    path = str(tmp_path / "providers")
+    assert snapshot.export_table(object(), "providers", path) == 3
+    assert source["queries"] == ["select * from providers"] * 2
+    table = pq.read_table(path + ".parquet")
+    assert table.schema.field("joined").type == pa.date32()      #a date, not a timestamp
+    assert table.to_pydict() == {"provider_id": [1, 2, 3], "joined": [first, None, second]}
+
+
+def test_prune_keeps_the_newest_snapshots(tmp_path):
+    for name in ["20250101T000000Z", "20250102T000000Z", "20250103T000000Z", "20250104T000000Z"]:
+        os.makedirs(tmp_path / name)
+        (tmp_path / name / "manifest.json").write_text("{}")
+    os.makedirs(tmp_path / "20250105T000000Z")      #still being written, no manifest yet
+    snapshot.prune(str(tmp_path), 2)
+    assert sorted(os.listdir(tmp_path)) == ["20250103T000000Z", "20250104T000000Z", "20250105T000000Z"]
+
+
+# ---------------------- Names ----------------------
+def test_postgres_names():
+    df = pd.DataFrame({"City": ["a"], "count(claim_id)": [3], "round(avg(quantity), 2)": [1.5], "sum(x) as y": [1]})
+    df = snapshot.postgres_names(df, ["VARCHAR", "BIGINT", "DOUBLE", "BIGINT"])
+    assert list(df.columns) == ["city", "count", "round", "sum(x) as y"]
+
+
+@pytest.mark.parametrize("values, dtype", [([3.0, 4.0], "int64"), ([3.0, None], "Int64")])
+def test_postgres_names_makes_hugeint_an_int(values, dtype):
+    df = snapshot.postgres_names(pd.DataFrame({"total": values, "share": [0.5, 0.5]}), ["HUGEINT", "DOUBLE"])
+    assert str(df["total"].dtype) == dtype
+    assert df["total"].tolist()[0] == 3
+    assert str(df["share"].dtype) == "float64"
+
+
+def test_postgres_names_on_duckdb_sum():
+    duckdb = pytest.importorskip("duckdb")
+    duck = duckdb.connect()
+    duck.execute("select City, sum(q) from (values ('a', 2), ('a', 3), ('b', 1)) as t(City, q) group by City order by City")
+    types = [desc[1] for desc in duck.description]
+    df = snapshot.postgres_names(duck.df(), types)
+    assert list(df.columns) == ["city", "sum"]
+    assert str(df["sum"].dtype) == "int64"
+    assert df["sum"].tolist() == [5, 1]
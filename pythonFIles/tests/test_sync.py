@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import loader
+import metadata
+import sync
+
+HEADER = "Claim_ID,Food_ID,Receiver_ID,Status,Timestamp\n"
+ROWS = [
+    "1,10,100,Pending,3/5/2025 10:00",
+    "2,11,101,Completed,3/6/2025 11:30",
+    "3,12,102,Cancelled,3/7/2025 09:15",
+    "4,13,103,Pending,3/8/2025 16:45",
+]
+
+
+class FakeCursor:
+    #answers the two sync_fingerprints queries from a dict of id -> hash
+    def __init__(self, stored):
+        self.stored = stored
+        self.lookups = 0
+        self.result = None
+
+    def execute(self, query, params, binary=False):
+        if "not exists" in query:
+            _, seen = params
+            seen = {int(key) for key in seen.strip("{}").split(",") if key}
+            self.result = ([key for key in sorted(self.stored) if key not in seen] or None,)
+        else:
+            keys, _, low, high = params
+            keys = [int(key) for key in keys.strip("{}").split(",") if key]
+            found = [key for key in keys if key in self.stored and low <= key <= high]
+            self.result = (found or None, [self.stored[key] for key in found] or None)
+            self.lookups += 1
+
+    def fetchone(self):
+        return self.result
+
+
+@pytest.fixture(autouse=True)
+def claims_columns(monkeypatch):
+    not_null = {"claim_id", "timestamp"}
+    monkeypatch.setattr(metadata, "columns", lambda cursor, table: [
+        {"name": name, "not_null": name in not_null} for name in loader.COLUMNS[table]])
+
+
+def scan(tmp_path, rows, stored, chunk_size=2):
+    path = tmp_path / "claims_data.csv"
+    path.write_text(HEADER + "\n".join(rows) + "\n")
+    rejects = loader.RejectWriter(str(tmp_path / "rejects"), "claims")
+    cursor = FakeCursor(stored)
+    try:
+        changed, deleted, counts = sync.scan_file(cursor, "claims", str(path), rejects, chunk_size)
+    finally:
+        rejects.close()
+    return changed, deleted, counts, rejects, cursor
+
+
+def fingerprints(changed):
+    return dict(zip(changed["claim_id"].astype(int), changed["row_hash"].astype(int)))
+
+
+def test_first_scan_stages_every_row_with_its_hash(tmp_path):
+    changed, deleted, counts, _, cursor = scan(tmp_path, ROWS, {})
+    assert changed["claim_id"].tolist() == [1, 2, 3, 4]
+    assert changed["row_hash"].dtype == np.int64
+    assert len(deleted) == 0
+    assert counts == {"rows": 4, "unchanged": 0}
+    assert cursor.lookups == 2      #one per chunk
+
+
+def test_only_changed_and_new_rows_are_staged(tmp_path):
+    stored = fingerprints(scan(tmp_path, ROWS, {})[0])
+    rows = [ROWS[0], "2,11,101,Cancelled,3/6/2025 11:30", ROWS[3], "5,14,104,Pending,3/9/2025 08:00"]
+    changed, deleted, counts, _, _ = scan(tmp_path, rows, stored)
+    assert changed["claim_id"].tolist() == [2, 5]
+    assert changed["status"].astype(str).tolist() == ["Cancelled", "Pending"]
+    assert deleted.tolist() == [3]
+    assert counts == {"rows": 4, "unchanged": 2}
+
+
+def test_the_loaders_fingerprints_match(tmp_path):
+    #loader.save_fingerprints hashes the same raw columns, so a sync right after a load stages nothing
+    path = tmp_path / "claims_data.csv"
+    path.write_text(HEADER + "\n".join(ROWS) + "\n")
+    chunk = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""])
+    raw = chunk.rename(columns=str.lower)
+    stored = dict(zip(raw["claim_id"].astype(int), loader.row_hashes(raw[loader.csv_columns(raw, "claims")])))
+    changed, deleted, counts, _, _ = scan(tmp_path, ROWS, stored)
+    assert changed.empty and len(deleted) == 0
+    assert counts["unchanged"] == 4
+
+
+def test_rejected_rows_are_not_staged_and_keep_their_id(tmp_path):
+    stored = fingerprints(scan(tmp_path, ROWS, {})[0])
+    rows = [ROWS[0], "2,eleven,101,Completed,3/6/2025 11:30", ROWS[2], "4,13,103,Pending,"]
+    changed, deleted, counts, rejects, _ = scan(tmp_path, rows, stored)
+    assert changed.empty
+    assert len(deleted) == 0        #a rejected row's id was still seen, its claim isn't deleted
+    assert rejects.count == 2
+
+
+def test_a_repeated_id_keeps_the_last_row(tmp_path):
+    rows = ROWS + ["2,11,101,Cancelled,3/6/2025 11:30"]
+    changed, _, _, _, _ = scan(tmp_path, rows, {}, chunk_size=10)
+    assert changed["claim_id"].tolist() == [1, 3, 4, 2]
+    assert changed.set_index("claim_id").loc[2, "status"] == "Cancelled"
+
+
+def test_bigint_array():
+    assert sync.bigint_array(np.array([3, 10, 200000], dtype="int64")) == "{3,10,200000}"
+    assert sync.bigint_array(np.array([], dtype="int64")) == "{}"
@@ -0,0 +1,120 @@
+import datetime
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import table_browser
+
+
+def render(composed):
+    return composed.as_string(None)
+
+
+# ---------------------- Filters ----------------------
+def test_filters_are_bound_parameters():
+    clauses, params = table_browser.build_filters([
+        ("city", "contains", "pune"), ("quantity", ">=", "5"), ("status", "=", ""), ("food_id", "<=", None)])
+    assert [render(clause) for clause in clauses] == ['"city"::text ilike %s', '"quantity" >= %s']
+    assert params == ["%pune%", "5"]
+
+
+def test_unknown_operator_is_refused():
+    with pytest.raises(ValueError):
+        table_browser.build_filters([("city", "; drop table claims", "x")])
+
+
+# ---------------------- Keyset ----------------------
+def test_first_page_has_no_keyset():
+    assert table_browser.build_keyset("status", "claim_id", False, None) == (None, [])
+
+
+def test_keyset_on_the_pk_alone():
+    clause, params = table_browser.build_keyset("claim_id", "claim_id", True, (7, 7))
+    assert render(clause) == '"claim_id" < %s'
+    assert params == [7]
+
+
+ROWS = [(1, "b"), (2, None), (3, "a"), (4, "b"), (5, "a"), (6, None), (7, "c"), (8, "b")]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("page_size", [1, 2, 3])
+def test_keyset_pages_cover_every_row_once(descending, page_size):
+    #the generated predicate and order run on sqlite, which reads them the same way postgres does
+    db = sqlite3.connect(":memory:")
+    db.execute("create table claims (claim_id integer primary key, status text)")
+    db.executemany("insert into claims values (?, ?)", ROWS)
+
+    direction = "desc" if descending else "asc"
+    order = f"status {direction} nulls last, claim_id {direction}"
+    expected = [row[0] for row in db.execute(f"select claim_id from claims order by {order}")]
+
+    seen, after = [], None
+    while True:
+        clause, params = table_browser.build_keyset("status", "claim_id", descending, after)
+        where = "where " + render(clause).replace("%s", "?") if clause is not None else ""
+        page = db.execute(f"select claim_id, status from claims {where} order by {order} limit ?",
+                          params + [page_size]).fetchall()
+        if not page:
+            break
+        seen += [row[0] for row in page]
+        after = (page[-1][1], page[-1][0])
+    assert seen == expected
+
+
+def test_select_rows_breaks_ties_on_the_pk():
+    query = table_browser.select_rows("claims", "status", True, [])
+    assert render(query) == 'select * from "claims"  order by "status" desc nulls last, "claim_id" desc'
+
+
+# ---------------------- Parameters ----------------------
+def test_python_value_unwraps_numpy_and_pandas():
+    assert table_browser.python_value(np.int64(3)) == 3 and type(table_browser.python_value(np.int64(3))) is int
+    assert table_browser.python_value(pd.NA) is None
+    assert table_browser.python_value(np.nan) is None
+    stamp = table_browser.python_value(pd.Timestamp("2024-03-14 20:15"))
+    assert stamp == datetime.datetime(2024, 3, 14, 20, 15) and type(stamp) is datetime.datetime
+    assert table_browser.python_value("Pending") == "Pending"
+
+
+# ---------------------- Live Refresh ----------------------
+def claims_page():
+    return pd.DataFrame({
+        "claim_id": [7, 3, 9, 4],
+        "status": pd.Categorical(["Pending", "Pending", "Completed", "Cancelled"]),
+        "food_id": [70, 30, 90, 40],
+    }, index=[10, 11, 12, 13])
+
+
+@pytest.fixture
+def database(monkeypatch):
+    #fetch.fetch_df answering from a table of current rows; remembers the ids asked for
+    asked = []
+
+    def install(current):
+        def fetch_df(cursor, query, params):
+            asked.append(sorted(params[0]))
+            return current[current["claim_id"].isin(params[0])].reset_index(drop=True)
+        monkeypatch.setattr(table_browser.fetch, "fetch_df", fetch_df)
+        return asked
+    return install
+
+
+def test_refresh_rows_replaces_changed_rows_in_place_and_drops_deleted_ones(database):
+    #claim 3 changed to a status the page's categorical doesn't have, claim 9 was deleted
+    asked = database(pd.DataFrame({"claim_id": [3, 4], "status": ["Expired", "Cancelled"], "food_id": [31, 40]}))
+    page = table_browser.refresh_rows(None, "claims", claims_page(), {3, 9, 4, 555})
+    assert asked == [[3, 4, 9]]        #only ids on the page are read
+    assert page["claim_id"].tolist() == [7, 3, 4]
+    assert page.index.tolist() == [10, 11, 13]
+    assert page["status"].astype(str).tolist() == ["Pending", "Expired", "Cancelled"]
+    assert page["food_id"].tolist() == [70, 31, 40]
+
+
+def test_refresh_rows_without_shown_ids_reads_nothing(database):
+    asked = database(pd.DataFrame({"claim_id": [], "status": [], "food_id": []}))
+    df = claims_page()
+    assert table_browser.refresh_rows(None, "claims", df, {1, 2}) is df
+    assert asked == []
@@ -0,0 +1,51 @@
+import importlib
+import threading
+import time
+
+# ---------------------- Pages ----------------------
+# sidebar label -> module in this package. A page module is imported the first time anyone opens it
+# and stays in sys.modules for the life of the server process, so the heavy libraries it pulls in
+# (pandas, plotly, pyarrow) and whatever it builds at import time are paid once, and only by the pages
+# that use them. Every module has render(conn, cursor); pages with USES_DATABASE = False get None for
+# both and never check a connection out of the pool.
+PAGES = {
+    "Project Introduction": "intro",
+    "View Tables": "browse",
+    "CRUD Operations": "crud",
+    "SQL Queries & Visualization": "analytics",
+    "Learner SQL Queries": "learner",
+    "Overview": "all_queries",
+    "Nearby Food": "nearby",
+    "Allocation": "allocate",
+    "Query Log": "query_log",
+    "User Introduction": "about",
+}
+
+IMPORT_MS = {}          #page module -> milliseconds its first import took
+COLD_START_MS = None    #the first script run in this process, when nothing was imported yet
+_loaded = {}            #page module name -> module, only once its import has finished
+_timing_lock = threading.Lock()
+
+
+def load(label):
+    #sys.modules holds a module from the moment its import starts, so two sessions opening the same page
+    #at once must not take it from there: import_module waits for the other thread's import to finish
+    name = PAGES[label]
+    module = _loaded.get(name)
+    if module is None:
+        started = time.perf_counter()
+        module = importlib.import_module(f"{__name__}.{name}")
+        with _timing_lock:
+            IMPORT_MS.setdefault(name, round((time.perf_counter() - started) * 1000, 1))
+            _loaded[name] = module
+    return module
+
+
+# ---------------------- Timing ----------------------
+def record_run(**timings_ms):
+    global COLD_START_MS
+    timings = {key: round(ms, 1) for key, ms in timings_ms.items()}
+    with _timing_lock:
+        if COLD_START_MS is None:
+            COLD_START_MS = timings["total_ms"]
+    return timings
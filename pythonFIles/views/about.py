@@ -0,0 +1,57 @@
+import streamlit as st
+
+
+# ---------------------- User Introduction ----------------------
+USES_DATABASE = False
+
+
+def render(conn, cursor):
+    st.subheader("👤 User Introduction")
+
+    st.markdown("""
+    ### 🙋 About the Developer
+    - **Name:** Abdullah Khatri  
+    - **Role:** Data Science Learner @ GUVI  
+    - **Project:** Local Food Wastage Management System  
+    - **Tech Stack:** PostgreSQL, Streamlit, Python, Pandas, SQL(psycopg)  
+
+    ### 💬 Description
+    This application was developed as part of a mini project in the Data Science course.  
+    It demonstrates data analysis, SQL logic, CRUD operations, and interactive dashboards using Streamlit.
+
+    ### 📧 Contact
+    - Email: `abdullahkahtri1204@gmail.com`  
+    - GitHub: [your-github-link-if-any]
+
+    ### 👨🏽‍💻 What I Learned?
+    Throughout the development of this project, I gained hands-on experience and deeper understanding in the following areas:
+
+    📊 **SQL & PostgreSQL**  
+    - Writing complex SQL queries using `JOIN`,`UNION`, `GROUP BY`, `HAVING`, `WINDOW FUNCTIONS`, `AGGREGATIONS`, `FILTERS`,`NULL::INTEGER as column-name` and `SUBQUERIES`.
+    Designing normalized relational schemas and understanding foreign key relationships.
+
+    🐍 **Python + psycopg**  
+    - Loading csv to dataframe, previewing it & checked for nulls by using `table.isnull().sum()`
+    - Checked data_type for all columns -> found and fixed -> learned converting dateColumns
+    - Connecting PostgreSQL databases with Python using the `psycopg` library.
+    - Learned `with` block and used it with `psyocpyg.connect` to close the connection automatically.
+    - Learned about `@st.cache_resources`
+    - Created function to insert values in the created table with `df.itertuples`.
+
+    🌐 **Streamlit (Web App Development)**  
+    - Designing multi-page apps using sidebar navigation.
+    - Implementing CRUD operations (Create, Read, Update, Delete) with dynamic form generation.
+    - Displayed All SQL queries (13+10) and visual charts (bar, pie, line) only for those query which make sense for chart.
+    - Improving user interaction with dynamic widgets like `selectbox`, `date_input`, `multiselect`, etc.
+
+    📈 **Data Visualization & Insights**  
+    - Creating meaningful visualizations from SQL output using `Plotly Express`, `st.plotly_chart(fig)` and `st.bar_chart()`.
+    - Intepreted trend from claims data.
+
+    🧠 **Problem Solving & Logical Thinking**  
+    - Structuring SQL queries to match real-world business analysis.
+    - Debugging multi-step logic for conditional updates and data visualization flows.
+
+    ---
+
+    """)
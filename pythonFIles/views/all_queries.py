@@ -0,0 +1,57 @@
+import concurrent.futures
+import time
+
+import streamlit as st
+
+import catalog
+import config
+import overview
+import summaries
+
+
+# ---------------------- Overview ----------------------
+def render(conn, cursor):
+    st.subheader("🗂️ Overview: every query at once")
+
+    opt_cols = st.columns(3)
+    force_live = opt_cols[0].checkbox("Force live queries (skip the summary tables)")
+    timeout = opt_cols[1].number_input("Timeout per query (s)", min_value=1.0, value=config.OVERVIEW_QUERY_TIMEOUT)
+    city = opt_cols[2].text_input("City for query 3 (optional)")
+
+    #pick every query's sql up front, then run them all side by side on the async pool
+    use_live = force_live or not summaries.installed(cursor)
+    panels, slots = [], {}
+    for group, query_map in [("SQL Queries & Visualization", catalog.ANALYTICS_QUERIES),
+                             ("Learner SQL Queries", catalog.LEARNER_QUERIES)]:
+        st.markdown(f"### {group}")
+        grid = st.columns(2)
+        for i, (query_name, live_query) in enumerate(query_map.items()):
+            label = f"{group}: {query_name}"
+            if live_query is None:
+                if not city:
+                    continue
+                panels.append((label, catalog.CITY_SEARCH_SQL, (f"%{city}%",), ["providers"], "live"))
+            else:
+                query, tables, source = summaries.choose_query(cursor, query_name, live_query, use_live)
+                panels.append((label, query, None, tables, source))
+            with grid[i % 2].container(border=True):
+                st.markdown(f"**{query_name}**")
+                slots[label] = st.empty()
+                slots[label].caption("⏳ running...")
+
+    started = time.perf_counter()
+    futures = overview.submit_all(panels, timeout)
+    try:
+        #panels fill in the order their results arrive
+        for future in concurrent.futures.as_completed(futures, timeout=timeout + config.POOL_TIMEOUT):
+            result = future.result()
+            slot = slots[result["name"]]
+            if result["error"]:
+                slot.error(f"❌ {result['error']}")
+                continue
+            with slot.container():
+                st.caption(f"{result['ms']} ms · {result['source']}" + (" · cached" if result["cached"] else ""))
+                st.dataframe(result["df"], use_container_width=True, height=220)
+    except concurrent.futures.TimeoutError:
+        st.warning("Some queries did not finish in time.")
+    st.caption(f"{len(panels)} queries in {round(time.perf_counter() - started, 2)} s")
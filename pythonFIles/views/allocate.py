@@ -0,0 +1,51 @@
+import streamlit as st
+
+import allocation
+import fetch
+import query_cache
+import schema
+
+
+# ---------------------- Allocation ----------------------
+def render(conn, cursor):
+    st.subheader("🚚 Allocate food to receiver requests")
+    st.caption("Each round serves the open requests oldest first, each with the smallest unclaimed, unexpired "
+               "listing in its city that covers what it still needs, or with the soonest-expiring ones when none does.")
+
+    with st.form("new_request"):
+        st.markdown("**New request**")
+        req_cols = st.columns(4)
+        receiver_id = req_cols[0].number_input("receiver_id", min_value=1, step=1)
+        food_type = req_cols[1].selectbox("food_type", ["Any", "Vegetarian", "Non-Vegetarian", "Vegan"])
+        city = req_cols[2].text_input("city (blank = receiver's city)")
+        quantity = req_cols[3].number_input("quantity", min_value=1, value=10)
+        if st.form_submit_button("Add request"):
+            try:
+                cursor.execute(
+                    "insert into receiver_requests (receiver_id, food_type, city, quantity) values (%s, %s, %s, %s)",
+                    (receiver_id, None if food_type == "Any" else food_type, city or None, quantity))
+                conn.commit()
+                st.success("✅ Request added")
+            except Exception as e:
+                conn.rollback()
+                st.error(f"❌ Error: {e}")
+
+    st.dataframe(fetch.fetch_df(cursor, """
+        select coalesce(food_type, 'Any') as food_type, count(*) as open_requests,
+            sum(quantity - quantity_allocated) as quantity_wanted, min(requested_at) as oldest_request
+        from receiver_requests where status = 'Open'
+        group by 1 order by 2 desc"""), use_container_width=True)
+
+    dry_run = st.checkbox("Dry run (match and report, write nothing)", value=True)
+    if st.button("Run allocation round"):
+        try:
+            stats = allocation.run_round(conn, dry_run=dry_run)
+            if not dry_run:
+                conn.commit()
+                query_cache.invalidate(["claims"])
+            st.success(f"✅ {stats['claims_created']} listings allocated to {stats['requests_served']} requests "
+                       f"({stats['quantity_allocated']} items) in {stats['total_seconds']} s")
+            st.json(stats)
+        except Exception as e:
+            conn.rollback()
+            st.error(f"❌ Allocation failed: {e}")
@@ -0,0 +1,117 @@
+import streamlit as st
+import plotly.express as px
+
+import catalog
+import chartdata
+import export
+import live
+import prepared
+import query_cache
+import snapshot
+import summaries
+
+
+# ---------------------- SQL Queries & Visualization ----------------------
+SNAPSHOT_MODE = True    #cursor is None in snapshot mode, the queries run on the Parquet snapshot
+
+
+def render(conn, cursor):
+    st.subheader("SQL Queries & Visualization")
+    query_map = catalog.ANALYTICS_QUERIES
+
+
+    query_name = st.selectbox("Choose a query to run", list(query_map.keys()))
+    force_live = cursor is not None and st.checkbox("Force live query (skip the summary tables)")
+
+    if query_name == catalog.CITY_SEARCH_QUERY:
+        st.subheader("Providers by City")
+
+        #ask user to type a city name
+        city = st.text_input("Enter city name to filter (it will match similar if partial name is typed):")
+
+        #run query only if city is selected
+        if city:
+            try:
+                #bound parameter, the typed city is never part of the sql text
+                if cursor is None:
+                    df, _ = snapshot.catalog_query(catalog.CITY_SEARCH_SQL, (f"%{city}%",))
+                else:
+                    df = prepared.fetch_df(cursor, "city_search", (f"%{city}%",))
+            
+                # Step 3: Display results
+                if not df.empty:
+                    st.dataframe(df)
+                    if cursor is not None:
+                        export.panel(cursor, catalog.CITY_SEARCH_SQL, (f"%{city}%",), name=f"providers {city}", key="city")
+                else:
+                    st.info("No records found for the given city.")
+            except Exception as e:
+                if conn is not None:
+                    conn.rollback()
+                st.error(f"Error: {e}")
+
+    elif query_name:
+        try:
+            if cursor is None:
+                df, source = snapshot.catalog_query(query_map[query_name])
+                st.caption(f"Source: {source}")
+                draw_result(query_name, df)
+            else:
+                #summary tables by default (kept current by triggers), the live query only when forced
+                query, tables, source = summaries.choose_query(cursor, query_name, query_map[query_name], force_live)
+                st.caption(f"Source: {source}")
+                #shared across sessions, dropped when a CRUD write touches one of the tables it reads;
+                #redrawn when another session or process changes one of them (live.py)
+                live.section("analytics", tables, lambda cur, previous, changes: query_cache.cached_query(cur, query, tables=tables),
+                             lambda df: draw_result(query_name, df), cursor)
+                export.panel(cursor, query, name=query_name, key="analytics")
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            st.error(f"❌ Query execution failed: {e}")
+
+
+def draw_result(query_name, df):
+    #the result table and its chart
+    st.dataframe(df, use_container_width=(df.shape[1] > 3))     #df.shape-> (rows,col)->index->(0,1)respectively -> could be 5 rows 3 cols
+
+    # 💡 Insert Visualizations Here
+    # Normalize column names for safe matching
+    # cols=[col.lower() for col in df.columns]
+    # kya ye isme exist karta hai
+    if query_name.startswith("7"):
+        fig = px.pie(df, names="food_type", values="most_common_foodtype", title="Most Common Food Types")
+        st.plotly_chart(fig)
+
+    elif query_name.startswith("8"):
+        # fig = px.bar(df, x="food_name", y ="no_of_food_claims", title="Most Frequently Claimed Food Items",
+        #              labels={"food_name":"Items", "no_of_food_claims":"Total Claims"})
+        # st.plotly_chart(fig)
+
+        #gpt
+        st.markdown("""
+            <div style='display: flex; justify-content: space-between;'>
+            <div><h3>Most Frequently Claimed Food Items</h3></div>
+            <div><b>x</b>: Items | <b>y</b>: Total Claims</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+        st.bar_chart(chartdata.top_n(df, "food_name", "no_of_food_claims").set_index("food_name")["no_of_food_claims"])
+
+    elif query_name.startswith("10"):
+        fig = px.pie(df, names="status", values="percentage", title="Claim Status Distribution")
+        st.plotly_chart(fig, use_container_width=True)
+
+    elif query_name.startswith("11"):
+        df_sorted = chartdata.top_n(df, "name", "average_quantity", agg="mean").sort_values(by="average_quantity", ascending=False)
+        fig = px.bar(df_sorted, x="average_quantity", y="name", orientation='h',
+                    title="Average Quantity of Food Claimed per Receiver")
+        st.plotly_chart(fig, use_container_width=True)
+
+    elif query_name.startswith("13"):
+            chart_df = chartdata.top_n(df, "provider_name", "total_quantity")
+            df_sorted = chart_df.sort_values(by="total_quantity", ascending=False)
+            fig = px.bar(df_sorted, x="total_quantity", y="provider_name", orientation='h',
+                        title="Average Quantity of Food Claimed per Receiver")
+            st.plotly_chart(fig, use_container_width=True)
+            st.bar_chart(chart_df.set_index("provider_name")["total_quantity"])
@@ -0,0 +1,65 @@
+import streamlit as st
+
+import export
+import live
+import table_browser
+
+
+# ---------------------- View Tables ----------------------
+def render(conn, cursor):
+    st.subheader("📊 Database Tables")
+    #selectbox
+    selected_table = st.selectbox("Select Table",["providers","receivers","food_listings","claims"])
+
+    if selected_table:
+        try:
+            columns = table_browser.table_columns(cursor, selected_table)
+            pk_column = table_browser.PK_COLUMNS[selected_table]
+
+            #sorting and filters are pushed down into the sql, only one page is ever fetched
+            sort_col, order_col, size_col = st.columns(3)
+            sort_column = sort_col.selectbox("Sort by", columns, index=columns.index(pk_column))
+            descending = order_col.radio("Order", ["Ascending", "Descending"], horizontal=True) == "Descending"
+            page_size = size_col.selectbox("Rows per page", [25, 50, 100, 500], index=1)
+
+            filters = []
+            for column in st.multiselect("Filter columns", columns):
+                op_col, value_col = st.columns([1, 3])
+                operator = op_col.selectbox(f"{column}", table_browser.FILTER_OPERATORS, key=f"op_{column}")
+                value = value_col.text_input(f"value for {column}", key=f"value_{column}")
+                filters.append((column, operator, value))
+
+            #keys of the pages we came through, reset whenever the table/sort/filters change
+            view = (selected_table, sort_column, descending, page_size, tuple(filters))
+            if st.session_state.get("browse_view") != view:
+                st.session_state["browse_view"] = view
+                st.session_state["browse_keys"] = [None]
+            keys = st.session_state["browse_keys"]
+
+            #claims and food_listings pages stay live: rows other sessions change are read again by id
+            def load(cur, previous, changes):
+                if previous is None or changes[selected_table] is None:
+                    return table_browser.fetch_page(
+                        cur, selected_table, sort_column, descending, filters, keys[-1], page_size)
+                df, last_key, has_next = previous
+                return table_browser.refresh_rows(cur, selected_table, df, changes[selected_table]), last_key, has_next
+
+            _, last_key, has_next = live.section("browse", [selected_table], load,
+                                                 lambda page: st.dataframe(page[0], use_container_width=True), cursor)
+
+            prev_col, info_col, next_col = st.columns([1, 4, 1])
+            if prev_col.button("⬅ Previous", disabled=len(keys) == 1):
+                keys.pop()
+                st.rerun()
+            if next_col.button("Next ➡", disabled=not has_next):
+                keys.append(last_key)
+                st.rerun()
+            estimate = table_browser.estimate_rows(cursor, selected_table, filters)
+            info_col.caption(f"Page {len(keys)} · about {estimate:,} matching rows (planner estimate)")
+            #every matching row in this order, not just the page
+            query, params = table_browser.export_query(selected_table, sort_column, descending, filters)
+            export.panel(cursor, query, params, name=selected_table, key="browse")
+            st.success(f"Showing data from '{selected_table}' table")
+        except Exception as e:
+            conn.rollback()
+            st.error(f"Failed to fetch table: {e}")
@@ -0,0 +1,194 @@
+import datetime
+
+import streamlit as st
+
+import bulk
+import query_cache
+import schema
+
+
+# ---------------------- CRUD Operations ----------------------
+def render(conn, cursor):
+    st.subheader("Manage the food data (CRUD)")
+
+    #Choosing table
+    table = st.selectbox("Choose the table",["providers","receivers","food_listings","claims"])
+    action = st.radio("Choose an action", bulk.ACTIONS)
+    mode = st.radio("Rows", ["One row","Batch (CSV)"], horizontal=True)
+    if mode == "Batch (CSV)":
+        render_batch(conn, cursor, table, action)
+        return
+
+    #extractcing table columns (cached per process, see metadata.py)
+    columns = [col["name"] for col in bulk.table_schema(cursor, table)]
+    # first column is the pk
+    pk_column = columns[0]
+
+    inputs={}
+
+    def render_input_fields(columns) :
+        for col in columns:
+            if col == "quantity":
+                inputs[col]=st.number_input("quantity", max_value=50)
+
+            elif col== "status":
+                inputs[col]=st.selectbox("status",schema.STATUSES)
+
+            elif col in ["type","provider_type"]:
+                if table in ["providers","food_listings"]:
+                    inputs[col]=st.selectbox(col,schema.PROVIDER_TYPES)
+            
+                elif table == "receivers":
+                    inputs[col]=st.selectbox(col,schema.RECEIVER_TYPES)
+            
+
+            elif col== "food_type":
+                inputs[col]=st.selectbox(col,schema.FOOD_TYPES)
+
+        
+            elif col== "meal_type":
+                inputs[col]=st.selectbox(col,schema.MEAL_TYPES)
+
+
+            elif col == "expiry_date":
+                #setting defaultValue as one day from today's date
+                default = datetime.date.today() + datetime.timedelta(days=1)
+                inputs[col] = st.date_input("expiry_date",value=default)
+
+            elif col == "timestamp":
+                #merging date and time
+                date_part = st.date_input("(for timestamp) Date: ")
+                time_part = st.time_input("(for timestamp) Time: ")
+                inputs[col] = datetime.datetime.combine(date_part,time_part)
+            
+        
+            else:
+                inputs[col] = st.text_input(f'{col}')
+
+  
+    
+    #add ->asking all the columns
+    if action == "Add":
+        with st.form("add_form"):
+            st.write(f"Fill the fields for `{action} Operation` on _{table}_")
+            render_input_fields(columns)
+            submitted = st.form_submit_button("Execute")
+            if submitted:
+                try:
+                    column_names = ",".join(columns)
+                    placeholders = ",".join(["%s"]*len(columns))
+                    query = f"insert into {table} ({column_names}) values ({placeholders})"
+
+                    values = tuple(inputs[column] for column in columns)        #passing each col as key to retreive the correspond value
+                    cursor.execute(query,values)
+                    conn.commit()
+                    query_cache.invalidate([table])
+                    st.success(f"✅ Add operation successful on `{table}`.")
+
+                except Exception as e:
+                    conn.rollback()
+                    st.error(f"❌ Error during Add: {e}")
+
+
+
+    #update -> asking the pk and allowing to choose fields to update
+    elif action == "Update":
+        st.markdown(f"""
+                    ---
+                    Fill the fields for `{action} Operation` on _{table}_""")
+        inputs[pk_column] = st.text_input(f"{pk_column} (Primary Key)") #columns[0] is here
+        update_cols = st.multiselect("Choose columns to update", columns[1:]) #columns[1] to end is here
+    
+        if update_cols:
+            with st.form("update_form"):
+            
+                render_input_fields(update_cols)
+                submitted = st.form_submit_button("Execute")
+
+                if submitted:
+                    try:
+                        colWithValues = ", ".join([f"{column} = %s" for column in update_cols])
+                        values = [inputs[column] for column in update_cols]
+                        values.append(inputs[pk_column]) # Add PK to the end for WHERE clause
+
+                        cursor.execute(
+                            f"update {table} set {colWithValues} where {pk_column} = %s",tuple(values)
+                        )
+                        conn.commit()
+                        query_cache.invalidate([table])
+                        st.success(f"✅ Update operation successful on *{table}*.")
+                    except Exception as e:
+                        conn.rollback()
+                        st.error(f"❌ Update failed: {e}")
+
+
+
+
+    #delete ->asking the pk only
+    elif action == "Delete":
+        with st.form("delete_form"): 
+            st.write(f"Fill the fields for `{action} Operation` on _{table}_")
+            inputs[pk_column] = st.text_input(f"{pk_column} (Primary Key)")
+            submitted = st.form_submit_button("Execute")
+            if submitted:
+                try:
+
+                    cursor.execute(f"delete from {table} where {pk_column} = %s", (inputs[pk_column],))
+                    conn.commit()
+                    query_cache.invalidate([table])
+                    st.success(f"✅ Delete operation successful on `{table}`.")
+                except Exception as e:
+                    conn.rollback()
+                    st.error(f"❌ Error during Delete: {e}")
+
+
+# ---------------------- Bulk CRUD ----------------------
+def render_batch(conn, cursor, table, action):
+    table_columns = bulk.table_schema(cursor, table)
+    pk = [col["name"] for col in table_columns if col["pk"]]
+    if action == "Add":
+        hint = "every column that can't be null, a row whose key already exists is updated"
+    elif action == "Update":
+        hint = "the primary key and only the columns to change"
+    else:
+        hint = "the primary key only"
+    st.markdown(f"""
+                ---
+                Upload a csv (or paste a table copied from a spreadsheet) for a `{action} Operation` on _{table}_.
+                Columns: {hint}. Primary key: `{", ".join(pk)}`, all columns: `{", ".join(col["name"] for col in table_columns)}`""")
+
+    uploaded = st.file_uploader("CSV file", type=["csv","tsv","txt"])
+    pasted = st.text_area("...or paste the rows here, header first")
+    if uploaded is None and not pasted.strip():
+        return
+
+    try:
+        df = bulk.read_batch(uploaded if uploaded is not None else pasted)
+        rows, rejects = bulk.validate(df, table_columns, action)
+    except Exception as e:
+        st.error(f"❌ The batch can't be used: {e}")
+        return
+
+    st.write(f"{len(rows)} of {len(df)} rows are ready")
+    if len(rejects):
+        st.warning(f"{len(rejects)} rows failed validation and will be skipped")
+        st.dataframe(rejects)
+    all_or_nothing = st.checkbox("All or nothing (apply nothing if any row is rejected or fails)")
+
+    if st.button(f"{action} {len(rows)} rows", disabled=rows.empty or (all_or_nothing and len(rejects) > 0)):
+        try:
+            results, summary = bulk.apply_batch(conn, table, action, rows, table_columns, all_or_nothing)
+        except Exception as e:
+            conn.rollback()
+            st.error(f"❌ Nothing was applied: {e}")
+            return
+        query_cache.invalidate([table])
+
+        st.success(f"✅ {action} batch done on `{table}` ({summary['mode']}).")
+        counts = {key: value for key, value in summary.items() if key not in ("rows","mode","seconds","rows_per_second")}
+        metrics = st.columns(len(counts) + 2)
+        for col, (outcome, count) in zip(metrics, counts.items()):
+            col.metric(outcome, count)
+        metrics[-2].metric("seconds", summary["seconds"])
+        metrics[-1].metric("rows / second", summary["rows_per_second"])
+        st.dataframe(results)
@@ -0,0 +1,17 @@
+import streamlit as st
+
+
+# ---------------------- Project Introduction ----------------------
+USES_DATABASE = False
+
+
+def render(conn, cursor):
+    st.subheader("📌 Project Introduction")
+    st.markdown("""
+        This project helps manage surplus food and reduce wastage by connecting providers with those in need.
+
+        - **Providers**: Restaurants, households, and businesses list surplus food.
+        - **Receivers**: NGOs and individuals claim available food.
+        - **Geolocation**: Helps locate nearby food.
+        - **SQL Analysis**: Powerful insights using SQL queries.
+    """)
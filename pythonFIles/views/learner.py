@@ -0,0 +1,104 @@
+import datetime
+
+import streamlit as st
+import plotly.express as px
+
+import catalog
+import chartdata
+import export
+import query_cache
+import snapshot
+import summaries
+
+
+# ---------------------- Learner SQL Queries ----------------------
+SNAPSHOT_MODE = True    #cursor is None in snapshot mode, the queries run on the Parquet snapshot
+
+
+def render(conn, cursor):
+    st.subheader("Learner SQL Queries")
+    query_map = catalog.LEARNER_QUERIES
+
+    query_name = st.selectbox("Choose a query to run",list(query_map.keys()))
+    #claims queries can be limited to a period, which reads only those months of the partitioned claims table
+    days = since = None
+    if query_name in catalog.CLAIMS_SINCE_QUERIES:
+        days = catalog.CLAIM_PERIODS[st.selectbox("Period", list(catalog.CLAIM_PERIODS))]
+    force_live = cursor is not None and days is None and st.checkbox("Force live query (skip the summary tables)")
+
+    if query_name:
+    
+        try:
+            if days is not None:
+                since = datetime.date.today() - datetime.timedelta(days=days)      #a date, so the cache key only changes daily
+                query = catalog.CLAIMS_SINCE_QUERIES[query_name]
+                if cursor is None:
+                    df, source = snapshot.catalog_query(query, (since,))
+                else:
+                    df = query_cache.cached_query(cursor, query, (since,), tables=catalog.tables_read(query))
+                    source = "live"
+                source += f", claims since {since}"
+            elif cursor is None:
+                df, source = snapshot.catalog_query(query_map[query_name])
+            else:
+                query, tables, source = summaries.choose_query(cursor, query_name, query_map[query_name], force_live)
+                df = query_cache.cached_query(cursor, query, tables=tables)
+            st.caption(f"Source: {source}")
+            st.dataframe(df, use_container_width=(df.shape[1]>3))
+            if cursor is not None:
+                export.panel(cursor, query, (since,) if since else None, name=query_name, key="learner")
+
+            #Visualisations
+
+        
+            if query_name.startswith("4"):
+                df_sorted = chartdata.top_n(df, "food_name", "no_of_claimed_food").sort_values(by="no_of_claimed_food", ascending=True)
+                fig = px.bar(df_sorted, x="no_of_claimed_food", y="food_name", orientation="h",
+                            title="Top Claimed Food Items")
+                st.plotly_chart(fig)
+
+            elif query_name.startswith("5"):
+            
+                fig = px.bar(chartdata.top_n(df, "food_name", "total_item"), x="food_name", y="total_item",
+                            title="Unclaimed Food Quantity by Item")
+                st.plotly_chart(fig)
+
+        
+            elif query_name.startswith("7"):
+                fig = px.bar(chartdata.top_n(df, "name", "total", color="status"), x="name", y="total", color="status",color_discrete_map={
+                        "Completed": "#89379E",   # green
+                        "Pending": "#2AABC2",     # yellow
+                        "Cancelled": "#B4E73C"    # red
+                    }, barmode="group", title="Provider-wise Claim Status Breakdown")
+                st.plotly_chart(fig)
+
+            elif query_name.startswith("8"):
+                df_sorted = chartdata.top_n(df, "provider_name", "unique_food").sort_values(by="unique_food", ascending=True)
+                fig = px.bar(df_sorted, x="unique_food", y="provider_name",
+                            title="Unique Food Items by Provider")
+                st.plotly_chart(fig)
+
+            elif query_name.startswith("9"):
+                fig = px.pie(df, names="food_type", values="avg_quantity", title="Average Quantity per Food Type")
+                st.plotly_chart(fig, use_container_width=True)
+
+                fig = px.bar(df, x="food_type", y="avg_quantity", title="Average Quantity per Food Type",color="food_type",color_discrete_map={
+                    "Vegetarian":"#ff2b2b",
+                    "Non-Vegetarian":"#83c9ff",
+                    "Vegan":"#0068c9",
+                },)
+                st.plotly_chart(fig)
+
+            elif query_name.startswith("10"):
+                #bucketed in sql for the period shown, the table above keeps one row per day
+                resolution = st.selectbox("Chart resolution", chartdata.RESOLUTIONS)
+                series, bucket = chartdata.claims_series(cursor, since, resolution, live=force_live)
+                fig = px.line(series, x="claim_date", y="count", markers=True, title=f"📈 Claims Per {bucket.title()}")
+                st.plotly_chart(fig)
+        
+
+
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            st.error(f" Error: {e}")
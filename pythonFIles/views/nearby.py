@@ -0,0 +1,41 @@
+import streamlit as st
+
+import geo
+import prepared
+
+
+# ---------------------- Nearby Food ----------------------
+def render(conn, cursor):
+    st.subheader("📍 Find food near you")
+
+    source = st.radio("Search around", ["A receiver's saved location", "Coordinates"], horizontal=True)
+    lat = lon = None
+    if source == "Coordinates":
+        lat_col, lon_col = st.columns(2)
+        lat = lat_col.number_input("Latitude", min_value=-90.0, max_value=90.0, value=40.7128, format="%.6f")
+        lon = lon_col.number_input("Longitude", min_value=-180.0, max_value=180.0, value=-74.0060, format="%.6f")
+    else:
+        receiver_id = st.text_input("receiver_id")
+        if receiver_id:
+            prepared.execute(cursor, "receiver_location", (receiver_id,))
+            row = cursor.fetchone()
+            if row is None or row[0] is None:
+                st.info("That receiver has no saved coordinates, enter them instead.")
+            else:
+                lat, lon = row
+
+    radius = st.slider("Radius (km)", 1, 200, 10)
+    limit = st.selectbox("Show at most", [25, 100, 500], index=1)
+
+    if lat is not None:
+        try:
+            df, method, ms = geo.nearby_listings(cursor, lat, lon, radius, limit)
+            if df.empty:
+                st.info(f"No unexpired listings within {radius} km.")
+            else:
+                st.caption(f"{len(df)} listings, nearest and soonest-expiring first · {ms} ms via {method}")
+                st.dataframe(df, use_container_width=True)
+                st.map(df.astype({"latitude": float, "longitude": float}), latitude="latitude", longitude="longitude")
+        except Exception as e:
+            conn.rollback()
+            st.error(f"❌ Search failed: {e}")
@@ -0,0 +1,104 @@
+import functools
+
+import pandas as pd
+import psycopg
+import streamlit as st
+
+import config
+import instrument
+import migrate
+import prepared
+
+
+# ---------------------- Query Log ----------------------
+def normalize(query):
+    return " ".join(query.split()).rstrip(";").strip()
+
+
+def catalog_labels():
+    #normalized sql -> label. Recorded calls wrap the catalog text (COPY (...), limit 0 describes),
+    #so a call belongs to the entry whose text it contains
+    labels = {}
+    for name, source, query, _ in migrate.catalog_queries():
+        labels.setdefault(normalize(query), f"{name} [{source}]")
+    for name, query in prepared.STATEMENTS.items():
+        labels.setdefault(normalize(query), f"prepared: {name}")
+    return labels
+
+
+CATALOG_LABELS = catalog_labels()
+
+
+@functools.lru_cache(maxsize=10_000)       #shared by every session thread, lru_cache locks itself
+def label(query):
+    #recorded sql -> its catalog label, or None
+    return next((name for text, name in CATALOG_LABELS.items() if text in query), None)
+
+
+def render(conn, cursor):
+    st.subheader("⏱️ Query log")
+    records = instrument.records()
+    st.caption(f"The last {config.QUERY_LOG_SIZE:,} database calls of this server process, every session and page. "
+               f"Calls slower than {config.SLOW_QUERY_MS:g} ms and failed calls "
+               + (f"are also written to `{config.QUERY_LOG_PATH}`." if config.QUERY_LOG_PATH
+                  else "can be written to a file with FOODWASTE_QUERY_LOG."))
+    if not records:
+        st.info("Nothing recorded yet, open a few pages first.")
+    else:
+        df = pd.DataFrame(records)
+        df["at"] = pd.to_datetime(df["at"], unit="s")
+        df["entry"] = df["query"].map(label)
+
+        metric_cols = st.columns(4)
+        metric_cols[0].metric("calls", len(df))
+        metric_cols[1].metric(f"slower than {config.SLOW_QUERY_MS:g} ms", int((df["ms"] >= config.SLOW_QUERY_MS).sum()))
+        metric_cols[2].metric("errors", int(df["error"].notna().sum()))
+        metric_cols[3].metric("median ms", round(df["ms"].median(), 2))
+
+        st.markdown("**Per catalog entry**")
+        per_entry = df.dropna(subset=["entry"]).groupby("entry").agg(
+            calls=("ms", "size"),
+            p50_ms=("ms", "median"),
+            p95_ms=("ms", lambda ms: ms.quantile(0.95)),
+            max_ms=("ms", "max"),
+            rows=("rows", "max"),
+            bytes=("bytes", "max"),
+            errors=("error", "count"),
+        ).round(2).sort_values("p95_ms", ascending=False)
+        st.dataframe(per_entry, use_container_width=True)
+
+        st.markdown("**Per page**")
+        per_page = df.groupby(df["page"].fillna("(outside a page)")).agg(
+            calls=("ms", "size"), total_ms=("ms", "sum"), p95_ms=("ms", lambda ms: ms.quantile(0.95))).round(2)
+        st.dataframe(per_page.sort_values("total_ms", ascending=False), use_container_width=True)
+
+        st.markdown("**Slowest calls**")
+        only_errors = st.checkbox("Only failed calls")
+        shown = df[df["error"].notna()] if only_errors else df
+        st.dataframe(shown.nlargest(25, "ms")[["at", "page", "entry", "ms", "rows", "bytes", "error", "query"]],
+                     use_container_width=True)
+
+        action_cols = st.columns(2)
+        if action_cols[0].button(f"Export the buffer to {config.QUERY_LOG_EXPORT_DIR}/"):
+            written, path = instrument.export()
+            st.success(f"✅ {written} calls written to `{path}`")
+        if action_cols[1].button("Clear the buffer"):
+            instrument.clear()
+            st.rerun()
+
+    # ---------------------- Explain ----------------------
+    st.markdown("### EXPLAIN (ANALYZE, BUFFERS)")
+    entries = {f"{name} [{source}]": (query, params) for name, source, query, params in migrate.catalog_queries()}
+    choice = st.selectbox("Catalog query", list(entries))
+    timeout = st.number_input("Timeout (s)", min_value=1.0, value=config.OVERVIEW_QUERY_TIMEOUT)
+    if st.button("Run EXPLAIN ANALYZE"):
+        query, params = entries[choice]
+        try:
+            #ANALYZE really runs the query; these are all reads, and nothing outlives the savepoint
+            with conn.transaction(force_rollback=True):
+                cursor.execute("select set_config('statement_timeout', %s, true)", (f"{int(timeout * 1000)}ms",))
+                cursor.execute("explain (analyze, buffers) " + query.strip().rstrip(";"), params)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+            st.code(plan, language="text")
+        except psycopg.Error as e:
+            st.error(f"❌ EXPLAIN failed: {e}")
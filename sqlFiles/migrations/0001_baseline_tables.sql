@@ -0,0 +1,39 @@
+-- Baseline schema, same tables as "creating table queries.sql"
+-- "if not exists" so databases created from that file are simply marked as up to date
+
+create table if not exists providers (
+	provider_id INTEGER PRIMARY KEY,
+	name TEXT,
+	type TEXT,
+	address TEXT,
+	city TEXT,
+	contact text
+);
+
+create table if not exists receivers (
+	receiver_id INTEGER PRIMARY KEY,
+	name TEXT,
+	type TEXT,
+	city TEXT,
+	contact text
+);
+
+create table if not exists food_listings (
+	food_id INTEGER PRIMARY KEY,
+	food_name TEXT,
+	quantity INTEGER,
+	expiry_date DATE,
+	provider_id integer references providers(provider_id),
+	provider_type text,
+	location text,
+	food_type text,
+	meal_type text
+);
+
+create table if not exists claims (
+	claim_id integer primary key,
+	food_id integer references food_listings(food_id),
+	receiver_id integer references receivers(receiver_id),
+	status text,
+	Timestamp timestamp
+);
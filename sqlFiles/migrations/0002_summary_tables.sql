@@ -0,0 +1,208 @@
+-- Summary tables for the dashboard catalog queries
+-- kept up to date row by row by triggers on food_listings and claims, so the dashboards read
+-- a few small tables instead of scanning and joining the fact tables every time.
+-- queries that only touch providers/receivers (analytics 1 and 3, learner 1 and 2) stay live.
+-- needs PostgreSQL 15+ (unique ... nulls not distinct), null values are grouped like GROUP BY does.
+
+-- 1. per-value listing counts/quantities of food_listings, one row per (dimension, value)
+-- dimensions: provider_type, location, food_type, meal_type, provider_id
+create table if not exists listing_stats (
+	dimension text not null,
+	value text,
+	listings bigint not null default 0,
+	quantity_sum bigint not null default 0,
+	quantity_count bigint not null default 0,	-- listings with a non null quantity
+	provider_count bigint not null default 0	-- listings with a non null provider_id
+);
+create unique index if not exists listing_stats_key on listing_stats (dimension, value) nulls not distinct;
+
+-- 2. distinct food items per provider
+create table if not exists provider_food_items (
+	provider_id integer not null,
+	food_name text,
+	listings bigint not null default 0
+);
+create unique index if not exists provider_food_items_key on provider_food_items (provider_id, food_name) nulls not distinct;
+
+-- 3. claims per listing and status (at most listings x statuses rows)
+create table if not exists claim_stats (
+	food_id integer,
+	status text,
+	claims bigint not null default 0
+);
+create unique index if not exists claim_stats_key on claim_stats (food_id, status) nulls not distinct;
+
+-- 4. claims per day and status
+create table if not exists claims_daily (
+	claim_date date,
+	status text,
+	claims bigint not null default 0
+);
+create unique index if not exists claims_daily_key on claims_daily (claim_date, status) nulls not distinct;
+
+-- 5. claims and claimed quantity per receiver
+create table if not exists receiver_claim_stats (
+	receiver_id integer,
+	claims bigint not null default 0,
+	quantity_sum bigint not null default 0,
+	quantity_count bigint not null default 0	-- claims whose listing has a non null quantity
+);
+create unique index if not exists receiver_claim_stats_key on receiver_claim_stats (receiver_id) nulls not distinct;
+
+
+-- ---------------------- food_listings maintenance ----------------------
+-- sign = 1 adds the row to the summaries, -1 takes it out again
+create or replace function listing_stats_apply(r food_listings, sign integer) returns void
+language plpgsql as $$
+begin
+	insert into listing_stats as s (dimension, value, listings, quantity_sum, quantity_count, provider_count)
+	select v.dimension, v.value, sign, sign * coalesce(r.quantity, 0),
+		sign * (r.quantity is not null)::int, sign * (r.provider_id is not null)::int
+	from (values
+		('provider_type', r.provider_type),
+		('location', r.location),
+		('food_type', r.food_type),
+		('meal_type', r.meal_type),
+		('provider_id', r.provider_id::text)
+	) as v(dimension, value)
+	on conflict (dimension, value) do update set
+		listings = s.listings + excluded.listings,
+		quantity_sum = s.quantity_sum + excluded.quantity_sum,
+		quantity_count = s.quantity_count + excluded.quantity_count,
+		provider_count = s.provider_count + excluded.provider_count;
+
+	if r.provider_id is not null then
+		insert into provider_food_items as s (provider_id, food_name, listings)
+		values (r.provider_id, r.food_name, sign)
+		on conflict (provider_id, food_name) do update set listings = s.listings + excluded.listings;
+	end if;
+
+	if sign < 0 then
+		delete from listing_stats where listings = 0 and (dimension, value) in (
+			('provider_type', r.provider_type), ('location', r.location), ('food_type', r.food_type),
+			('meal_type', r.meal_type), ('provider_id', r.provider_id::text));
+		delete from listing_stats where listings = 0 and value is null;
+		delete from provider_food_items
+		where provider_id = r.provider_id and food_name is not distinct from r.food_name and listings = 0;
+	end if;
+end $$;
+
+create or replace function food_listings_summary_trigger() returns trigger
+language plpgsql as $$
+begin
+	if tg_op in ('UPDATE', 'DELETE') then
+		perform listing_stats_apply(old, -1);
+	end if;
+	if tg_op in ('INSERT', 'UPDATE') then
+		perform listing_stats_apply(new, 1);
+	end if;
+
+	-- receivers' claimed quantity follows the listing's quantity
+	if tg_op = 'UPDATE' and new.quantity is distinct from old.quantity then
+		update receiver_claim_stats s set
+			quantity_sum = s.quantity_sum + c.n * (coalesce(new.quantity, 0) - coalesce(old.quantity, 0)),
+			quantity_count = s.quantity_count + c.n * ((new.quantity is not null)::int - (old.quantity is not null)::int)
+		from (
+			select receiver_id, count(*) as n from claims
+			where food_id = new.food_id
+			group by receiver_id
+		) as c
+		where s.receiver_id is not distinct from c.receiver_id;
+	end if;
+	return null;
+end $$;
+
+drop trigger if exists food_listings_summary on food_listings;
+create trigger food_listings_summary
+after insert or update or delete on food_listings
+for each row execute function food_listings_summary_trigger();
+
+
+-- ---------------------- claims maintenance ----------------------
+create or replace function claim_stats_apply(r claims, sign integer) returns void
+language plpgsql as $$
+declare
+	q integer;
+begin
+	insert into claim_stats as s (food_id, status, claims)
+	values (r.food_id, r.status, sign)
+	on conflict (food_id, status) do update set claims = s.claims + excluded.claims;
+
+	insert into claims_daily as s (claim_date, status, claims)
+	values (date(r.timestamp), r.status, sign)
+	on conflict (claim_date, status) do update set claims = s.claims + excluded.claims;
+
+	select quantity into q from food_listings where food_id = r.food_id;
+	insert into receiver_claim_stats as s (receiver_id, claims, quantity_sum, quantity_count)
+	values (r.receiver_id, sign, sign * coalesce(q, 0), sign * (q is not null)::int)
+	on conflict (receiver_id) do update set
+		claims = s.claims + excluded.claims,
+		quantity_sum = s.quantity_sum + excluded.quantity_sum,
+		quantity_count = s.quantity_count + excluded.quantity_count;
+
+	if sign < 0 then
+		delete from claim_stats
+		where food_id is not distinct from r.food_id and status is not distinct from r.status and claims = 0;
+		delete from claims_daily
+		where claim_date is not distinct from date(r.timestamp) and status is not distinct from r.status and claims = 0;
+		delete from receiver_claim_stats where receiver_id is not distinct from r.receiver_id and claims = 0;
+	end if;
+end $$;
+
+create or replace function claims_summary_trigger() returns trigger
+language plpgsql as $$
+begin
+	if tg_op in ('UPDATE', 'DELETE') then
+		perform claim_stats_apply(old, -1);
+	end if;
+	if tg_op in ('INSERT', 'UPDATE') then
+		perform claim_stats_apply(new, 1);
+	end if;
+	return null;
+end $$;
+
+drop trigger if exists claims_summary on claims;
+create trigger claims_summary
+after insert or update or delete on claims
+for each row execute function claims_summary_trigger();
+
+
+-- ---------------------- full rebuild ----------------------
+-- used after installing and after bulk loads, recomputes everything with set based queries
+create or replace function refresh_summaries() returns void
+language plpgsql as $$
+begin
+	truncate listing_stats, provider_food_items, claim_stats, claims_daily, receiver_claim_stats;
+
+	insert into listing_stats (dimension, value, listings, quantity_sum, quantity_count, provider_count)
+	select v.dimension, v.value, count(*), coalesce(sum(f.quantity), 0), count(f.quantity), count(f.provider_id)
+	from food_listings f
+	cross join lateral (values
+		('provider_type', f.provider_type),
+		('location', f.location),
+		('food_type', f.food_type),
+		('meal_type', f.meal_type),
+		('provider_id', f.provider_id::text)
+	) as v(dimension, value)
+	group by v.dimension, v.value;
+
+	insert into provider_food_items (provider_id, food_name, listings)
+	select provider_id, food_name, count(*) from food_listings
+	where provider_id is not null
+	group by provider_id, food_name;
+
+	insert into claim_stats (food_id, status, claims)
+	select food_id, status, count(*) from claims
+	group by food_id, status;
+
+	insert into claims_daily (claim_date, status, claims)
+	select date(timestamp), status, count(*) from claims
+	group by date(timestamp), status;
+
+	insert into receiver_claim_stats (receiver_id, claims, quantity_sum, quantity_count)
+	select c.receiver_id, count(*), coalesce(sum(f.quantity), 0), count(f.quantity) from claims c
+	left join food_listings f on c.food_id = f.food_id
+	group by c.receiver_id;
+end $$;
+
+select refresh_summaries();
@@ -0,0 +1,32 @@
+-- Indexes for the app's actual access paths
+-- plain (not concurrent) creates: each takes a short write lock on its table while it builds
+
+-- foreign keys: every claims/food_listings join and the summary triggers look rows up through these
+create index if not exists claims_food_id_idx on claims (food_id);
+create index if not exists claims_receiver_id_idx on claims (receiver_id);
+create index if not exists food_listings_provider_id_idx on food_listings (provider_id);
+
+-- claims per day / time windows
+create index if not exists claims_timestamp_idx on claims (timestamp);
+
+-- status filters used by the catalog ('Completed') and by open work ('Pending')
+create index if not exists claims_completed_food_id_idx on claims (food_id) where status = 'Completed';
+create index if not exists claims_pending_food_id_idx on claims (food_id) where status = 'Pending';
+
+-- listings per city
+create index if not exists food_listings_location_idx on food_listings (location);
+
+-- provider city search: LOWER(city) LIKE '%x%' can only use a trigram index
+do $$
+begin
+	if exists (select 1 from pg_available_extensions where name = 'pg_trgm') then
+		create extension if not exists pg_trgm;
+		execute 'create index if not exists providers_city_trgm_idx on providers using gin (lower(city) gin_trgm_ops)';
+	else
+		raise notice 'pg_trgm is not available, the provider city search will keep using a sequential scan';
+	end if;
+end $$;
+
+analyze claims;
+analyze food_listings;
+analyze providers;
@@ -0,0 +1,155 @@
+-- Statement level summary triggers
+-- the row triggers from 0002 update the same few summary rows once per changed row; inside one
+-- big COPY every update leaves another row version behind and the load slows down quadratically.
+-- these triggers see all rows a statement changed at once (transition tables), add them up and
+-- touch each summary row once per statement, so a 50k row COPY costs one grouped upsert.
+-- (a trigger with transition tables can only have one event, hence insert/update/delete triggers)
+
+drop trigger if exists food_listings_summary on food_listings;
+drop trigger if exists claims_summary on claims;
+drop function if exists food_listings_summary_trigger();
+drop function if exists claims_summary_trigger();
+drop function if exists listing_stats_apply(food_listings, integer);
+drop function if exists claim_stats_apply(claims, integer);
+
+-- emptied rows are removed after every statement, these keep finding them cheap
+create index if not exists listing_stats_empty on listing_stats (dimension) where listings = 0;
+create index if not exists provider_food_items_empty on provider_food_items (provider_id) where listings = 0;
+create index if not exists claim_stats_empty on claim_stats (food_id) where claims = 0;
+create index if not exists claims_daily_empty on claims_daily (claim_date) where claims = 0;
+create index if not exists receiver_claim_stats_empty on receiver_claim_stats (receiver_id) where claims = 0;
+
+
+-- ---------------------- food_listings maintenance ----------------------
+create or replace function food_listings_summary_trigger() returns trigger
+language plpgsql as $$
+declare
+	-- rows added count +1, rows removed count -1, an update is both
+	delta text := case tg_op
+		when 'INSERT' then 'select *, 1 as sign from new_rows'
+		when 'DELETE' then 'select *, -1 as sign from old_rows'
+		else 'select *, 1 as sign from new_rows union all select *, -1 as sign from old_rows'
+	end;
+begin
+	execute format($q$
+		insert into listing_stats as s (dimension, value, listings, quantity_sum, quantity_count, provider_count)
+		select v.dimension, v.value, sum(d.sign), sum(d.sign * coalesce(d.quantity, 0)),
+			sum(d.sign * (d.quantity is not null)::int), sum(d.sign * (d.provider_id is not null)::int)
+		from (%s) as d
+		cross join lateral (values
+			('provider_type', d.provider_type),
+			('location', d.location),
+			('food_type', d.food_type),
+			('meal_type', d.meal_type),
+			('provider_id', d.provider_id::text)
+		) as v(dimension, value)
+		group by v.dimension, v.value
+		on conflict (dimension, value) do update set
+			listings = s.listings + excluded.listings,
+			quantity_sum = s.quantity_sum + excluded.quantity_sum,
+			quantity_count = s.quantity_count + excluded.quantity_count,
+			provider_count = s.provider_count + excluded.provider_count
+		$q$, delta);
+
+	execute format($q$
+		insert into provider_food_items as s (provider_id, food_name, listings)
+		select d.provider_id, d.food_name, sum(d.sign) from (%s) as d
+		where d.provider_id is not null
+		group by d.provider_id, d.food_name
+		on conflict (provider_id, food_name) do update set listings = s.listings + excluded.listings
+		$q$, delta);
+
+	-- receivers' claimed quantity follows the listing's quantity
+	if tg_op = 'UPDATE' then
+		update receiver_claim_stats s set
+			quantity_sum = s.quantity_sum + x.quantity_delta,
+			quantity_count = s.quantity_count + x.count_delta
+		from (
+			select c.receiver_id,
+				sum(coalesce(n.quantity, 0) - coalesce(o.quantity, 0)) as quantity_delta,
+				sum((n.quantity is not null)::int - (o.quantity is not null)::int) as count_delta
+			from new_rows n
+			join old_rows o on o.food_id = n.food_id
+			join claims c on c.food_id = n.food_id
+			where n.quantity is distinct from o.quantity
+			group by c.receiver_id
+		) as x
+		where s.receiver_id is not distinct from x.receiver_id;
+	end if;
+
+	if tg_op <> 'INSERT' then
+		delete from listing_stats where listings = 0;
+		delete from provider_food_items where listings = 0;
+	end if;
+	return null;
+end $$;
+
+create trigger food_listings_summary_insert
+after insert on food_listings referencing new table as new_rows
+for each statement execute function food_listings_summary_trigger();
+
+create trigger food_listings_summary_update
+after update on food_listings referencing old table as old_rows new table as new_rows
+for each statement execute function food_listings_summary_trigger();
+
+create trigger food_listings_summary_delete
+after delete on food_listings referencing old table as old_rows
+for each statement execute function food_listings_summary_trigger();
+
+
+-- ---------------------- claims maintenance ----------------------
+create or replace function claims_summary_trigger() returns trigger
+language plpgsql as $$
+declare
+	delta text := case tg_op
+		when 'INSERT' then 'select food_id, receiver_id, status, timestamp, 1 as sign from new_rows'
+		when 'DELETE' then 'select food_id, receiver_id, status, timestamp, -1 as sign from old_rows'
+		else 'select food_id, receiver_id, status, timestamp, 1 as sign from new_rows
+			union all select food_id, receiver_id, status, timestamp, -1 as sign from old_rows'
+	end;
+begin
+	execute format($q$
+		insert into claim_stats as s (food_id, status, claims)
+		select d.food_id, d.status, sum(d.sign) from (%s) as d
+		group by d.food_id, d.status
+		on conflict (food_id, status) do update set claims = s.claims + excluded.claims
+		$q$, delta);
+
+	execute format($q$
+		insert into claims_daily as s (claim_date, status, claims)
+		select date(d.timestamp), d.status, sum(d.sign) from (%s) as d
+		group by date(d.timestamp), d.status
+		on conflict (claim_date, status) do update set claims = s.claims + excluded.claims
+		$q$, delta);
+
+	execute format($q$
+		insert into receiver_claim_stats as s (receiver_id, claims, quantity_sum, quantity_count)
+		select d.receiver_id, sum(d.sign), sum(d.sign * coalesce(f.quantity, 0)), sum(d.sign * (f.quantity is not null)::int)
+		from (%s) as d
+		left join food_listings f on f.food_id = d.food_id
+		group by d.receiver_id
+		on conflict (receiver_id) do update set
+			claims = s.claims + excluded.claims,
+			quantity_sum = s.quantity_sum + excluded.quantity_sum,
+			quantity_count = s.quantity_count + excluded.quantity_count
+		$q$, delta);
+
+	if tg_op <> 'INSERT' then
+		delete from claim_stats where claims = 0;
+		delete from claims_daily where claims = 0;
+		delete from receiver_claim_stats where claims = 0;
+	end if;
+	return null;
+end $$;
+
+create trigger claims_summary_insert
+after insert on claims referencing new table as new_rows
+for each statement execute function claims_summary_trigger();
+
+create trigger claims_summary_update
+after update on claims referencing old table as old_rows new table as new_rows
+for each statement execute function claims_summary_trigger();
+
+create trigger claims_summary_delete
+after delete on claims referencing old table as old_rows
+for each statement execute function claims_summary_trigger();
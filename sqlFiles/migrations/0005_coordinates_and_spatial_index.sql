@@ -0,0 +1,29 @@
+-- Provider and receiver coordinates for the nearby food search
+-- listings are located at their provider, receivers' coordinates are the default search point.
+
+alter table providers add column if not exists latitude double precision;
+alter table providers add column if not exists longitude double precision;
+alter table receivers add column if not exists latitude double precision;
+alter table receivers add column if not exists longitude double precision;
+
+-- unexpired listings of a set of providers
+create index if not exists food_listings_provider_expiry_idx on food_listings (provider_id, expiry_date);
+
+-- with PostGIS: a geography point per provider and a GiST index for radius searches.
+-- without it the app keeps an in-process grid over the provider coordinates instead (geo.py)
+do $$
+begin
+	if exists (select 1 from pg_available_extensions where name = 'postgis') then
+		create extension if not exists postgis;
+		execute $q$
+			alter table providers add column if not exists geog geography(Point, 4326)
+			generated always as (
+				case when latitude is not null and longitude is not null
+				then st_setsrid(st_makepoint(longitude, latitude), 4326)::geography end
+			) stored
+		$q$;
+		execute 'create index if not exists providers_geog_idx on providers using gist (geog)';
+	else
+		raise notice 'PostGIS is not available, nearby search will use the in-process grid index';
+	end if;
+end $$;
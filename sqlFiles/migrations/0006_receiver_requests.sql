@@ -0,0 +1,19 @@
+-- Open demand for the batch allocation engine (allocation.py)
+-- a receiver asks for a quantity of food, optionally of one food_type and in another city than
+-- their own; every allocation round turns matching listings into 'Pending' claims.
+
+create table if not exists receiver_requests (
+	request_id integer generated by default as identity primary key,
+	receiver_id integer not null references receivers(receiver_id),
+	food_type text,				-- null = any food type
+	city text,				-- null = the receiver's own city
+	quantity integer not null check (quantity > 0),
+	quantity_allocated integer not null default 0,
+	status text not null default 'Open',	-- Open / Fulfilled / Cancelled
+	requested_at timestamp not null default now()
+);
+
+create index if not exists receiver_requests_open_idx on receiver_requests (requested_at) where status = 'Open';
+
+-- listings still waiting for someone: unexpired and without a live claim
+create index if not exists claims_live_food_id_idx on claims (food_id) where status is distinct from 'Cancelled';
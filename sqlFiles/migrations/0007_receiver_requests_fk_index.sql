@@ -0,0 +1,7 @@
+-- Foreign key index on receiver_requests
+-- deleting a receiver checks receiver_requests for rows still pointing at it; without this index every
+-- deleted receiver is a sequential scan of the table.
+
+create index if not exists receiver_requests_receiver_id_idx on receiver_requests (receiver_id);
+
+analyze receiver_requests;
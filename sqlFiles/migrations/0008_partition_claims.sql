@@ -0,0 +1,113 @@
+-- Claims range partitioned by month of timestamp
+-- one partition per month (claims_pYYYY_MM) plus claims_default for anything no monthly partition
+-- covers. A query bounded on timestamp (the dashboards' period filter) only reads the months it asks
+-- for, and old months can later be detached or dropped as a whole.
+-- a partitioned table's primary key has to contain the partition column, so the key becomes
+-- (claim_id, timestamp) and timestamp can no longer be null. The database no longer checks claim_id on
+-- its own, allocation.py numbers new claims past the highest id (archived claims included, see 0009).
+-- future months are created ahead of time by maintenance.py (claims_ensure_partitions), until they
+-- are, new claims land in claims_default and are moved out when their month is created.
+
+do $$
+begin
+	if exists (select 1 from claims where timestamp is null) then
+		raise exception 'claims with a null timestamp can''t be partitioned, give them one first';
+	end if;
+end $$;
+
+-- the old table keeps its data until it is copied over, its indexes and triggers go now
+drop trigger if exists claims_summary_insert on claims;
+drop trigger if exists claims_summary_update on claims;
+drop trigger if exists claims_summary_delete on claims;
+drop index if exists claims_food_id_idx, claims_receiver_id_idx, claims_timestamp_idx,
+	claims_completed_food_id_idx, claims_pending_food_id_idx, claims_live_food_id_idx;
+alter table claims rename to claims_unpartitioned;
+alter index claims_pkey rename to claims_unpartitioned_pkey;
+alter table claims_unpartitioned rename constraint claims_food_id_fkey to claims_unpartitioned_food_id_fkey;
+alter table claims_unpartitioned rename constraint claims_receiver_id_fkey to claims_unpartitioned_receiver_id_fkey;
+
+create table claims (
+	claim_id integer not null,
+	food_id integer references food_listings(food_id),
+	receiver_id integer references receivers(receiver_id),
+	status text,
+	timestamp timestamp not null default now(),
+	primary key (claim_id, timestamp)
+) partition by range (timestamp);
+
+create table claims_default partition of claims default;
+
+
+-- ---------------------- partition upkeep ----------------------
+-- creates the monthly partitions from first_month to last_month that don't exist yet, returns how
+-- many it created. Rows of a new month already sitting in claims_default are moved into it: the month
+-- is built as a plain table, filled, then attached. The rows are moved on the partitions directly, so
+-- the summary triggers on claims don't see them leave and come back.
+create or replace function claims_ensure_partitions(first_month date, last_month date) returns integer
+language plpgsql as $$
+declare
+	month_start date := date_trunc('month', first_month);
+	part text;
+	created integer := 0;
+begin
+	while month_start <= last_month loop
+		part := format('claims_p%s', to_char(month_start, 'YYYY_MM'));
+		if to_regclass(part) is null then
+			if exists (select 1 from claims_default where timestamp >= month_start and timestamp < month_start + interval '1 month') then
+				execute format('create table %I (like claims including defaults including constraints)', part);
+				execute format($q$
+					with moved as (
+						delete from claims_default where timestamp >= %L and timestamp < %L returning *
+					)
+					insert into %I select * from moved
+					$q$, month_start, month_start + interval '1 month', part);
+				execute format('alter table claims attach partition %I for values from (%L) to (%L)',
+					part, month_start, month_start + interval '1 month');
+			else
+				execute format('create table %I partition of claims for values from (%L) to (%L)',
+					part, month_start, month_start + interval '1 month');
+			end if;
+			created := created + 1;
+		end if;
+		month_start := month_start + interval '1 month';
+	end loop;
+	return created;
+end $$;
+
+select claims_ensure_partitions(
+	coalesce((select min(timestamp) from claims_unpartitioned), now())::date,
+	(date_trunc('month', now()) + interval '3 months')::date
+);
+
+insert into claims (claim_id, food_id, receiver_id, status, timestamp)
+select claim_id, food_id, receiver_id, status, timestamp from claims_unpartitioned;
+
+
+-- ---------------------- indexes ----------------------
+-- created on the parent, every partition (present and future) gets its own copy
+create index claims_food_id_idx on claims (food_id);
+create index claims_receiver_id_idx on claims (receiver_id);
+create index claims_timestamp_idx on claims (timestamp);
+create index claims_completed_food_id_idx on claims (food_id) where status = 'Completed';
+create index claims_pending_food_id_idx on claims (food_id) where status = 'Pending';
+create index claims_live_food_id_idx on claims (food_id) where status is distinct from 'Cancelled';
+
+
+-- ---------------------- summary triggers ----------------------
+-- same statement level triggers as 0004, created after the copy so the summaries aren't counted twice.
+-- transition tables are allowed on the partitioned parent and see the rows of every partition
+create trigger claims_summary_insert
+after insert on claims referencing new table as new_rows
+for each statement execute function claims_summary_trigger();
+
+create trigger claims_summary_update
+after update on claims referencing old table as old_rows new table as new_rows
+for each statement execute function claims_summary_trigger();
+
+create trigger claims_summary_delete
+after delete on claims referencing old table as old_rows
+for each statement execute function claims_summary_trigger();
+
+drop table claims_unpartitioned;
+
+analyze claims;
@@ -0,0 +1,19 @@
+-- Archive tables for expired listings and their settled claims
+-- maintenance.py moves food listings that expired long ago, and whose claims are all Completed or
+-- Cancelled, out of food_listings/claims into these tables, so the tables the app reads every rerun
+-- only hold live data. Archived rows leave the dashboard summaries with them (the delete triggers).
+-- no foreign keys: a receiver or provider can still be deleted once their history is archived.
+
+create table if not exists food_listings_archive (
+	like food_listings including defaults,
+	archived_at timestamptz not null default now()
+);
+create index if not exists food_listings_archive_food_id_idx on food_listings_archive (food_id);
+create index if not exists food_listings_archive_expiry_date_idx on food_listings_archive (expiry_date);
+
+create table if not exists claims_archive (
+	like claims including defaults,
+	archived_at timestamptz not null default now()
+);
+create index if not exists claims_archive_claim_id_idx on claims_archive (claim_id);
+create index if not exists claims_archive_food_id_idx on claims_archive (food_id);
@@ -0,0 +1,11 @@
+-- Row fingerprints for the incremental csv sync (sync.py)
+-- one hash per source row, keyed by the csv's id column: a daily sync hashes the files again and only
+-- writes the rows whose hash changed, plus deletes for the ids that disappeared.
+
+create table if not exists sync_fingerprints (
+	table_name text not null,
+	key bigint not null,
+	row_hash bigint not null,
+	synced_at timestamptz not null default now(),
+	primary key (table_name, key)
+);
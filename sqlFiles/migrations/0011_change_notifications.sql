@@ -0,0 +1,65 @@
+-- Change notifications for live pages
+-- after every statement that changes claims or food_listings, a NOTIFY on channel foodwaste_changes
+-- with the table, the operation and the ids it touched, e.g.
+--   {"table": "claims", "op": "update", "keys": [10417, 10418]}
+-- notifications are delivered when the transaction commits (never for one that rolls back), and each
+-- app server process listens for them on one connection (live.py) to refresh only what changed.
+-- a payload can't be longer than 8000 bytes: a statement touching too many ids for that sends
+-- "keys": null plus the row count, and listeners treat the whole table as changed.
+
+create or replace function notify_changes() returns trigger
+language plpgsql as $$
+declare
+	-- tg_argv[0] is the table's id column
+	changed text := case tg_op
+		when 'INSERT' then format('select %I as key from new_rows', tg_argv[0])
+		when 'DELETE' then format('select %I as key from old_rows', tg_argv[0])
+		else format('select %1$I as key from old_rows union select %1$I from new_rows', tg_argv[0])
+	end;
+	keys bigint[];
+	payload text;
+begin
+	execute format('select array_agg(distinct key order by key) from (%s) changed', changed) into keys;
+	if keys is null then
+		return null;
+	end if;
+	payload := json_build_object('table', tg_table_name, 'op', lower(tg_op), 'keys', keys)::text;
+	if octet_length(payload) > 7900 then
+		payload := json_build_object('table', tg_table_name, 'op', lower(tg_op), 'keys', null,
+			'rows', cardinality(keys))::text;
+	end if;
+	perform pg_notify('foodwaste_changes', payload);
+	return null;
+end $$;
+
+-- one trigger per event, like the summary triggers: a trigger with transition tables can only have one
+drop trigger if exists food_listings_notify_insert on food_listings;
+drop trigger if exists food_listings_notify_update on food_listings;
+drop trigger if exists food_listings_notify_delete on food_listings;
+drop trigger if exists claims_notify_insert on claims;
+drop trigger if exists claims_notify_update on claims;
+drop trigger if exists claims_notify_delete on claims;
+
+create trigger food_listings_notify_insert
+after insert on food_listings referencing new table as new_rows
+for each statement execute function notify_changes('food_id');
+
+create trigger food_listings_notify_update
+after update on food_listings referencing old table as old_rows new table as new_rows
+for each statement execute function notify_changes('food_id');
+
+create trigger food_listings_notify_delete
+after delete on food_listings referencing old table as old_rows
+for each statement execute function notify_changes('food_id');
+
+create trigger claims_notify_insert
+after insert on claims referencing new table as new_rows
+for each statement execute function notify_changes('claim_id');
+
+create trigger claims_notify_update
+after update on claims referencing old table as old_rows new table as new_rows
+for each statement execute function notify_changes('claim_id');
+
+create trigger claims_notify_delete
+after delete on claims referencing old table as old_rows
+for each statement execute function notify_changes('claim_id');
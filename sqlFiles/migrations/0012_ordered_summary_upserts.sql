@@ -0,0 +1,129 @@
+-- Summary upserts in key order
+-- the statement triggers from 0004 (which replaced the row triggers of 0002) upsert the summary rows
+-- a statement touches in whatever order the hash aggregate hands them out. Two transactions writing
+-- overlapping rows could then lock them in opposite orders and deadlock. Every grouped upsert now
+-- sorts on its conflict key, so all writers take the summary row locks in the same order.
+--
+-- contention trade-off: keeping the summaries exact in the writing transaction means every claim
+-- insert updates the same few hot rows (today's claims_daily row per status, the receiver's
+-- receiver_claim_stats row, the listing's claim_stats row) and holds those row locks until commit.
+-- concurrent writers to the same day/receiver/listing therefore queue behind each other for as long
+-- as the longest of their transactions stays open: page renders run in one transaction (db.py) and
+-- an allocation round (allocation.py) holds its claims until it commits. The ordering removes the
+-- deadlocks, not the queueing; keep writing transactions short. If claim writes ever need to scale
+-- past that, the alternative is an append-only delta table folded into the summaries by a job,
+-- which trades exact dashboards for lag.
+-- (the receiver_claim_stats update for changed listing quantities is an update ... from and is not
+-- ordered; it only runs for quantity edits, which the app makes one listing at a time)
+
+create or replace function food_listings_summary_trigger() returns trigger
+language plpgsql as $$
+declare
+	-- rows added count +1, rows removed count -1, an update is both
+	delta text := case tg_op
+		when 'INSERT' then 'select *, 1 as sign from new_rows'
+		when 'DELETE' then 'select *, -1 as sign from old_rows'
+		else 'select *, 1 as sign from new_rows union all select *, -1 as sign from old_rows'
+	end;
+begin
+	execute format($q$
+		insert into listing_stats as s (dimension, value, listings, quantity_sum, quantity_count, provider_count)
+		select v.dimension, v.value, sum(d.sign), sum(d.sign * coalesce(d.quantity, 0)),
+			sum(d.sign * (d.quantity is not null)::int), sum(d.sign * (d.provider_id is not null)::int)
+		from (%s) as d
+		cross join lateral (values
+			('provider_type', d.provider_type),
+			('location', d.location),
+			('food_type', d.food_type),
+			('meal_type', d.meal_type),
+			('provider_id', d.provider_id::text)
+		) as v(dimension, value)
+		group by v.dimension, v.value
+		order by v.dimension, v.value
+		on conflict (dimension, value) do update set
+			listings = s.listings + excluded.listings,
+			quantity_sum = s.quantity_sum + excluded.quantity_sum,
+			quantity_count = s.quantity_count + excluded.quantity_count,
+			provider_count = s.provider_count + excluded.provider_count
+		$q$, delta);
+
+	execute format($q$
+		insert into provider_food_items as s (provider_id, food_name, listings)
+		select d.provider_id, d.food_name, sum(d.sign) from (%s) as d
+		where d.provider_id is not null
+		group by d.provider_id, d.food_name
+		order by d.provider_id, d.food_name
+		on conflict (provider_id, food_name) do update set listings = s.listings + excluded.listings
+		$q$, delta);
+
+	-- receivers' claimed quantity follows the listing's quantity
+	if tg_op = 'UPDATE' then
+		update receiver_claim_stats s set
+			quantity_sum = s.quantity_sum + x.quantity_delta,
+			quantity_count = s.quantity_count + x.count_delta
+		from (
+			select c.receiver_id,
+				sum(coalesce(n.quantity, 0) - coalesce(o.quantity, 0)) as quantity_delta,
+				sum((n.quantity is not null)::int - (o.quantity is not null)::int) as count_delta
+			from new_rows n
+			join old_rows o on o.food_id = n.food_id
+			join claims c on c.food_id = n.food_id
+			where n.quantity is distinct from o.quantity
+			group by c.receiver_id
+		) as x
+		where s.receiver_id is not distinct from x.receiver_id;
+	end if;
+
+	if tg_op <> 'INSERT' then
+		delete from listing_stats where listings = 0;
+		delete from provider_food_items where listings = 0;
+	end if;
+	return null;
+end $$;
+
+create or replace function claims_summary_trigger() returns trigger
+language plpgsql as $$
+declare
+	delta text := case tg_op
+		when 'INSERT' then 'select food_id, receiver_id, status, timestamp, 1 as sign from new_rows'
+		when 'DELETE' then 'select food_id, receiver_id, status, timestamp, -1 as sign from old_rows'
+		else 'select food_id, receiver_id, status, timestamp, 1 as sign from new_rows
+			union all select food_id, receiver_id, status, timestamp, -1 as sign from old_rows'
+	end;
+begin
+	execute format($q$
+		insert into claim_stats as s (food_id, status, claims)
+		select d.food_id, d.status, sum(d.sign) from (%s) as d
+		group by d.food_id, d.status
+		order by d.food_id, d.status
+		on conflict (food_id, status) do update set claims = s.claims + excluded.claims
+		$q$, delta);
+
+	execute format($q$
+		insert into claims_daily as s (claim_date, status, claims)
+		select date(d.timestamp), d.status, sum(d.sign) from (%s) as d
+		group by date(d.timestamp), d.status
+		order by date(d.timestamp), d.status
+		on conflict (claim_date, status) do update set claims = s.claims + excluded.claims
+		$q$, delta);
+
+	execute format($q$
+		insert into receiver_claim_stats as s (receiver_id, claims, quantity_sum, quantity_count)
+		select d.receiver_id, sum(d.sign), sum(d.sign * coalesce(f.quantity, 0)), sum(d.sign * (f.quantity is not null)::int)
+		from (%s) as d
+		left join food_listings f on f.food_id = d.food_id
+		group by d.receiver_id
+		order by d.receiver_id
+		on conflict (receiver_id) do update set
+			claims = s.claims + excluded.claims,
+			quantity_sum = s.quantity_sum + excluded.quantity_sum,
+			quantity_count = s.quantity_count + excluded.quantity_count
+		$q$, delta);
+
+	if tg_op <> 'INSERT' then
+		delete from claim_stats where claims = 0;
+		delete from claims_daily where claims = 0;
+		delete from receiver_claim_stats where claims = 0;
+	end if;
+	return null;
+end $$;
@@ -0,0 +1,64 @@
+-- claim_id unique again
+-- since 0008 the primary key of the partitioned claims table is (claim_id, timestamp): postgres can only
+-- enforce uniqueness across partitions on keys that hold the partition column. The app still treats
+-- claim_id as the key of one row (CRUD, bulk batches, sync, the table browser, live refreshes), so
+-- claim_ids holds every claim_id in claims, kept in step by statement level triggers, and its
+-- primary key refuses a second claim with the same id whatever its timestamp.
+-- the triggers run after the statement, after the row level foreign key checks, so the key from
+-- claims to claim_ids is only checked at commit (deferred).
+-- archived claims (claims_archive, 0009) leave claim_ids, allocation.py still numbers past them.
+
+do $$
+begin
+	if exists (select 1 from claims group by claim_id having count(*) > 1) then
+		raise exception 'claims has repeated claim_ids, renumber them first';
+	end if;
+end $$;
+
+create table if not exists claim_ids (
+	claim_id integer primary key
+);
+
+insert into claim_ids (claim_id)
+select claim_id from claims
+on conflict do nothing;
+
+create or replace function claim_ids_trigger() returns trigger
+language plpgsql as $$
+begin
+	-- plpgsql plans a statement the first time it runs, so each branch only sees the transition
+	-- tables its event has
+	if tg_op = 'INSERT' then
+		insert into claim_ids (claim_id) select claim_id from new_rows;
+	elsif tg_op = 'DELETE' then
+		delete from claim_ids where claim_id in (select claim_id from old_rows);
+	else
+		-- most updates keep their ids and change nothing here. except all keeps repeated ids, so two
+		-- rows moved onto one id fail like two inserts would
+		delete from claim_ids where claim_id in (
+			select claim_id from old_rows except select claim_id from new_rows);
+		insert into claim_ids (claim_id)
+		select claim_id from new_rows except all select claim_id from old_rows;
+	end if;
+	return null;
+end $$;
+
+drop trigger if exists claims_ids_insert on claims;
+drop trigger if exists claims_ids_update on claims;
+drop trigger if exists claims_ids_delete on claims;
+
+create trigger claims_ids_insert
+after insert on claims referencing new table as new_rows
+for each statement execute function claim_ids_trigger();
+
+create trigger claims_ids_update
+after update on claims referencing old table as old_rows new table as new_rows
+for each statement execute function claim_ids_trigger();
+
+create trigger claims_ids_delete
+after delete on claims referencing old table as old_rows
+for each statement execute function claim_ids_trigger();
+
+alter table claims drop constraint if exists claims_claim_id_fkey;
+alter table claims add constraint claims_claim_id_fkey foreign key (claim_id) references claim_ids (claim_id)
+	deferrable initially deferred;
@@ -0,0 +1,69 @@
+-- Change notifications: count before collecting ids, and providers/receivers too
+-- 0011 collected every changed id with array_agg(distinct ... order by ...) and only then found out
+-- whether they fit in a payload, so a 50k row COPY sorted 50k ids to send "keys": null. The rows are
+-- counted first now (with the longest id): when count * (digits + separator) can't fit, the ids are
+-- never collected. A statement that might fit is still checked on the finished payload.
+-- providers and receivers get the same triggers, so their pages and the cached queries that join
+-- them are refreshed like claims and food_listings instead of waiting for the cache TTL.
+
+create or replace function notify_changes() returns trigger
+language plpgsql as $$
+declare
+	-- tg_argv[0] is the table's id column
+	changed text := case tg_op
+		when 'INSERT' then format('select %I as key from new_rows', tg_argv[0])
+		when 'DELETE' then format('select %I as key from old_rows', tg_argv[0])
+		else format('select %1$I as key from old_rows union all select %1$I from new_rows', tg_argv[0])
+	end;
+	ids bigint;
+	longest bigint;
+	keys bigint[];
+	payload text;
+begin
+	execute format('select count(*), max(abs(key)) from (%s) changed', changed) into ids, longest;
+	if ids = 0 then
+		return null;
+	end if;
+	-- an update counts its old and new ids, an upper bound of what array_agg(distinct) would keep
+	if ids * (length(longest::text) + 2) <= 7800 then
+		execute format('select array_agg(distinct key order by key) from (%s) changed', changed) into keys;
+		payload := json_build_object('table', tg_table_name, 'op', lower(tg_op), 'keys', keys)::text;
+	end if;
+	if payload is null or octet_length(payload) > 7900 then
+		payload := json_build_object('table', tg_table_name, 'op', lower(tg_op), 'keys', null,
+			'rows', case when tg_op = 'UPDATE' then ids / 2 else ids end)::text;
+	end if;
+	perform pg_notify('foodwaste_changes', payload);
+	return null;
+end $$;
+
+drop trigger if exists providers_notify_insert on providers;
+drop trigger if exists providers_notify_update on providers;
+drop trigger if exists providers_notify_delete on providers;
+drop trigger if exists receivers_notify_insert on receivers;
+drop trigger if exists receivers_notify_update on receivers;
+drop trigger if exists receivers_notify_delete on receivers;
+
+create trigger providers_notify_insert
+after insert on providers referencing new table as new_rows
+for each statement execute function notify_changes('provider_id');
+
+create trigger providers_notify_update
+after update on providers referencing old table as old_rows new table as new_rows
+for each statement execute function notify_changes('provider_id');
+
+create trigger providers_notify_delete
+after delete on providers referencing old table as old_rows
+for each statement execute function notify_changes('provider_id');
+
+create trigger receivers_notify_insert
+after insert on receivers referencing new table as new_rows
+for each statement execute function notify_changes('receiver_id');
+
+create trigger receivers_notify_update
+after update on receivers referencing old table as old_rows new table as new_rows
+for each statement execute function notify_changes('receiver_id');
+
+create trigger receivers_notify_delete
+after delete on receivers referencing old table as old_rows
+for each statement execute function notify_changes('receiver_id');